@@ -1,25 +1,20 @@
+import io
 import os
+import json
+import time
+import uuid
+import asyncio
 import logging
-from typing import List, Dict, Optional
-from fastapi import FastAPI, File, UploadFile, HTTPException, Body, Request
-from fastapi.responses import JSONResponse
+from collections import Counter
+from contextlib import asynccontextmanager
+from operator import itemgetter
+from typing import Any, List, Dict, Optional, Tuple
+from fastapi import FastAPI, File, UploadFile, HTTPException, Body, Request, BackgroundTasks
+from fastapi.responses import JSONResponse, Response, FileResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, ValidationError, field_validator
 from datetime import date, datetime
-
-def convert_date_string(value: str) -> Optional[date]:
-    """Convert string to date, handling various formats"""
-    if not value or value.strip() == "":
-        return None
-    if isinstance(value, date):
-        return value
-    try:
-        return datetime.strptime(value, '%Y-%m-%d').date()
-    except ValueError:
-        try:
-            return datetime.strptime(value, '%Y/%m/%d').date()
-        except ValueError as e:
-            raise ValueError(f"Invalid date format. Expected YYYY-MM-DD or YYYY/MM/DD, got {value}")
+from services.parsers import convert_date_string
 
 class MROItem(BaseModel):
     customer: str
@@ -45,12 +40,66 @@ class MROItem(BaseModel):
             date: lambda v: v.isoformat()
         }
 
+class MROBulkUpdate(BaseModel):
+    serial_numbers: Optional[List[str]] = None
+    filter: Optional[Dict[str, str]] = None
+    patch: Dict[str, Any]
+
+    @field_validator('patch')
+    def validate_patch(cls, value):
+        if not value:
+            raise ValueError("Patch must set at least one field")
+        return value
+
+class MROBatchCreate(BaseModel):
+    items: List[Dict[str, Any]]
+    # "atomic" rejects the whole batch on any error, "best_effort" writes the valid items
+    mode: str = "atomic"
+
+    @field_validator('mode')
+    def validate_mode(cls, value):
+        if value not in ("atomic", "best_effort"):
+            raise ValueError("mode must be 'atomic' or 'best_effort'")
+        return value
+
+MAX_BATCH_ITEMS = int(os.getenv("MRO_BATCH_MAX_ITEMS", 1000))
+
+class ChunkedUploadInit(BaseModel):
+    filename: str
+    size: int
+    # Whole-file SHA-256, lets an already applied file be answered before any chunk is sent
+    sha256: Optional[str] = None
+    chunk_size: Optional[int] = None
+
 import pandas as pd
 from supabase import create_client, Client
 from services.mro_service import MROService
+from services.upload_staging import stage_upload, staged_upload, StreamedUpload, UploadTooLarge
+from services.chunked_upload import ChunkedUpload, ChunkRejected, ChunkTimeout, CHUNKED_UPLOAD_MAX_CHUNK_SIZE
+from services.upload_ledger import UploadLedger
+from services.fingerprint_index import FingerprintIndex
+from services.parsers import (
+    map_inventory, map_orders, INVENTORY_VALIDATOR, ORDERS_VALIDATOR,
+    JobTrackerCsvMapper, JOB_TRACKER_EXCEL_COLUMNS, validate_job_card,
+    normalize_job_tracker_csv, normalize_job_tracker_excel
+)
+from services.mro_validation import MRO_UPLOAD_VALIDATOR, save_error_report, error_report_path
+from services.batch_controller import batch_controller, batch_metrics
+from services.resilience import ResilientClient, CircuitOpen, DeadLetters
+from services.rejected_rows import RejectedRows
+from services.ingest_pipeline import Pipeline, PipelineInputError, Transform, iter_records, ingest_metrics
+from services.parse_pool import ParsePool, PoolSaturated, ParseTimeout
+from services.admission import AdmissionController
+from services.local_replica import LocalReplica
+from services.mro_analytics import MROAnalytics
+from services.mro_summary import MROSummary
+from services.trend_snapshots import TrendSnapshots, METRICS as TREND_METRICS
+from services.search_index import SearchIndex
+from services.autocomplete import Autocomplete, FIELD_SOURCES as AUTOCOMPLETE_FIELDS
+from services.state_store import state_path
 from pathlib import Path
 from dotenv import load_dotenv
-from seed_data import load_inventory, load_orders, load_mro_data
+from seed_data import run_seed as run_seed_job, SeedProgress
 
 # Load environment variables from .env file
 env_path = Path(__file__).parent / '.env'
@@ -113,6 +162,10 @@ async def add_cors_header(request: Request, call_next):
     response.headers["Access-Control-Allow-Headers"] = "*"
     return response
 
+# Per endpoint class concurrency limits so upload bursts cannot starve dashboard reads
+admission = AdmissionController()
+app.middleware("http")(admission)
+
 # Initialize Supabase client with enhanced error handling
 def init_supabase():
     url = os.getenv("SUPABASE_URL")
@@ -131,7 +184,8 @@ def init_supabase():
         response = client.table('mro_items').select('id').limit(1).execute()
         if response.data or response.status_code == 200:
             logger.info("Supabase connection successful")
-        return client
+        # Every query from here on gets retries and the circuit breaker
+        return ResilientClient(client)
     except Exception as e:
         logger.error(f"Supabase connection failed: {str(e)}")
         # Attempt to fetch error details
@@ -150,10 +204,242 @@ supabase: Client = init_supabase()
 # Initialize MRO service
 excel_dir = os.getenv("EXCEL_DIR")
 DEFAULT_EXCEL_PATH = os.path.join(excel_dir, "mro_tracking.xlsx") if excel_dir else None
-mro_service = MROService(supabase, DEFAULT_EXCEL_PATH)
+# Rows whose writes failed after retries, replayable via POST /api/dead-letters/replay
+dead_letters = DeadLetters()
+# Source rows uploads rejected, downloadable and replayable via /api/upload/rejected/{upload_id}
+rejected_rows = RejectedRows()
+mro_service = MROService(supabase, DEFAULT_EXCEL_PATH, dead_letters)
 if not excel_dir:
     logger.warning("EXCEL_DIR not configured - MRO service will operate in database-only mode")
 
+# Upload pipelines: rows per source batch and batches buffered between stages
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 1000))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", 4))
+# Upper bound of the adaptive window of concurrent write calls per upload
+INGEST_MAX_IN_FLIGHT = int(os.getenv("INGEST_MAX_IN_FLIGHT", 4))
+# Process pool for the CPU-bound transform stage of upload pipelines
+parse_pool = ParsePool()
+
+def _pipeline(name: str, transform: Transform, sink, **kwargs) -> Pipeline:
+    """Pipeline whose write batches are sized by the target table's batch controller"""
+    kwargs.setdefault("max_in_flight", INGEST_MAX_IN_FLIGHT)
+    kwargs.setdefault("batcher", batch_controller(name))
+    return Pipeline(name, transform, sink, batch_size=INGEST_BATCH_SIZE, queue_size=INGEST_QUEUE_SIZE, **kwargs)
+
+def _rejections(result: Dict) -> Dict:
+    """Summary fields for rows a pipeline rejected or could not write"""
+    fields = {}
+    if result["errors"]:
+        fields.update(rejected_rows=result["rows_rejected"], errors=result["errors"][:20])
+    if result.get("upload_id"):
+        fields.update(upload_id=result["upload_id"], rejected_rows_url=f"/api/upload/rejected/{result['upload_id']}")
+    if result["failed"]:
+        fields.update(failed_rows=result["failed"], dead_letters="/api/dead-letters")
+    return fields
+
+@app.exception_handler(CircuitOpen)
+async def circuit_open_handler(request: Request, exc: CircuitOpen):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc), "success": False},
+        headers={
+            "Retry-After": str(exc.retry_after),
+            "Access-Control-Allow-Origin": "*"
+        }
+    )
+
+@app.exception_handler(PoolSaturated)
+async def parse_pool_saturated_handler(request: Request, exc: PoolSaturated):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc), "success": False},
+        headers={
+            "Retry-After": str(exc.retry_after),
+            "Access-Control-Allow-Origin": "*"
+        }
+    )
+
+@app.exception_handler(ParseTimeout)
+async def parse_timeout_handler(request: Request, exc: ParseTimeout):
+    return JSONResponse(
+        status_code=504,
+        content={"detail": "Processing the upload took too long", "success": False},
+        headers={"Access-Control-Allow-Origin": "*"}
+    )
+
+@app.on_event("shutdown")
+def shutdown_parse_pool():
+    parse_pool.shutdown()
+
+# Ledger of already ingested files, used to skip repeated uploads
+upload_ledger = UploadLedger()
+
+# job_card_no -> hash of mapped fields, used to write only changed tracker rows
+JOB_TRACKER_FIELDS = [
+    "customer", "part_number", "description", "serial_number", "date_delivered",
+    "work_requested", "progress", "location", "expected_release_date", "remarks",
+    "category", "subcategory", "sheet_name"
+]
+job_tracker_fingerprints = FingerprintIndex("mro_job_tracker", "job_card_no", JOB_TRACKER_FIELDS)
+
+async def _rebuild_fingerprint_index(index: FingerprintIndex):
+    try:
+        await asyncio.to_thread(index.rebuild, supabase)
+    except Exception as e:
+        logger.error(f"Error building {index.table} fingerprint index: {str(e)}")
+
+@app.on_event("startup")
+async def build_fingerprint_index():
+    """Populate the job tracker and MRO item fingerprint indexes in the background on first start"""
+    app.state.fingerprint_rebuilds = [
+        asyncio.create_task(_rebuild_fingerprint_index(index))
+        for index in (job_tracker_fingerprints, mro_service.fingerprints) if len(index) == 0
+    ]
+
+# A stored file summary only holds while no row of its table was written since
+mro_service.change_listeners.append(lambda rows: upload_ledger.forget("mro_items"))
+
+# Optional embedded replica serving dashboard reads without a Supabase round trip
+local_replica = LocalReplica(supabase) if os.getenv("LOCAL_REPLICA", "false").lower() in ("1", "true", "yes") else None
+
+if local_replica:
+    mro_service.change_listeners.append(lambda rows: local_replica.apply("mro_items", rows))
+
+# Turnaround and backlog metrics over cached snapshots of the MRO tables
+mro_analytics = MROAnalytics(supabase, local_replica)
+
+# Category/progress, overdue and customer aggregates kept current by the MRO write paths
+mro_summary = MROSummary(supabase)
+mro_service.change_listeners.append(mro_summary.apply)
+
+async def _refresh_mro_summary(interval: float):
+    # Periodic rebuild picks up writes made by other workers and instances
+    while True:
+        try:
+            await asyncio.to_thread(mro_summary.rebuild)
+        except Exception as e:
+            logger.error(f"Error rebuilding MRO summary: {str(e)}")
+        await asyncio.sleep(interval)
+
+@app.on_event("startup")
+async def start_mro_summary():
+    interval = float(os.getenv("MRO_SUMMARY_REFRESH", 300))
+    app.state.mro_summary_refresh = asyncio.create_task(_refresh_mro_summary(interval))
+
+# Hourly stock and WIP aggregates for trend charts
+trend_snapshots = TrendSnapshots(hourly_retention_days=int(os.getenv("TREND_HOURLY_RETENTION_DAYS", 14)))
+
+def _load_inventory_for_trends() -> List[Dict]:
+    if local_replica and local_replica.is_fresh("inventory"):
+        return local_replica.select("inventory")
+    response = supabase.table("inventory").select("category,in_stock,min_required").execute()
+    return response.data if response and hasattr(response, 'data') else []
+
+@app.on_event("startup")
+async def start_trend_snapshots():
+    interval = float(os.getenv("TREND_SNAPSHOT_INTERVAL", 3600))
+    app.state.trend_snapshots = asyncio.create_task(trend_snapshots.run(
+        interval,
+        _load_inventory_for_trends,
+        lambda: mro_summary.as_dict()["by_category"] if mro_summary.refreshed_at else None
+    ))
+
+# In-process search over part, serial and job card numbers and free text
+search_index = SearchIndex(supabase)
+mro_service.change_listeners.append(lambda rows: search_index.upsert("mro_items", rows))
+
+async def _refresh_search_index(interval: float):
+    # Periodic rebuild picks up writes made by other workers and instances
+    while True:
+        try:
+            await asyncio.to_thread(search_index.rebuild)
+        except Exception as e:
+            logger.error(f"Error building search index: {str(e)}")
+        await asyncio.sleep(interval)
+
+@app.on_event("startup")
+async def start_search_index():
+    interval = float(os.getenv("SEARCH_INDEX_REFRESH", 900))
+    app.state.search_index_refresh = asyncio.create_task(_refresh_search_index(interval))
+
+# Prefix suggestions for the create-item form fields
+autocomplete = Autocomplete(supabase)
+mro_service.change_listeners.append(autocomplete.add)
+
+async def _refresh_autocomplete(interval: float):
+    while True:
+        try:
+            await asyncio.to_thread(autocomplete.rebuild)
+        except Exception as e:
+            logger.error(f"Error rebuilding autocomplete index: {str(e)}")
+        await asyncio.sleep(interval)
+
+@app.on_event("startup")
+async def start_autocomplete():
+    interval = float(os.getenv("AUTOCOMPLETE_REFRESH", 600))
+    app.state.autocomplete_refresh = asyncio.create_task(_refresh_autocomplete(interval))
+
+async def _watch_workbook(interval: float):
+    # Polling watcher: re-parses changed sheets of the configured workbook ahead of the next read
+    try:
+        await asyncio.to_thread(mro_service.read_excel_data)
+    except Exception as e:
+        logger.error(f"Error loading workbook: {str(e)}")
+    while True:
+        try:
+            changed = await asyncio.to_thread(mro_service.workbook_cache.refresh)
+            if changed:
+                logger.info(f"Reloaded changed workbooks: {changed}")
+        except Exception as e:
+            logger.error(f"Error reloading workbook: {str(e)}")
+        await asyncio.sleep(interval)
+
+@app.on_event("startup")
+async def start_workbook_watcher():
+    if DEFAULT_EXCEL_PATH:
+        interval = float(os.getenv("WORKBOOK_WATCH_INTERVAL", 5))
+        app.state.workbook_watcher = asyncio.create_task(_watch_workbook(interval))
+
+@app.on_event("startup")
+async def start_local_replica():
+    """Keep the local replica current in the background"""
+    if local_replica:
+        interval = float(os.getenv("LOCAL_REPLICA_INTERVAL", 30))
+        app.state.replica_sync = asyncio.create_task(local_replica.run(interval))
+        logger.info(f"Local replica enabled, syncing every {interval}s")
+
+def _replica_read(table: str, filters: Optional[Dict]) -> Optional[Tuple[str, float]]:
+    if not local_replica.is_fresh(table):
+        return None
+    return local_replica.select_json(table, filters), local_replica.staleness(table)
+
+async def _replica_response(table: str, filters: Optional[Dict] = None) -> Optional[Response]:
+    """Serve a table from the local replica if it is fresh enough"""
+    if not local_replica:
+        return None
+    # SQLite reads stay off the event loop
+    found = await asyncio.to_thread(_replica_read, table, filters)
+    if found is None:
+        return None
+    content, staleness = found
+    return Response(
+        content=content,
+        media_type="application/json",
+        headers={
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Methods": "GET, OPTIONS",
+            "Access-Control-Allow-Headers": "*",
+            "X-Replica-Staleness": f"{staleness:.1f}"
+        }
+    )
+
+def _fetch_rows(table: str) -> List[Dict]:
+    """All rows of a table, from the local replica when fresh"""
+    if local_replica and local_replica.is_fresh(table):
+        return local_replica.select(table)
+    response = supabase.table(table).select("*").execute()
+    return response.data if response and hasattr(response, 'data') else []
+
 @app.post("/api/mro/sync/excel")
 async def sync_to_excel():
     """Sync database data to Excel file"""
@@ -173,8 +459,11 @@ async def inventory_options():
 @app.get("/api/inventory")
 async def get_inventory():
     try:
+        replica_response = await _replica_response("inventory")
+        if replica_response:
+            return replica_response
         logger.info("Fetching inventory data from Supabase")
-        response = supabase.table("inventory").select("*").execute()
+        response = await asyncio.to_thread(supabase.table("inventory").select("*").execute)
         inventory_data = response.data if response and hasattr(response, 'data') else []
         logger.info(f"Retrieved {len(inventory_data)} inventory items")
         logger.debug(f"First inventory item sample: {inventory_data[0] if inventory_data else 'No data'}")
@@ -204,8 +493,11 @@ async def orders_options():
 @app.get("/api/orders")
 async def get_orders():
     try:
+        replica_response = await _replica_response("orders")
+        if replica_response:
+            return replica_response
         logger.info("Fetching orders data from Supabase")
-        response = supabase.table("orders").select("*").execute()
+        response = await asyncio.to_thread(supabase.table("orders").select("*").execute)
         orders_data = response.data if response and hasattr(response, 'data') else []
         logger.info(f"Retrieved {len(orders_data)} orders")
         logger.debug(f"First order sample: {orders_data[0] if orders_data else 'No data'}")
@@ -238,10 +530,10 @@ async def get_analytics_summary():
         logger.info("Starting analytics summary calculation")
         
         # Fetch data with validation
-        inventory = await get_inventory()
-        orders = await get_orders()
+        inventory = await asyncio.to_thread(_fetch_rows, "inventory")
+        orders = await asyncio.to_thread(_fetch_rows, "orders")
         
-        logger.info("Calculating metrics from {len(inventory)} inventory items and {len(orders)} orders")
+        logger.info(f"Calculating metrics from {len(inventory)} inventory items and {len(orders)} orders")
         
         # Calculate metrics with validation
         total_parts = sum(int(item.get("in_stock", 0)) for item in inventory)
@@ -253,9 +545,7 @@ async def get_analytics_summary():
             "total_parts": total_parts,
             "total_value": float(total_value),
             "low_stock": low_stock,
-            "backorders": backorders,
-            "turnover_rate": float(4.2 if total_parts > 0 else 0),
-            "accuracy_rate": float(98.5 if total_parts > 0 else 0)
+            "backorders": backorders
         }
         
         logger.info(f"Analytics summary calculated: {summary}")
@@ -273,170 +563,190 @@ async def get_analytics_summary():
             "total_parts": 0,
             "total_value": 0.0,
             "low_stock": 0,
-            "backorders": 0,
-            "turnover_rate": 0.0,
-            "accuracy_rate": 0.0
+            "backorders": 0
+        }
+
+def _bulk_write(table: str, rows: List[Dict], key: Optional[str] = None,
+                written_rows: Optional[List[Dict]] = None) -> Dict:
+    """Insert, or upsert on key, through the table's batch controller.
+
+    A batch that still fails after retries is retried row by row; rows that
+    fail on their own are dead-lettered and counted as failed. The rows the
+    database returned for successful writes are added to written_rows.
+    """
+    if key:
+        # ON CONFLICT cannot touch the same row twice in one statement, so the last duplicate wins
+        rows = list({row[key]: row for row in rows}.values())
+        send = lambda batch: supabase.table(table).upsert(batch, on_conflict=key).execute()
+    else:
+        send = lambda batch: supabase.table(table).insert(batch).execute()
+    counts = {"written": 0, "failed": 0}
+    for batch, response, error in batch_controller(table).write(rows, send):
+        if not error:
+            counts["written"] += len(batch)
+            if written_rows is not None:
+                written_rows.extend(getattr(response, "data", None) or batch)
+            continue
+        logger.warning(f"Bulk write of {len(batch)} {table} rows failed, retrying row by row: {str(error)}")
+        for row in batch:
+            try:
+                response = send([row])
+                counts["written"] += 1
+                if written_rows is not None:
+                    written_rows.extend(getattr(response, "data", None) or [row])
+            except CircuitOpen:
+                raise
+            except Exception as e:
+                dead_letters.add(table, "upsert" if key else "insert", [row], e, key=key)
+                counts["failed"] += 1
+    return counts
+
+async def inventory_sink(rows: List[Dict]) -> Dict:
+    counts = await asyncio.to_thread(_bulk_write, "inventory", rows, "part_number")
+    autocomplete.add(rows)
+    return counts
+
+async def orders_sink(rows: List[Dict]) -> Dict:
+    return await asyncio.to_thread(_bulk_write, "orders", rows, "order_number")
+
+async def mro_items_sink(rows: List[Dict]) -> Dict:
+    inserted = []
+    counts = await asyncio.to_thread(_bulk_write, "mro_items", rows, None, inserted)
+    mro_service.notify_changed(inserted)
+    return counts
+
+@app.options("/api/analytics/mro")
+async def analytics_mro_options():
+    return JSONResponse(
+        status_code=200,
+        headers={
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Methods": "GET, OPTIONS",
+            "Access-Control-Allow-Headers": "*"
         }
+    )
+
+@app.get("/api/analytics/mro")
+async def get_mro_analytics(source: str = "mro_items"):
+    """WIP, turnaround, overdue and per-customer backlog metrics for MRO items or the job tracker"""
+    if source not in MROAnalytics.SOURCES:
+        raise HTTPException(status_code=400, detail=f"source must be one of {', '.join(MROAnalytics.SOURCES)}")
+    try:
+        metrics = await asyncio.to_thread(mro_analytics.metrics, source)
+        return JSONResponse(
+            content=metrics,
+            headers={
+                "Access-Control-Allow-Origin": "*",
+                "Access-Control-Allow-Methods": "GET, OPTIONS",
+                "Access-Control-Allow-Headers": "*"
+            }
+        )
+    except Exception as e:
+        logger.error(f"Error calculating MRO analytics: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/analytics/trends")
+async def get_trends(metric: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                     dim: Optional[str] = None):
+    """Stock, low-stock and WIP history for trend charts (defaults to the last 30 days)"""
+    if metric not in TREND_METRICS:
+        raise HTTPException(status_code=400, detail=f"metric must be one of {', '.join(TREND_METRICS)}")
+    end_ts = end.timestamp() if end else datetime.now().timestamp()
+    start_ts = start.timestamp() if start else end_ts - 30 * 24 * 3600
+    points = await asyncio.to_thread(trend_snapshots.query, metric, start_ts, end_ts, dim)
+    return JSONResponse(
+        content={"metric": metric, "points": points},
+        headers={
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Methods": "GET, OPTIONS",
+            "Access-Control-Allow-Headers": "*"
+        }
+    )
+
+def _is_csv_body(request: Request) -> bool:
+    return request.headers.get("content-type", "").split(";")[0].strip().lower() in ("text/csv", "application/csv")
+
+@asynccontextmanager
+async def _upload_source(request: Request, file: Optional[UploadFile]):
+    """A multipart file staged to disk, or a raw text/csv body parsed as it streams in (no temp file)"""
+    if file is not None:
+        async with staged_upload(file) as staged:
+            yield staged
+    elif _is_csv_body(request):
+        yield StreamedUpload(request.stream(), request.query_params.get("filename"))
+    else:
+        raise ValueError("Send the file as multipart form data or as a text/csv request body")
 
 @app.post("/api/upload/inventory")
-async def upload_inventory(file: UploadFile = File(...)):
+async def upload_inventory(request: Request, file: Optional[UploadFile] = File(None)):
     try:
-        logger.info(f"Processing inventory upload: {file.filename}")
-        file_extension = file.filename.split('.')[-1].lower()
+        logger.info(f"Processing inventory upload: {file.filename if file else 'text/csv stream'}")
         
-        # Read file with validation
-        df = pd.read_csv(file.file) if file_extension == 'csv' else pd.read_excel(file.file)
-        logger.info(f"Read {len(df)} rows from uploaded file")
-        
-        # Process inventory data
-        inventory_data = []
-        for idx, row in df.iterrows():
-            item = {
-                "part_number": str(row.get("Part Number", "")),
-                "name": str(row.get("Name", "")),
-                "category": str(row.get("Category", "")),
-                "in_stock": int(row.get("In Stock", 0)),
-                "min_required": int(row.get("Min Required", 0)),
-                "on_order": int(row.get("On Order", 0)),
-                "last_updated": str(row.get("Last Updated", ""))
-            }
-            inventory_data.append(item)
-            
-            # Update or insert with validation
-            try:
-                existing = supabase.table("inventory").select("part_number").eq("part_number", item["part_number"]).execute()
-                if existing.data:
-                    logger.info(f"Updating inventory item: {item['part_number']}")
-                    supabase.table("inventory").update(item).eq("part_number", item["part_number"]).execute()
-                else:
-                    logger.info(f"Inserting new inventory item: {item['part_number']}")
-                    supabase.table("inventory").insert(item).execute()
-            except Exception as e:
-                logger.error(f"Error processing inventory item {item['part_number']}: {str(e)}")
-                raise
+        async with _upload_source(request, file) as staged:
+            result = await _run_upload("inventory", staged)
         
-        logger.info(f"Successfully processed {len(inventory_data)} inventory items")
-        return {"success": True, "count": len(inventory_data)}
+        logger.info(f"Successfully processed {result['written']} inventory items")
+        return {"success": True, "count": result["written"], **_rejections(result)}
+    except (CircuitOpen, PoolSaturated, ParseTimeout):
+        raise
     except Exception as e:
         error_msg = str(e)
         logger.error(f"Error uploading inventory: {error_msg}")
         return {"success": False, "error": error_msg}
 
 @app.post("/api/upload/orders")
-async def upload_orders(file: UploadFile = File(...)):
+async def upload_orders(request: Request, file: Optional[UploadFile] = File(None)):
     try:
-        logger.info(f"Processing orders upload: {file.filename}")
-        file_extension = file.filename.split('.')[-1].lower()
+        logger.info(f"Processing orders upload: {file.filename if file else 'text/csv stream'}")
         
-        # Read file with validation
-        df = pd.read_csv(file.file) if file_extension == 'csv' else pd.read_excel(file.file)
-        logger.info(f"Read {len(df)} rows from uploaded file")
+        async with _upload_source(request, file) as staged:
+            result = await _run_upload("orders", staged)
         
-        # Process orders data
-        orders_data = []
-        for idx, row in df.iterrows():
-            order = {
-                "order_number": str(row.get("Order Number", "")),
-                "part_number": str(row.get("Part Number", "")),
-                "part_name": str(row.get("Part Name", "")),
-                "quantity": int(row.get("Quantity", 0)),
-                "status": str(row.get("Status", "Pending")),
-                "order_date": str(row.get("Order Date", "")),
-                "expected_delivery": str(row.get("Expected Delivery", "")),
-                "supplier": str(row.get("Supplier", ""))
-            }
-            orders_data.append(order)
-        
-        # Insert orders with validation
-        try:
-            result = supabase.table("orders").insert(orders_data).execute()
-            logger.info(f"Successfully uploaded {len(orders_data)} orders")
-            return {"success": True, "count": len(orders_data)}
-        except Exception as e:
-            logger.error(f"Error inserting orders: {str(e)}")
-            raise
-            
+        logger.info(f"Successfully uploaded {result['written']} orders")
+        return {"success": True, "count": result["written"], **_rejections(result)}
+    except (CircuitOpen, PoolSaturated, ParseTimeout):
+        raise
     except Exception as e:
         error_msg = str(e)
         logger.error(f"Error uploading orders: {error_msg}")
         return {"success": False, "error": error_msg}
 
 @app.post("/api/upload/mro")
-async def upload_mro(file: UploadFile = File(...)):
+async def upload_mro(request: Request, file: Optional[UploadFile] = File(None)):
     try:
-        logger.info(f"Processing MRO upload: {file.filename}")
-        file_extension = file.filename.split('.')[-1].lower()
+        logger.info(f"Processing MRO upload: {file.filename if file else 'text/csv stream'}")
         
-        # Read file with validation
-        df = pd.read_csv(file.file) if file_extension == 'csv' else pd.read_excel(file.file)
-        logger.info(f"Read {len(df)} rows from uploaded file")
+        async with _upload_source(request, file) as staged:
+            result = await _run_upload("mro_items", staged)
         
-        # Process MRO data with validation
-        mro_data = []
-        valid_categories = {
-            'ALL WIP COMP', 'MECHANICAL', 'SAFETY COMPONENTS', 
-            'AVIONICS MAIN', 'Avionics Shop', 'PLANT AND EQUIPMENTS',
-            'BATTERY', 'Battery Shop', 'CALIBRATION', 'Cal lab',
-            'UPH Shop', 'Structures Shop'
-        }
+        summary = {"success": True, "count": result["written"], **_rejections(result)}
+        if result["errors"]:
+            logger.warning(f"Rejected {result['rows_rejected']} of {result['rows_read']} MRO rows with {len(result['errors'])} errors")
+            report_id = await asyncio.to_thread(save_error_report, pd.DataFrame(result["errors"]))
+            summary["error_report"] = f"/api/upload/mro/errors/{report_id}"
         
-        for idx, row in df.iterrows():
-            try:
-                # Validate required fields with defaults
-                customer = str(row.get("CUSTOMER", "")).strip()
-                if not customer:
-                    raise ValueError("Customer is required")
-                
-                # Set default values for optional fields
-                part_number = str(row.get("PART NUMBER", "")).strip() or "N/A"
-                description = str(row.get("DESCRIPTION", "")).strip() or "No description"
-                serial_number = str(row.get("SERIAL NUMBER", "")).strip() or "N/A"
-                work_requested = str(row.get("WORK REQUESTED", "")).strip() or "N/A"
-                progress = str(row.get("PROGRESS", "")).strip() or "PENDING"
-                location = str(row.get("LOCATION", "")).strip() or "Unknown"
-                remarks = str(row.get("REMARKS", "")).strip() or "No remarks"
-                
-                # Validate category with default
-                category = str(row.get("CATEGORY", "")).strip()
-                if not category:
-                    category = "MECHANICAL"
-                if category not in valid_categories:
-                    raise ValueError(f"Invalid category: {category}")
-                
-                # Build item with validation
-                item = {
-                    "customer": str(row.get("CUSTOMER", "")).strip(),
-                    "part_number": str(row.get("PART NUMBER", "")).strip(),
-                    "description": str(row.get("DESCRIPTION", "")).strip(),
-                    "serial_number": str(row.get("SERIAL NUMBER", "")).strip(),
-                    "date_delivered": convert_date_string(str(row.get("DATE DELIVERED", ""))),
-                    "work_requested": str(row.get("WORK REQUESTED", "")).strip(),
-                    "progress": str(row.get("PROGRESS", "")).strip(),
-                    "location": str(row.get("LOCATION", "")).strip(),
-                    "expected_release_date": convert_date_string(str(row.get("EXPECTED RELEASE DATE", ""))),
-                    "remarks": str(row.get("REMARKS", "")).strip(),
-                    "category": category
-                }
-                
-                mro_data.append(item)
-            except ValueError as e:
-                logger.warning(f"Skipping row {idx} due to validation error: {str(e)}")
-                continue
-        
-        # Insert MRO items with validation
-        try:
-            result = supabase.table("mro_items").insert(mro_data).execute()
-            logger.info(f"Successfully uploaded {len(mro_data)} MRO items")
-            return {"success": True, "count": len(mro_data)}
-        except Exception as e:
-            logger.error(f"Error inserting MRO items: {str(e)}")
-            raise
-            
+        logger.info(f"Successfully uploaded {result['written']} MRO items")
+        return summary
+    except (CircuitOpen, PoolSaturated, ParseTimeout):
+        raise
     except Exception as e:
         error_msg = str(e)
         logger.error(f"Error uploading MRO data: {error_msg}")
         return {"success": False, "error": error_msg}
 
+@app.get("/api/upload/mro/errors/{report_id}")
+async def download_mro_error_report(report_id: str):
+    """Download the rejected rows of an MRO upload as CSV"""
+    path = error_report_path(report_id)
+    if not path:
+        raise HTTPException(status_code=404, detail="Error report not found")
+    return FileResponse(
+        path,
+        media_type="text/csv",
+        filename=f"mro_upload_errors_{report_id[:8]}.csv",
+        headers={"Access-Control-Allow-Origin": "*"}
+    )
+
 # MRO endpoints
 @app.options("/api/mro/items")
 async def mro_items_options():
@@ -444,7 +754,7 @@ async def mro_items_options():
         status_code=200,
         headers={
             "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "GET, OPTIONS",
+            "Access-Control-Allow-Methods": "GET, POST, PATCH, OPTIONS",
             "Access-Control-Allow-Headers": "*"
         }
     )
@@ -454,6 +764,9 @@ async def get_mro_items(category: Optional[str] = None, progress: Optional[str]
     """Get MRO items with optional filtering"""
     logger.info(f"Received GET /api/mro/items with category={category}, progress={progress}")
     try:
+        replica_response = await _replica_response("mro_items", {"category": category, "progress": progress})
+        if replica_response:
+            return replica_response
         items = await mro_service.get_items(category, progress)
         logger.info(f"Fetched {len(items) if items else 0} MRO items from database.")
         return JSONResponse(
@@ -482,10 +795,11 @@ async def create_mro_item(item: MROItem):
         if isinstance(mro_data.get('expected_release_date'), date):
             mro_data['expected_release_date'] = mro_data['expected_release_date'].isoformat()
             
-        response = supabase.table("mro_items").insert(mro_data).execute()
+        response = await asyncio.to_thread(supabase.table("mro_items").insert(mro_data).execute)
         new_item = response.data[0] if response.data else None
         logger.info(f"Insert response: {response}")
         if new_item:
+            mro_service.notify_changed(response.data)
             # Sync to Excel
             await mro_service.sync_to_excel(new_item.get('category'))
             logger.info(f"Successfully created and synced MRO item: {new_item}")
@@ -497,6 +811,223 @@ async def create_mro_item(item: MROItem):
         logger.error(f"Error creating MRO item: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+# Categories with an Excel mirror flush already scheduled
+_pending_excel_flushes = set()
+
+async def _flush_excel_categories(categories: List[str]):
+    for category in categories:
+        _pending_excel_flushes.discard(category)
+        try:
+            await mro_service.sync_to_excel(category)
+        except Exception as e:
+            logger.error(f"Error flushing Excel sheet {category}: {str(e)}")
+
+def _schedule_excel_flush(categories, background_tasks: BackgroundTasks) -> None:
+    """One Excel flush per affected category, after the response and only if not already queued"""
+    categories = [c for c in dict.fromkeys(categories) if c and c not in _pending_excel_flushes]
+    if categories:
+        _pending_excel_flushes.update(categories)
+        background_tasks.add_task(_flush_excel_categories, categories)
+
+def _validate_mro_batch(items: List[Dict]) -> tuple:
+    """Validate all items in one pass, returning (valid rows by index, errors by index)"""
+    valid, errors = {}, {}
+    for index, item in enumerate(items):
+        try:
+            valid[index] = MROItem.model_validate(item).model_dump(mode="json")
+        except ValidationError as e:
+            errors[index] = [
+                {"field": ".".join(str(f) for f in error["loc"]), "message": error["msg"]}
+                for error in e.errors()
+            ]
+    return valid, errors
+
+def _insert_mro_batch(rows: List[Dict], best_effort: bool) -> tuple:
+    """Insert rows in one request (atomic) or in controller-sized batches that fall back to rows on failure"""
+    if not best_effort:
+        response = supabase.table("mro_items").insert(rows).execute()
+        return response.data or [], {}
+    positions = {id(row): position for position, row in enumerate(rows)}
+    inserted, failed = [], {}
+    send = lambda batch: supabase.table("mro_items").insert(batch).execute()
+    for batch, response, error in batch_controller("mro_items").write(rows, send):
+        if not error:
+            inserted.extend(response.data or [])
+            continue
+        logger.warning(f"Batch insert failed, retrying {len(batch)} items individually: {str(error)}")
+        for row in batch:
+            try:
+                inserted.extend(supabase.table("mro_items").insert(row).execute().data or [])
+            except CircuitOpen:
+                raise
+            except Exception as e:
+                failed[positions[id(row)]] = str(e)
+    return inserted, failed
+
+@app.post("/api/mro/items:batch")
+async def create_mro_items_batch(batch: MROBatchCreate, background_tasks: BackgroundTasks):
+    """Create many MRO items with one validation pass and one insert"""
+    if not batch.items:
+        raise HTTPException(status_code=400, detail="No items provided")
+    if len(batch.items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {MAX_BATCH_ITEMS} items")
+
+    valid, errors = _validate_mro_batch(batch.items)
+    best_effort = batch.mode == "best_effort"
+    if errors and not best_effort:
+        return JSONResponse(
+            status_code=422,
+            content={
+                "inserted_count": 0,
+                "errors": [{"index": i, "errors": errors[i]} for i in sorted(errors)]
+            },
+            headers={"Access-Control-Allow-Origin": "*"}
+        )
+
+    indexes = sorted(valid)
+    inserted = []
+    if indexes:
+        try:
+            inserted, failed = await asyncio.to_thread(
+                _insert_mro_batch, [valid[i] for i in indexes], best_effort
+            )
+        except CircuitOpen:
+            raise
+        except Exception as e:
+            logger.error(f"Error inserting MRO batch: {str(e)}")
+            raise HTTPException(status_code=500, detail=str(e))
+        for position, message in failed.items():
+            errors[indexes[position]] = [{"field": "", "message": message}]
+
+    mro_service.notify_changed(inserted)
+    _schedule_excel_flush([row.get("category") for row in inserted], background_tasks)
+    logger.info(f"Batch created {len(inserted)} of {len(batch.items)} MRO items ({batch.mode})")
+    return JSONResponse(
+        status_code=201 if inserted else 422,
+        content={
+            "inserted_count": len(inserted),
+            "items": inserted,
+            "errors": [{"index": i, "errors": errors[i]} for i in sorted(errors)]
+        },
+        background=background_tasks,
+        headers={"Access-Control-Allow-Origin": "*"}
+    )
+
+def _validate_bulk_patch(patch: Dict[str, Any]) -> tuple:
+    """Validate patch values against the MROItem field types, returning (JSON-ready patch, errors)"""
+    item = MROItem.model_construct()
+    errors = []
+    for field, value in patch.items():
+        if field not in MROItem.model_fields:
+            errors.append({"field": field, "message": "Unknown field"})
+            continue
+        try:
+            # Runs the field's type and validators (e.g. date parsing) without requiring the other fields
+            MROItem.__pydantic_validator__.validate_assignment(item, field, value)
+        except ValidationError as e:
+            errors.extend({"field": field, "message": error["msg"]} for error in e.errors())
+    if errors:
+        return {}, errors
+    return item.model_dump(mode="json", include=set(patch)), []
+
+@app.patch("/api/mro/items")
+async def bulk_update_mro_items(update: MROBulkUpdate, background_tasks: BackgroundTasks):
+    """Apply one field patch to many MRO items by serial number or filter"""
+    patch, errors = _validate_bulk_patch(update.patch)
+    if errors:
+        return JSONResponse(
+            status_code=400,
+            content={"message": "Invalid patch", "errors": errors},
+            headers={"Access-Control-Allow-Origin": "*"}
+        )
+    try:
+        result = await asyncio.to_thread(
+            mro_service.bulk_update, patch, update.serial_numbers, update.filter
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error bulk updating MRO items: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    _schedule_excel_flush(result["stale_categories"], background_tasks)
+    return JSONResponse(
+        content=result,
+        background=background_tasks,
+        headers={"Access-Control-Allow-Origin": "*"}
+    )
+
+@app.get("/api/mro/summary")
+async def get_mro_summary():
+    """Materialized MRO counts by category/subcategory/progress, overdue by location and per customer"""
+    return JSONResponse(
+        content=mro_summary.as_dict(),
+        headers={
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Methods": "GET, OPTIONS",
+            "Access-Control-Allow-Headers": "*"
+        }
+    )
+
+@app.options("/api/mro/search")
+async def search_mro_options():
+    """Handle CORS preflight for MRO search"""
+    return JSONResponse(
+        status_code=200,
+        headers={
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Methods": "GET, OPTIONS",
+            "Access-Control-Allow-Headers": "*",
+            "Access-Control-Max-Age": "86400"
+        }
+    )
+
+@app.get("/api/mro/search")
+async def search_mro(q: str, limit: int = 20, source: Optional[str] = None):
+    """Ranked search over MRO items and job tracker rows by partial number or text"""
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Query must not be empty")
+    if source is not None and source not in ("mro_items", "mro_job_tracker"):
+        raise HTTPException(status_code=400, detail=f"Unknown search source: {source}")
+    result = search_index.search(q, limit=max(1, min(limit, 100)), source=source)
+    result["indexed_documents"] = len(search_index)
+    return JSONResponse(
+        content=result,
+        headers={
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Methods": "GET, OPTIONS",
+            "Access-Control-Allow-Headers": "*"
+        }
+    )
+
+@app.options("/api/autocomplete/{field}")
+async def autocomplete_options(field: str):
+    """Handle CORS preflight for autocomplete"""
+    return JSONResponse(
+        status_code=200,
+        headers={
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Methods": "GET, OPTIONS",
+            "Access-Control-Allow-Headers": "*",
+            "Access-Control-Max-Age": "86400"
+        }
+    )
+
+@app.get("/api/autocomplete/{field}")
+async def autocomplete_field(field: str, prefix: str = "", limit: int = 10):
+    """Most frequent known values of customer, part_number or location starting with prefix"""
+    if field not in AUTOCOMPLETE_FIELDS:
+        raise HTTPException(status_code=404, detail=f"No suggestions for field: {field}")
+    return JSONResponse(
+        content=autocomplete.suggest(field, prefix.strip(), max(1, limit)),
+        headers={
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Methods": "GET, OPTIONS",
+            "Access-Control-Allow-Headers": "*",
+            "Cache-Control": "private, max-age=60"
+        }
+    )
+
 @app.put("/api/mro/items/{serial_number}")
 async def update_mro_item(serial_number: str, item: Dict):
     """Update MRO item"""
@@ -509,30 +1040,50 @@ async def update_mro_item(serial_number: str, item: Dict):
         logger.error(f"Error updating MRO item: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def mro_sync_sink(rows: List[Dict]) -> Dict:
+    # Only send rows that differ from what the table holds, as fingerprinted on every write
+    changed, unchanged = await asyncio.to_thread(mro_service.changed_items, rows)
+    synced = await mro_service.sync_to_database(changed)
+    # Earlier rows of a serial number in the batch are superseded by the last one and count as written with it
+    synced_serials = {str(item["serial_number"]) for item in synced}
+    written = sum(1 for item in changed if item.get("serial_number") and str(item["serial_number"]) in synced_serials)
+    return {"written": written, "unchanged": unchanged, "failed": len(changed) - written}
+
 @app.post("/api/mro/upload")
 async def upload_mro_data(file: UploadFile = File(...)):
     """Upload MRO data from Excel file"""
     try:
-        # Save uploaded file
-        temp_path = f"temp_{file.filename}"
-        with open(temp_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-        
-        # Read data from uploaded file
-        data = mro_service.read_excel_data()
-        
-        # Sync to database
-        await mro_service.sync_to_database(data)
-        
-        # Clean up temp file
-        os.remove(temp_path)
+        # Stage uploaded file under a unique path
+        async with staged_upload(file) as staged:
+            # Return the previous result if this exact file was already applied
+            prior = await asyncio.to_thread(upload_ledger.lookup, "mro_items", staged.sha256)
+            if prior:
+                logger.info(f"Upload {file.filename} already applied, returning previous summary")
+                return {**prior, "duplicate": True}
+            
+            if staged.extension not in ('xlsx', 'xlsm', 'xls'):
+                raise HTTPException(status_code=400, detail="MRO data must be uploaded as an Excel workbook")
+            # Read data from uploaded file; sheets unchanged since an earlier upload are not parsed again
+            data = await asyncio.to_thread(mro_service.read_excel_data, None, staged.path)
+            
+            pipeline = _pipeline("mro_sync", Transform(normalizer=list), mro_sync_sink,
+                                 batcher=batch_controller("mro_items"), order_key=lambda item: item.get("serial_number"))
+            result = await pipeline.run(iter_records(data, INGEST_BATCH_SIZE))
+            logger.info(f"{result['unchanged']} of {len(data)} MRO rows unchanged since last upload")
+            
+            summary = {
+                "message": "Upload successful",
+                "items_processed": len(data),
+                "items_unchanged": result["unchanged"]
+            }
+            if not result["failed"]:
+                await asyncio.to_thread(upload_ledger.record, "mro_items", staged.sha256, staged.filename, staged.size, summary)
         
-        return {"message": "Upload successful", "items_processed": len(data)}
+        return summary
+    except (CircuitOpen, HTTPException):
+        raise
     except Exception as e:
         logger.error(f"Error uploading MRO data: {str(e)}")
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.options("/api/mro/job-tracker/upload")
@@ -548,14 +1099,111 @@ async def upload_job_tracker_options():
         }
     )
 
+def _job_card_no(item: Dict) -> Optional[str]:
+    job_card_no = item.get("job_card_no") or item.get("JOB CARD NO")
+    return str(job_card_no) if job_card_no else None
+
+def _upsert_job_tracker_rows(rows: List[Dict]) -> tuple:
+    """Write only job tracker rows whose fingerprint changed, returning (written, unchanged)"""
+    changed, unchanged = job_tracker_fingerprints.diff([(_job_card_no(item), item) for item in rows])
+    # ON CONFLICT cannot touch the same job card twice in one statement; the last row wins
+    latest = {job_card_no: (item, fingerprint) for job_card_no, item, fingerprint, known in changed}
+    repeats = Counter(job_card_no for job_card_no, *_ in changed)
+    written = []
+    indexed = []
+    send = lambda batch: supabase.table("mro_job_tracker").upsert(batch, on_conflict="job_card_no").execute()
+    items = [item for item, _ in latest.values()]
+    for batch, result, error in batch_controller("mro_job_tracker").write(items, send):
+        if error:
+            logger.warning(f"Bulk write of {len(batch)} job tracker rows failed, retrying row by row: {str(error)}")
+            settled = []
+            for item in batch:
+                try:
+                    indexed.extend(send([item]).data or [item])
+                    settled.append(item)
+                except CircuitOpen:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Skipping row due to error: {str(e)}")
+                    logger.debug(f"Problematic row data: {item}")
+                    dead_letters.add("mro_job_tracker", "upsert", [item], e, key="job_card_no")
+            batch = settled
+        else:
+            indexed.extend(result.data or batch)
+        written.extend((_job_card_no(item), latest[_job_card_no(item)][1]) for item in batch)
+    
+    job_tracker_fingerprints.update(written)
+    if written:
+        upload_ledger.forget("mro_job_tracker")
+    search_index.upsert("mro_job_tracker", indexed)
+    autocomplete.add(indexed)
+    return sum(repeats[job_card_no] for job_card_no, _ in written), unchanged
+
+async def job_tracker_sink(rows: List[Dict]) -> Dict:
+    written, unchanged = await asyncio.to_thread(_upsert_job_tracker_rows, rows)
+    return {"written": written, "unchanged": unchanged, "failed": len(rows) - written - unchanged}
+
+def _upload_pipeline(target: str, kind: str) -> Tuple[Pipeline, Dict]:
+    """Pipeline and source options for an upload of a file type (kind) into a table"""
+    options = {}
+    # Batches write concurrently, but rows sharing a key apply in file order
+    if target == "inventory":
+        transform, sink, order_key = Transform(map_inventory, INVENTORY_VALIDATOR), inventory_sink, itemgetter("part_number")
+    elif target == "orders":
+        transform, sink, order_key = Transform(map_orders, ORDERS_VALIDATOR), orders_sink, itemgetter("order_number")
+    elif target == "mro_items":
+        transform, sink, order_key = Transform(validator=MRO_UPLOAD_VALIDATOR.validate), mro_items_sink, None
+    elif target == "mro_job_tracker":
+        sink, order_key = job_tracker_sink, _job_card_no
+        if kind == "csv":
+            transform = Transform(JobTrackerCsvMapper(), validate_job_card, normalize_job_tracker_csv)
+        else:
+            transform = Transform(validator=validate_job_card, normalizer=normalize_job_tracker_excel)
+            # Explicit column names; the workbook header row is skipped
+            options = {"names": JOB_TRACKER_EXCEL_COLUMNS, "skiprows": 1}
+    else:
+        raise ValueError(f"Unknown upload target: {target}")
+    return _pipeline(target, transform, sink, order_key=order_key, keep_rejected=True, executor=parse_pool), options
+
+def _store_rejected(upload_id: str, target: str, kind: str, filename: Optional[str], result: Dict) -> None:
+    """Persist the rejected source rows of a pipeline run under upload_id, tagging the result with it"""
+    if result["rejected"]:
+        rejected_rows.record(upload_id, target, kind, filename, result["rejected"], result["errors"])
+        result["upload_id"] = upload_id
+
+async def _run_upload(target: str, staged) -> Dict:
+    """Run a staged upload through its pipeline, keeping rejected rows for download and replay"""
+    pipeline, options = _upload_pipeline(target, staged.extension)
+    result = await pipeline.run(pipeline.read(staged, **options))
+    mapper = pipeline.transform.mapper
+    if isinstance(mapper, JobTrackerCsvMapper) and mapper.bad_dates:
+        date_columns = {c: f for c, f in mapper.formats.items() if f}
+        logger.warning(f"{mapper.bad_dates} cells in date columns {date_columns} did not match and were kept as text")
+    await asyncio.to_thread(_store_rejected, uuid.uuid4().hex, target, staged.extension, staged.filename, result)
+    return result
+
+def _job_tracker_summary(result: Dict) -> Dict:
+    summary = {
+        "message": "Upload processed",
+        "total_items": result["rows_read"],
+        "inserted_count": result["written"],
+        "unchanged_count": result["unchanged"],
+        "error_count": result["rows_read"] - result["written"] - result["unchanged"]
+    }
+    if result.get("upload_id"):
+        summary.update(upload_id=result["upload_id"], rejected_rows_url=f"/api/upload/rejected/{result['upload_id']}")
+    return summary
+
 @app.post("/api/mro/job-tracker/upload")
-async def upload_job_tracker_data(request: Request, file: UploadFile = File(...)):
-    """Upload job tracker data from Excel file"""
-    # Initialize temp_path right away with a unique name
-    temp_path = f"temp_{file.filename}" if file.filename else "temp_upload.xlsx"
-    logger.info(f"Starting job tracker upload for file: {file.filename}")
-    logger.info(f"File size: {file.size} bytes")
-    logger.info(f"Content type: {file.content_type}")
+async def upload_job_tracker_data(request: Request, file: Optional[UploadFile] = File(None)):
+    """Upload job tracker data from an Excel/CSV file, or a text/csv body streamed as it arrives"""
+    staged = None
+    if file is not None:
+        logger.info(f"Starting job tracker upload for file: {file.filename}")
+        logger.info(f"File size: {file.size} bytes")
+        logger.info(f"Content type: {file.content_type}")
+    else:
+        logger.info(f"Starting streamed job tracker upload ({request.headers.get('content-length', 'unknown')} bytes)")
     
     cors_headers = {
         "Access-Control-Allow-Origin": "*",
@@ -566,7 +1214,7 @@ async def upload_job_tracker_data(request: Request, file: UploadFile = File(...)
     try:
         # Verify database connection
         try:
-            test = supabase.table("mro_job_tracker").select("id").limit(1).execute()
+            test = await asyncio.to_thread(supabase.table("mro_job_tracker").select("id").limit(1).execute)
             logger.info("Database connection verified")
         except Exception as db_error:
             logger.error(f"Database connection error: {str(db_error)}")
@@ -575,259 +1223,66 @@ async def upload_job_tracker_data(request: Request, file: UploadFile = File(...)
                 content={"detail": "Database connection failed"},
                 headers=cors_headers
             )
-        # Check file size (max 100MB for Render)
-        max_size = 100 * 1024 * 1024  # 100MB
-        file.file.seek(0, 2)  # Seek to end
-        file_size = file.file.tell()
-        file.file.seek(0)  # Reset pointer
-        
-        if file_size > max_size:
+        if file is not None:
+            # Stage uploaded file under a unique path (max 100MB for Render)
+            max_size = 100 * 1024 * 1024  # 100MB
+            try:
+                staged = await stage_upload(file, max_size)
+                logger.info(f"File saved successfully: {staged.size} bytes")
+            except UploadTooLarge as e:
+                logger.error(f"Rejected upload: {str(e)}")
+                return JSONResponse(
+                    status_code=413,
+                    content={
+                        "detail": str(e),
+                        "success": False,
+                        "chunked_upload": "/api/mro/job-tracker/uploads"
+                    },
+                    headers=cors_headers
+                )
+            except Exception as e:
+                logger.error(f"Error saving file: {str(e)}")
+                return JSONResponse(
+                    status_code=500,
+                    content={
+                        "message": "Failed to save uploaded file",
+                        "error": str(e),
+                        "success": False
+                    },
+                    headers=cors_headers
+                )
+            known_sha256 = staged.sha256
+        elif _is_csv_body(request):
+            # Parsed as it arrives and never staged; the file hash is only known at the end unless the client sends it
+            staged = StreamedUpload(request.stream(), request.query_params.get("filename"))
+            known_sha256 = request.headers.get("x-content-sha256", "").lower() or None
+        else:
             return JSONResponse(
-                status_code=413,
-                content={
-                    "detail": f"File too large. Max size is 100MB. Your file is {file_size/1024/1024:.2f}MB",
-                    "success": False
-                },
+                status_code=400,
+                content={"detail": "Send the file as multipart form data or as a text/csv request body", "success": False},
                 headers=cors_headers
             )
-
-        # Save uploaded file with streaming to handle large files
-        try:
-            with open(temp_path, "wb") as buffer:
-                chunk_size = 8192
-                total_written = 0
-                while True:
-                    chunk = await file.read(chunk_size)
-                    if not chunk:
-                        break
-                    buffer.write(chunk)
-                    total_written += len(chunk)
-                    if total_written > max_size:
-                        raise ValueError("File size exceeds limit during upload")
-            
-            logger.info(f"File saved successfully: {total_written} bytes")
-            
-        except Exception as e:
-            logger.error(f"Error saving file: {str(e)}")
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
+        
+        # Return the previous result if this exact file was already applied
+        prior = await asyncio.to_thread(upload_ledger.lookup, "mro_job_tracker", known_sha256) if known_sha256 else None
+        if prior:
+            logger.info(f"Upload {staged.filename} already applied, returning previous summary")
             return JSONResponse(
-                status_code=500,
-                content={
-                    "message": "Failed to save uploaded file",
-                    "error": str(e),
-                    "success": False
-                },
+                status_code=200,
+                content={**prior, "duplicate": True},
                 headers=cors_headers
             )
         
-        # Quick response for large files - process asynchronously
-        if file_size > 10 * 1024 * 1024:  # 10MB threshold
-            logger.info("Large file detected, processing asynchronously")
-            # For now, process synchronously but with better error handling
-            # In production, you might want to use a background task queue
-        
-        # Read and process file with timeout handling
+        # Read, clean and write in overlapping batches
+        logger.info(f"Processing file type: {staged.extension}")
         try:
-            chunk_size = 50  # Smaller chunks for better timeout management
-            inserted_count = 0
-            total_rows = 0
-            file_extension = temp_path.split('.')[-1].lower()
-            
-            logger.info(f"Processing file type: {file_extension}")
-            
-            if file_extension == 'csv':
-                try:
-                    for chunk in pd.read_csv(temp_path, chunksize=chunk_size):
-                        data = chunk.to_dict('records')
-                        total_rows += len(data)
-                        
-                        # Process chunk
-                        chunk_inserted = 0
-                        for item in data:
-                            try:
-                                # Clean and validate data
-                                clean_item = {}
-                                for k, v in item.items():
-                                    if pd.notna(v):
-                                        # Convert datetime objects to strings
-                                        # Convert datetime objects to ISO strings
-                                        if isinstance(v, (datetime, pd.Timestamp)):
-                                            clean_item[k] = v.strftime('%Y-%m-%d')
-                                        elif isinstance(v, str):
-                                            try:  # Try parsing string dates
-                                                parsed_date = datetime.strptime(v, '%Y-%m-%d')
-                                                clean_item[k] = parsed_date.strftime('%Y-%m-%d')
-                                            except ValueError:
-                                                clean_item[k] = v
-                                        else:
-                                            clean_item[k] = str(v)
-                                    else:
-                                        clean_item[k] = None
-                                
-                                # Check if job_card_no exists
-                                job_card_no = clean_item.get("job_card_no") or clean_item.get("JOB CARD NO")
-                                if not job_card_no:
-                                    continue
-                                    
-                                existing = supabase.table("mro_job_tracker")\
-                                    .select("id")\
-                                    .eq("job_card_no", str(job_card_no))\
-                                    .execute()
-                                    
-                                if existing.data:
-                                    supabase.table("mro_job_tracker")\
-                                        .update(clean_item)\
-                                        .eq("job_card_no", str(job_card_no))\
-                                        .execute()
-                                else:
-                                    supabase.table("mro_job_tracker")\
-                                        .insert(clean_item)\
-                                        .execute()
-                                chunk_inserted += 1
-                                
-                            except Exception as e:
-                                logger.warning(f"Skipping row due to error: {str(e)}")
-                                logger.debug(f"Problematic row data: {item}")
-                                continue
-                                
-                        inserted_count += chunk_inserted
-                        
-                except Exception as e:
-                    logger.error(f"Error processing CSV: {str(e)}")
-                    raise
-                    
-            else:  # Excel
-                try:
-                    logger.info(f"Reading Excel file from {temp_path}")
-                    # Define expected column names
-                    column_names = [
-                        "DATE DELIVERED", "CUSTOMER", "DESCRIPTION", "PART NUMBER",
-                        "SERIAL NUMBER", "DATE DELIVERED", "JOB CARD NO", "RO NUMBER",
-                        "DATE RECEIVED", "QTY", "DATE SENT", "DATE RETURNED",
-                        "INVOICE NUMBER", "DATE CLOSED", "STATUS"
-                    ]
-                    
-                    # Read Excel with explicit column names
-                    df = pd.read_excel(temp_path, header=None, names=column_names, skiprows=1)
-                    logger.info(f"Excel file read successfully with {len(df)} rows")
-                    logger.info(f"Excel columns: {list(df.columns)}")
-                    logger.info(f"First row data: {df.iloc[0].to_dict() if len(df) > 0 else 'No data'}")
-                    logger.debug(f"First row: {df.iloc[0].to_dict() if len(df) > 0 else 'No data'}")
-                    
-                    if len(df) == 0:
-                        raise ValueError("Uploaded file contains no data")
-                    
-                    # Process in smaller batches
-                    batch_size = 50
-                    logger.info(f"Processing in batches of {batch_size}")
-                    total_batches = (len(df) + batch_size - 1) // batch_size
-                    
-                    for batch_num in range(total_batches):
-                        start_idx = batch_num * batch_size
-                        end_idx = min((batch_num + 1) * batch_size, len(df))
-                        
-                        batch = df.iloc[start_idx:end_idx]
-                        data = batch.to_dict('records')
-                        
-                        logger.debug(f"Processing batch {batch_num + 1}/{total_batches} with {len(data)} rows")
-                        total_rows += len(data)
-                        
-                        # Process batch
-                        batch_inserted = 0
-                        for item in data:
-                            try:
-                                # Clean and validate data
-                                clean_item = {}
-                                for k, v in item.items():
-                                    if pd.notna(v):
-                                        # Convert datetime objects to strings
-                                        if hasattr(v, 'isoformat'):
-                                            clean_item[k] = v.isoformat()
-                                        else:
-                                            clean_item[k] = str(v)
-                                    else:
-                                        clean_item[k] = None
-                                
-                                # Map column names (handle different formats)
-                                mapped_item = {}
-                                mapping_log = []
-                                for k, v in clean_item.items():
-                                    key_lower = str(k).lower().strip()
-                                    new_key = None
-                                    
-                                    if 'job' in key_lower and 'card' in key_lower:
-                                        new_key = 'job_card_no'
-                                    elif 'customer' in key_lower:
-                                        new_key = 'customer'
-                                    elif 'part' in key_lower and 'number' in key_lower:
-                                        new_key = 'part_number'
-                                    elif 'description' in key_lower:
-                                        new_key = 'description'
-                                    elif 'serial' in key_lower:
-                                        new_key = 'serial_number'
-                                    elif 'date' in key_lower and 'delivered' in key_lower:
-                                        new_key = 'date_delivered'
-                                    elif 'work' in key_lower and 'requested' in key_lower:
-                                        new_key = 'work_requested'
-                                    elif 'progress' in key_lower:
-                                        new_key = 'progress'
-                                    elif 'location' in key_lower:
-                                        new_key = 'location'
-                                    elif 'expected' in key_lower and 'release' in key_lower:
-                                        new_key = 'expected_release_date'
-                                    elif 'remarks' in key_lower:
-                                        new_key = 'remarks'
-                                    elif 'category' in key_lower:
-                                        new_key = 'category'
-                                    else:
-                                        new_key = k
-                                    
-                                    mapped_item[new_key] = v
-                                    mapping_log.append(f"{k} -> {new_key}")
-                                
-                                logger.info(f"Mapped columns: {', '.join(mapping_log)}")
-                                
-                                job_card_no = mapped_item.get('job_card_no')
-                                if not job_card_no:
-                                    continue
-                                    
-                                # Check existing
-                                existing = supabase.table("mro_job_tracker")\
-                                    .select("id")\
-                                    .eq("job_card_no", str(job_card_no))\
-                                    .execute()
-                                    
-                                if existing.data:
-                                    result = supabase.table("mro_job_tracker")\
-                                        .update(mapped_item)\
-                                        .eq("job_card_no", str(job_card_no))\
-                                        .execute()
-                                    logger.debug(f"Updated item {job_card_no}: {result}")
-                                else:
-                                    result = supabase.table("mro_job_tracker")\
-                                        .insert(mapped_item)\
-                                        .execute()
-                                    logger.debug(f"Inserted new item {job_card_no}: {result}")
-                                        
-                                batch_inserted += 1
-                                
-                            except Exception as e:
-                                logger.warning(f"Skipping row due to error: {str(e)}")
-                                continue
-                                
-                        inserted_count += batch_inserted
-                        
-                except Exception as e:
-                    logger.error(f"Error processing Excel: {str(e)}")
-                    raise
-                    
-        except Exception as e:
+            result = await _run_upload("mro_job_tracker", staged)
+            if not result["rows_read"]:
+                raise PipelineInputError("Uploaded file contains no data")
+        except PipelineInputError as e:
             logger.error(f"Error processing file: {str(e)}")
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
             return JSONResponse(
-                status_code=400,
+                status_code=413 if isinstance(e.__cause__, UploadTooLarge) else 400,
                 content={
                     "message": "Failed to process file",
                     "error": str(e),
@@ -836,23 +1291,22 @@ async def upload_job_tracker_data(request: Request, file: UploadFile = File(...)
                 headers=cors_headers
             )
         
-        # Clean up temp file
-        os.remove(temp_path)
+        summary = _job_tracker_summary(result)
+        # Files with rows that failed to write stay re-uploadable
+        if not result["failed"]:
+            await asyncio.to_thread(
+                upload_ledger.record, "mro_job_tracker", staged.sha256, staged.filename, staged.size, summary
+            )
         
         return JSONResponse(
             status_code=200,
-            content={
-                "message": "Upload processed",
-                "total_items": total_rows,
-                "inserted_count": inserted_count,
-                "error_count": total_rows - inserted_count
-            },
+            content=summary,
             headers=cors_headers
         )
+    except (CircuitOpen, PoolSaturated, ParseTimeout):
+        raise
     except Exception as e:
         logger.error(f"Error uploading job tracker data: {str(e)}")
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
         return JSONResponse(
             status_code=500,
             content={
@@ -862,17 +1316,329 @@ async def upload_job_tracker_data(request: Request, file: UploadFile = File(...)
             },
             headers=cors_headers
         )
+    finally:
+        # Clean up staged file
+        if staged:
+            staged.cleanup()
 
-@app.post("/api/run-seed")
-def run_seed():
+# Resumable job tracker uploads: POST init -> PUT each chunk -> POST complete.
+# Chunk state lives on disk so any worker can take any request.
+CHUNKED_UPLOAD_COMPLETE_WAIT = float(os.getenv("CHUNKED_UPLOAD_COMPLETE_WAIT", 60))
+
+# Ingestions of chunked uploads running in this worker
+chunked_ingests: Dict[str, asyncio.Task] = {}
+
+async def _ingest_chunked(upload: ChunkedUpload) -> None:
+    """Ingest a chunked upload and store the response for complete to return"""
+    staged = None
     try:
-        load_inventory()
-        load_orders()
-        load_mro_data()
-        return {"message": "Seed data loaded successfully"}
+        if upload.extension == 'csv':
+            # Parses chunks as they arrive, waiting for the ones still in flight
+            result = await _run_upload("mro_job_tracker", upload)
+        else:
+            staged = await asyncio.to_thread(upload.assemble)
+            mismatch = upload.checksum_mismatch()
+            if mismatch:
+                # Caught before any row is written
+                logger.error(f"Chunked upload {upload.upload_id} rejected: {mismatch}")
+                upload.save_result(422, {"detail": mismatch, "success": False})
+                return
+            result = await _run_upload("mro_job_tracker", staged)
+        if not result["rows_read"]:
+            raise PipelineInputError("Uploaded file contains no data")
+    except PipelineInputError as e:
+        if isinstance(e.__cause__, ChunkTimeout):
+            # Not the file's fault; resending the chunk or calling complete starts over
+            logger.error(f"Chunked upload {upload.upload_id} stalled: {str(e)}")
+            upload.release_ingest()
+            return
+        logger.error(f"Error processing chunked upload {upload.upload_id}: {str(e)}")
+        upload.save_result(400, {"message": "Failed to process file", "error": str(e), "success": False})
+        return
+    except ParseTimeout as e:
+        logger.error(f"Chunked upload {upload.upload_id} timed out: {str(e)}")
+        upload.save_result(504, {"detail": "Processing the upload took too long", "success": False})
+        return
+    except Exception as e:
+        logger.error(f"Error ingesting chunked upload {upload.upload_id}: {str(e)}")
+        upload.release_ingest()
+        return
+    finally:
+        if staged:
+            staged.cleanup()
+    
+    summary = _job_tracker_summary(result)
+    mismatch = upload.checksum_mismatch()
+    if mismatch:
+        # CSV rows are written as they stream in, so the hash is only known afterwards;
+        # report what was applied, and keep it out of the ledger under either hash
+        logger.error(f"Chunked upload {upload.upload_id} did not match its declared hash: {mismatch}")
+        upload.save_result(422, {**summary, "message": "Upload did not match its declared SHA-256",
+                                 "detail": mismatch, "success": False})
+        return
+    if not result["failed"]:
+        await asyncio.to_thread(
+            upload_ledger.record, "mro_job_tracker", upload.sha256, upload.filename, upload.size, summary
+        )
+    upload.save_result(200, summary)
+    logger.info(f"Chunked upload {upload.upload_id} ingested: {summary}")
+
+def _start_chunked_ingest(upload: ChunkedUpload) -> Optional[asyncio.Task]:
+    """Start ingesting in this worker unless it already runs here or in another worker"""
+    if upload.upload_id in chunked_ingests:
+        return chunked_ingests[upload.upload_id]
+    if upload.result() or not upload.claim_ingest():
+        return None
+    task = asyncio.create_task(_ingest_chunked(upload))
+    chunked_ingests[upload.upload_id] = task
+    task.add_done_callback(lambda done: chunked_ingests.pop(upload.upload_id, None))
+    return task
+
+def _chunked_upload_or_404(upload_id: str) -> ChunkedUpload:
+    upload = ChunkedUpload.load(upload_id)
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return upload
+
+@app.post("/api/mro/job-tracker/uploads")
+async def init_chunked_job_tracker_upload(init: ChunkedUploadInit):
+    """Start a resumable job tracker upload"""
+    if init.sha256:
+        prior = await asyncio.to_thread(upload_ledger.lookup, "mro_job_tracker", init.sha256.lower())
+        if prior:
+            logger.info(f"Upload {init.filename} already applied, returning previous summary")
+            return {**prior, "duplicate": True}
+    try:
+        upload = await asyncio.to_thread(ChunkedUpload.create, init.filename, init.size, init.sha256, init.chunk_size)
+    except UploadTooLarge as e:
+        return JSONResponse(status_code=413, content={"detail": str(e), "success": False},
+                            headers={"Access-Control-Allow-Origin": "*"})
+    except ChunkRejected as e:
+        return JSONResponse(status_code=e.status, content={"detail": str(e), "success": False},
+                            headers={"Access-Control-Allow-Origin": "*"})
+    base = f"/api/mro/job-tracker/uploads/{upload.upload_id}"
+    return {
+        "upload_id": upload.upload_id,
+        "chunk_size": upload.chunk_size,
+        "chunk_count": upload.chunk_count,
+        "chunk_url": base + "/chunks/{index}",
+        "complete_url": base + "/complete"
+    }
+
+@app.put("/api/mro/job-tracker/uploads/{upload_id}/chunks/{index}")
+async def put_job_tracker_chunk(upload_id: str, index: int, request: Request):
+    """Store one chunk, verified against its X-Chunk-SHA256 header; resending a stored chunk is a no-op"""
+    upload = _chunked_upload_or_404(upload_id)
+    if upload.result():
+        raise HTTPException(status_code=409, detail="Upload already completed")
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > CHUNKED_UPLOAD_MAX_CHUNK_SIZE:
+        raise HTTPException(status_code=413, detail="Chunk too large")
+    data = await request.body()
+    try:
+        stored = await asyncio.to_thread(upload.put_chunk, index, data, request.headers.get("x-chunk-sha256"))
+    except ChunkRejected as e:
+        return JSONResponse(status_code=e.status, content={"detail": str(e), "success": False},
+                            headers={"Access-Control-Allow-Origin": "*"})
+    # CSV ingestion starts with the first chunk and follows the rest as they arrive
+    if upload.extension == 'csv' and index == 0:
+        _start_chunked_ingest(upload)
+    received = await asyncio.to_thread(upload.received)
+    return {"upload_id": upload_id, "index": index, "stored": stored,
+            "received": len(received), "chunk_count": upload.chunk_count}
+
+@app.get("/api/mro/job-tracker/uploads/{upload_id}")
+async def get_chunked_job_tracker_upload(upload_id: str):
+    """Chunks still missing (to resume) and, once ingested, the upload result"""
+    upload = _chunked_upload_or_404(upload_id)
+    return await asyncio.to_thread(upload.status)
+
+@app.post("/api/mro/job-tracker/uploads/{upload_id}/complete")
+async def complete_chunked_job_tracker_upload(upload_id: str):
+    """Finish a chunked upload: ingest it (or wait for the running ingestion) and return the summary"""
+    upload = _chunked_upload_or_404(upload_id)
+    result = upload.result()
+    if not result:
+        missing = await asyncio.to_thread(upload.missing)
+        if missing:
+            return JSONResponse(
+                status_code=409,
+                content={"detail": "Upload is missing chunks", "missing": missing[:100], "success": False},
+                headers={"Access-Control-Allow-Origin": "*"}
+            )
+        task = _start_chunked_ingest(upload)
+        deadline = time.monotonic() + CHUNKED_UPLOAD_COMPLETE_WAIT
+        while (result := upload.result()) is None and upload.ingesting():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                # Still ingesting; poll the status URL for the result
+                return JSONResponse(
+                    status_code=202,
+                    content={**upload.status(), "status_url": f"/api/mro/job-tracker/uploads/{upload_id}"},
+                    headers={"Access-Control-Allow-Origin": "*"}
+                )
+            if task:
+                await asyncio.wait({task}, timeout=remaining)
+            else:
+                # Ingesting in another worker
+                await asyncio.sleep(min(0.5, remaining))
+        if result is None:
+            raise HTTPException(status_code=503, detail="Ingestion did not finish, call complete again to retry")
+    return JSONResponse(status_code=result["status"], content=result["content"],
+                        headers={"Access-Control-Allow-Origin": "*"})
+
+@app.post("/api/mro/job-tracker/fingerprints/rebuild")
+async def rebuild_job_tracker_fingerprints():
+    """Rebuild the job tracker fingerprint index from the table"""
+    try:
+        count = await asyncio.to_thread(job_tracker_fingerprints.rebuild, supabase)
+        return {"message": "Fingerprint index rebuilt", "rows_indexed": count}
+    except Exception as e:
+        logger.error(f"Error rebuilding fingerprint index: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/upload/rejected/{upload_id}")
+async def download_rejected_rows(upload_id: str):
+    """Download the rows an upload rejected, with their reasons, as CSV"""
+    upload = await asyncio.to_thread(rejected_rows.upload, upload_id)
+    if not upload:
+        raise HTTPException(status_code=404, detail="No rejected rows stored for this upload")
+    content = await asyncio.to_thread(rejected_rows.to_csv, upload_id)
+    return Response(
+        content=content,
+        media_type="text/csv",
+        headers={
+            "Content-Disposition": f'attachment; filename="{upload["target"]}_rejected_{upload_id[:8]}.csv"',
+            "Access-Control-Allow-Origin": "*"
+        }
+    )
+
+def _replay_rows(upload_id: str, file_bytes: Optional[bytes]) -> pd.DataFrame:
+    """Stored rejected rows of an upload, with corrections from an edited download applied by row"""
+    data = {entry["row"]: entry["data"] for entry in rejected_rows.rows(upload_id)}
+    if file_bytes:
+        corrections = pd.read_csv(io.BytesIO(file_bytes), dtype=str, keep_default_na=False)
+        if "row" not in corrections.columns:
+            raise ValueError("Corrected file must keep the row column of the download")
+        corrections = corrections.drop(columns=["reasons"], errors="ignore")
+        for correction in corrections.to_dict('records'):
+            row = int(correction.pop("row"))
+            if row in data:
+                data[row] = {k: (v if v != "" else None) for k, v in correction.items()}
+    rows = pd.DataFrame.from_dict(data, orient="index")
+    return rows.sort_index()
+
+@app.post("/api/upload/rejected/{upload_id}/replay")
+async def replay_rejected_rows(upload_id: str, file: Optional[UploadFile] = File(None)):
+    """Run an upload's rejected rows through ingestion again, optionally corrected by an edited download"""
+    upload = await asyncio.to_thread(rejected_rows.upload, upload_id)
+    if not upload:
+        raise HTTPException(status_code=404, detail="No rejected rows stored for this upload")
+    file_bytes = await file.read() if file else None
+    try:
+        rows = await asyncio.to_thread(_replay_rows, upload_id, file_bytes)
+    except (ValueError, pd.errors.ParserError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if rows.empty:
+        return {"success": True, "upload_id": upload_id, "replayed": 0, "count": 0, "remaining": 0}
+    
+    pipeline, _ = _upload_pipeline(upload["target"], upload["kind"])
+    source = (rows.iloc[i:i + INGEST_BATCH_SIZE] for i in range(0, len(rows), INGEST_BATCH_SIZE))
+    try:
+        result = await pipeline.run(source)
+    except (CircuitOpen, PoolSaturated, ParseTimeout):
+        raise
+    except Exception as e:
+        logger.error(f"Error replaying rejected rows of upload {upload_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    # Rows that got through are done; the rest keep their latest data and reasons
+    await asyncio.to_thread(_store_rejected, upload_id, upload["target"], upload["kind"], upload["filename"], result)
+    await asyncio.to_thread(rejected_rows.resolve, upload_id, [row for row in rows.index if row not in result["rejected"]])
+    logger.info(f"Replayed {len(rows)} rejected rows of upload {upload_id}, {result['rows_rejected']} still rejected")
+    return {
+        "success": True,
+        "upload_id": upload_id,
+        "replayed": len(rows),
+        "count": result["written"],
+        "remaining": result["rows_rejected"],
+        **_rejections(result)
+    }
+
+@app.get("/api/dead-letters")
+async def get_dead_letters(table: Optional[str] = None, limit: int = 100):
+    """Rows whose writes failed after retries, oldest first"""
+    entries = await asyncio.to_thread(dead_letters.entries)
+    if table:
+        entries = [e for e in entries if e["table"] == table]
+    return {"count": len(entries), "entries": entries[:max(0, limit)]}
+
+@app.post("/api/dead-letters/replay")
+async def replay_dead_letters(table: Optional[str] = None):
+    """Write dead-lettered rows again; rows that fail once more stay dead-lettered"""
+    try:
+        result = await asyncio.to_thread(dead_letters.replay, supabase, table)
+    except CircuitOpen:
+        raise
+    except Exception as e:
+        logger.error(f"Error replaying dead letters: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    rows = result.pop("rows")
+    mro_service.notify_changed(rows.get("mro_items", []))
+    search_index.upsert("mro_job_tracker", rows.get("mro_job_tracker", []))
+    if rows.get("mro_job_tracker"):
+        await asyncio.to_thread(upload_ledger.forget, "mro_job_tracker")
+    for table_rows in rows.values():
+        autocomplete.add(table_rows)
+    logger.info(f"Replayed {result['replayed']} dead-lettered rows, {result['remaining']} remain")
+    return result
+
+# Progress of the current or last seeding run, shared by all workers through STATE_DIR
+seed_progress = SeedProgress(state_path("seed_progress.json"))
+
+async def _run_seed_in_background(force: bool):
+    try:
+        await asyncio.to_thread(run_seed_job, supabase, seed_progress, force)
+        logger.info("Seed data loaded successfully")
     except Exception as e:
         logger.error(f"Error loading seed data: {str(e)}")
-        return {"error": str(e)}
+        if seed_progress.running:
+            # Failed before the run could finish itself; free the lock for the next one
+            seed_progress.finish()
+
+@app.post("/api/run-seed")
+async def run_seed(force: bool = False):
+    """Start seeding in the background; poll GET /api/run-seed for progress"""
+    if not seed_progress.claim():
+        return JSONResponse(status_code=409, content={"message": "Seeding already running", **seed_progress.as_dict()})
+    # Mark the run started before the task is scheduled so concurrent requests see it
+    seed_progress.start()
+    app.state.seed_task = asyncio.create_task(_run_seed_in_background(force))
+    return JSONResponse(status_code=202, content={"message": "Seeding started", **seed_progress.as_dict()})
+
+@app.get("/api/run-seed")
+async def seed_status():
+    return seed_progress.as_dict()
+
+@app.get("/api/run-seed/stream")
+async def seed_progress_stream():
+    """Stream seeding progress as newline-delimited JSON until the run finishes"""
+    async def events():
+        version = None
+        while True:
+            if seed_progress.version != version:
+                version = seed_progress.version
+                state = seed_progress.as_dict()
+                yield json.dumps(state) + "\n"
+                if not state["running"]:
+                    return
+            await asyncio.sleep(0.25)
+
+    return StreamingResponse(
+        events(),
+        media_type="application/x-ndjson",
+        headers={"Access-Control-Allow-Origin": "*", "Cache-Control": "no-cache"}
+    )
 
 @app.get("/")
 def root():
@@ -900,10 +1666,29 @@ async def health_options():
         }
     )
 
+@app.get("/api/metrics")
+async def get_metrics():
+    """Admission, ingest pipeline, parse pool, write batching, database resilience and workbook cache metrics"""
+    return {
+        "admission": admission.metrics(),
+        "ingest": ingest_metrics.as_dict(),
+        "parse_pool": {
+            "workers": parse_pool.max_workers,
+            "max_queue": parse_pool.max_queue,
+            "pending": parse_pool.pending
+        },
+        "batching": batch_metrics(),
+        "resilience": {**supabase.policy.as_dict(), "dead_letters": len(dead_letters)},
+        "workbook_cache": mro_service.workbook_cache.as_dict()
+    }
+
 @app.get("/api/mro/job-tracker")
 async def get_job_tracker():
     try:
-        response = supabase.table("mro_job_tracker").select("*").execute()
+        replica_response = await _replica_response("mro_job_tracker")
+        if replica_response:
+            return replica_response
+        response = await asyncio.to_thread(supabase.table("mro_job_tracker").select("*").execute)
         return response.data if response and hasattr(response, 'data') else []
     except Exception as e:
         logger.error(f"Error fetching job tracker data: {str(e)}")
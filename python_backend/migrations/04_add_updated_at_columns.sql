@@ -0,0 +1,34 @@
+-- Add server-maintained updated_at columns to inventory and orders; the
+-- local replica pulls rows changed since its last sync by this column
+ALTER TABLE inventory
+ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP;
+
+ALTER TABLE orders
+ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP;
+
+CREATE INDEX IF NOT EXISTS idx_inventory_updated_at ON inventory(updated_at);
+CREATE INDEX IF NOT EXISTS idx_orders_updated_at ON orders(updated_at);
+
+-- Create trigger for updating the updated_at timestamp
+CREATE OR REPLACE FUNCTION update_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS update_inventory_updated_at ON inventory;
+CREATE TRIGGER update_inventory_updated_at
+    BEFORE UPDATE ON inventory
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at();
+
+DROP TRIGGER IF EXISTS update_orders_updated_at ON orders;
+CREATE TRIGGER update_orders_updated_at
+    BEFORE UPDATE ON orders
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at();
+
+COMMENT ON COLUMN inventory.updated_at IS 'Set by the database on every insert and update';
+COMMENT ON COLUMN orders.updated_at IS 'Set by the database on every insert and update';
@@ -1,179 +1,443 @@
 import os
+import sys
+import json
+import fcntl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 import pandas as pd
+from typing import Callable, Dict, List, Optional, Set, Tuple
 from supabase import create_client, Client
+from services.date_parsing import parse_date_column
+from services.fingerprint_index import normalize_value
+from services.batch_controller import batch_controller
+from services.query_filters import in_
+from services.resilience import ResilientClient
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INVENTORY_PATH = os.path.join(BASE_DIR, 'examples', 'sample_inventory.csv')
+ORDERS_PATH = os.path.join(BASE_DIR, 'examples', 'sample_orders.csv')
+MRO_PATH = os.path.join(BASE_DIR, 'data', 'mro_tracking.xlsx')
+
+# Keys per existence lookup, keeps the in.(...) filter within URL length limits
+LOOKUP_CHUNK_SIZE = 200
+
 def init_supabase():
     url = os.getenv("SUPABASE_URL")
     key = os.getenv("SUPABASE_KEY")
     if not url or not key:
         raise ValueError("Missing Supabase credentials")
-    return create_client(url, key)
+    return ResilientClient(create_client(url, key))
 
-def load_inventory():
-    try:
-        logger.info("Starting inventory data load")
-        supabase = init_supabase()
+class SeedProgress:
+    """Thread-safe per-table progress of a seeding run.
 
-        # Read sample inventory data
-        sample_path = os.path.join('examples', 'sample_inventory.csv')
-        if not os.path.exists(sample_path):
-            logger.error(f"Sample inventory file not found at {sample_path}")
-            return
+    With a path, the run is shared by every worker of an instance: claim()
+    takes an exclusive lock on path + ".lock" for the whole run, each change
+    is written to path as a JSON snapshot, and other workers report that
+    snapshot. The lock is a POSIX record lock, which forked children do not
+    inherit and the OS drops if the seeding process dies, so a stale snapshot
+    is never reported as running.
+    """
 
-        df = pd.read_csv(sample_path)
-        logger.info(f"Read {len(df)} rows from sample inventory")
+    def __init__(self, path: Optional[str] = None):
+        self._lock = threading.Lock()
+        self._tables: Dict[str, Dict] = {}
+        self.started_at = None
+        self.finished_at = None
+        # Bumped on every change so streams can tell when to emit
+        self._version = 0
+        self.listeners: List[Callable[[str, Dict], None]] = []
+        self.path = path
+        self._lock_fd: Optional[int] = None
 
-        # Process each row
-        for _, row in df.iterrows():
+    def claim(self) -> bool:
+        """Take the run lock, False if a seed is already running in any worker"""
+        if self.path is None:
+            return not self.running
+        with self._lock:
+            if self._lock_fd is not None:
+                return False
+            fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
             try:
-                item = {
-                    "part_number": str(row["Part Number"]),
-                    "name": str(row["Name"]),
-                    "category": str(row["Category"]),
-                    "in_stock": int(row["In Stock"]),
-                    "min_required": int(row["Min Required"]),
-                    "on_order": int(row["On Order"]),
-                    "last_updated": str(row["Last Updated"])
-                }
-
-                # Check if part already exists
-                existing = supabase.table("inventory").select("part_number").eq("part_number", item["part_number"]).execute()
-                
-                if len(existing.data) > 0:
-                    logger.info(f"Updating existing part: {item['part_number']}")
-                    result = supabase.table("inventory").update(item).eq("part_number", item["part_number"]).execute()
-                else:
-                    logger.info(f"Inserting new part: {item['part_number']}")
-                    result = supabase.table("inventory").insert(item).execute()
+                fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+            self._lock_fd = fd
+            return True
 
-                logger.debug(f"Database operation result: {result}")
+    def _release(self) -> None:
+        with self._lock:
+            if self._lock_fd is not None:
+                os.close(self._lock_fd)
+                self._lock_fd = None
 
-            except Exception as e:
-                logger.error(f"Error processing inventory item {row['Part Number']}: {str(e)}")
-                continue
+    def _locked_elsewhere(self) -> bool:
+        try:
+            fd = os.open(self.path + ".lock", os.O_RDWR)
+        except FileNotFoundError:
+            return False
+        try:
+            fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return True
+        finally:
+            os.close(fd)
+        return False
 
-        logger.info("Finished loading inventory data")
+    def _persist(self) -> None:
+        # Called with self._lock held; readers only ever see a complete snapshot
+        if self.path is None:
+            return
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": self._version, **self._snapshot()}, f)
+        os.replace(tmp, self.path)
 
-    except Exception as e:
-        logger.error(f"Error in load_inventory: {str(e)}")
-        raise
+    def _load(self) -> Dict:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {"version": 0, "running": False, "started_at": None, "finished_at": None, "tables": {}}
 
-def load_orders():
-    try:
-        logger.info("Starting orders data load")
-        supabase = init_supabase()
+    def _owner(self) -> bool:
+        return self.path is None or self._lock_fd is not None
 
-        # Read sample orders data
-        sample_path = os.path.join('examples', 'sample_orders.csv')
-        if not os.path.exists(sample_path):
-            logger.error(f"Sample orders file not found at {sample_path}")
-            return
+    def start(self, tables: List[str] = ()):
+        with self._lock:
+            self._tables = {}
+            self.started_at = time.time()
+            self.finished_at = None
+            self._version += 1
+            self._persist()
+        for table in tables:
+            self.update(table)
 
-        df = pd.read_csv(sample_path)
-        logger.info(f"Read {len(df)} rows from sample orders")
+    def finish(self):
+        with self._lock:
+            self.finished_at = time.time()
+            self._version += 1
+            self._persist()
+        self._release()
 
-        # Process each row
-        for _, row in df.iterrows():
-            try:
-                order = {
-                    "order_number": str(row["Order Number"]),
-                    "part_number": str(row["Part Number"]),
-                    "part_name": str(row["Part Name"]),
-                    "quantity": int(row["Quantity"]),
-                    "status": str(row["Status"]),
-                    "order_date": str(row["Order Date"]),
-                    "expected_delivery": str(row["Expected Delivery"]),
-                    "supplier": str(row["Supplier"])
-                }
-
-                # Check if order already exists
-                existing = supabase.table("orders").select("order_number").eq("order_number", order["order_number"]).execute()
-                
-                if len(existing.data) > 0:
-                    logger.info(f"Updating existing order: {order['order_number']}")
-                    result = supabase.table("orders").update(order).eq("order_number", order["order_number"]).execute()
+    def update(self, table: str, **fields):
+        with self._lock:
+            state = self._tables.setdefault(table, {
+                "status": "pending", "total": 0, "written": 0, "unchanged": 0, "failed": 0, "error": None
+            })
+            for key, value in fields.items():
+                if key in ("written", "unchanged", "failed"):
+                    state[key] += value
                 else:
-                    logger.info(f"Inserting new order: {order['order_number']}")
-                    result = supabase.table("orders").insert(order).execute()
+                    state[key] = value
+            self._version += 1
+            self._persist()
+            snapshot = dict(state)
+        for listener in self.listeners:
+            listener(table, snapshot)
 
-                logger.debug(f"Database operation result: {result}")
+    @property
+    def version(self) -> int:
+        return self._version if self._owner() else self._load()["version"]
 
-            except Exception as e:
-                logger.error(f"Error processing order {row['Order Number']}: {str(e)}")
-                continue
+    @property
+    def running(self) -> bool:
+        if self._owner():
+            return self.started_at is not None and self.finished_at is None
+        return self._load()["running"] and self._locked_elsewhere()
 
-        logger.info("Finished loading orders data")
+    def _snapshot(self) -> Dict:
+        return {
+            "running": self.started_at is not None and self.finished_at is None,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "tables": {name: dict(state) for name, state in self._tables.items()},
+        }
 
-    except Exception as e:
-        logger.error(f"Error in load_orders: {str(e)}")
-        raise
+    def as_dict(self) -> Dict:
+        if not self._owner():
+            state = self._load()
+            state.pop("version")
+            # A run whose process died left its snapshot behind but no lock
+            state["running"] = state["running"] and self._locked_elsewhere()
+            return state
+        with self._lock:
+            return self._snapshot()
 
-def load_mro_data():
-    try:
-        logger.info("Starting MRO data load")
-        supabase = init_supabase()
-        
-        # Read MRO tracking data from Excel file
-        excel_path = os.path.join('data', 'mro_tracking.xlsx')
-        if not os.path.exists(excel_path):
-            logger.error(f"MRO tracking file not found at {excel_path}")
+def _dates(series: pd.Series) -> pd.Series:
+    """ISO dates where parseable, original text otherwise"""
+    parsed, _ = parse_date_column(series)
+    return parsed.where(parsed.notna(), series.astype(str))
+
+def _records(frame: pd.DataFrame) -> List[Dict]:
+    return frame.astype(object).where(frame.notna(), None).to_dict('records')
+
+def build_inventory_records(df: pd.DataFrame) -> List[Dict]:
+    """Typed inventory rows built column-wise from the sample CSV"""
+    return _records(pd.DataFrame({
+        "part_number": df["Part Number"].astype(str),
+        "name": df["Name"].astype(str),
+        "category": df["Category"].astype(str),
+        "in_stock": df["In Stock"].astype(int),
+        "min_required": df["Min Required"].astype(int),
+        "on_order": df["On Order"].astype(int),
+        "last_updated": _dates(df["Last Updated"]),
+    }))
+
+def build_order_records(df: pd.DataFrame) -> List[Dict]:
+    """Typed order rows built column-wise from the sample CSV"""
+    return _records(pd.DataFrame({
+        "order_number": df["Order Number"].astype(str),
+        "part_number": df["Part Number"].astype(str),
+        "part_name": df["Part Name"].astype(str),
+        "quantity": df["Quantity"].astype(int),
+        "status": df["Status"].astype(str),
+        "order_date": _dates(df["Order Date"]),
+        "expected_delivery": _dates(df["Expected Delivery"]),
+        "supplier": df["Supplier"].astype(str),
+    }))
+
+def build_mro_records(xls: pd.ExcelFile) -> List[Dict]:
+    """MRO rows of every sheet with a serial number, categorized by sheet name"""
+    records = []
+    for sheet_name in xls.sheet_names:
+        df = pd.read_excel(xls, sheet_name=sheet_name)
+        df.columns = [str(col).strip().lower().replace(' ', '_') for col in df.columns]
+        logger.info(f"Read {len(df)} rows from sheet: {sheet_name}")
+        if 'serial_number' not in df.columns:
+            continue
+
+        for col in df.columns:
+            if pd.api.types.is_datetime64_any_dtype(df[col]):
+                df[col] = df[col].dt.strftime('%Y-%m-%d')
+        # Add category from sheet name
+        df['category'] = sheet_name
+        df = df[df['serial_number'].notna() & (df['serial_number'].astype(str).str.strip() != '')]
+        records.extend(_records(df))
+    return records
+
+def _dedupe(records: List[Dict], key: str) -> List[Dict]:
+    # One row per key, the last one wins, as the per-row updates did
+    return list({str(r[key]): r for r in records}.values())
+
+def _existing_rows(supabase: Client, table: str, key: str, keys: List[str]) -> Dict[str, Dict]:
+    """Rows the table already holds for the given keys, looked up in chunks"""
+    existing = {}
+    for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+        response = in_(supabase.table(table).select("*"), key, keys[start:start + LOOKUP_CHUNK_SIZE]).execute()
+        existing.update((str(r[key]), r) for r in (response.data or []))
+    return existing
+
+def _same(record: Dict, row: Dict) -> bool:
+    return all(normalize_value(value) == normalize_value(row.get(field)) for field, value in record.items())
+
+def _changed(supabase: Client, table: str, key: str, records: List[Dict],
+             progress: SeedProgress, force: bool) -> Tuple[List[Dict], Set[str]]:
+    """Records that differ from the table's rows, and the keys the table already has
+
+    Compared against the database itself, so a reset database is seeded again
+    and rows edited since the last seed are put back.
+    """
+    existing = _existing_rows(supabase, table, key, [str(r[key]) for r in records])
+    changed = records if force else [
+        r for r in records if str(r[key]) not in existing or not _same(r, existing[str(r[key])])
+    ]
+    progress.update(table, total=len(records), unchanged=len(records) - len(changed))
+    return changed, set(existing)
+
+def _upsert_records(supabase: Client, table: str, key: str, records: List[Dict],
+                    progress: SeedProgress, force: bool) -> int:
+    """Bulk upsert rows on their unique key, skipping rows the table already holds unchanged"""
+    records = _dedupe(records, key)
+    changed, _ = _changed(supabase, table, key, records, progress, force)
+    written = 0
+    send = lambda batch: supabase.table(table).upsert(batch, on_conflict=key).execute()
+    for batch, _, error in batch_controller(table).write(changed, send):
+        if error:
+            logger.error(f"Error upserting {len(batch)} {table} rows: {str(error)}")
+            progress.update(table, failed=len(batch), error=str(error))
+            continue
+        written += len(batch)
+        progress.update(table, written=len(batch))
+    return written
+
+def _write_mro_records(supabase: Client, records: List[Dict], progress: SeedProgress, force: bool) -> int:
+    """Bulk insert new serial numbers and update changed existing ones.
+
+    mro_items has no unique constraint on serial_number, so existing serials
+    are looked up in chunks instead of relying on ON CONFLICT.
+    """
+    table = "mro_items"
+    records = _dedupe(records, "serial_number")
+    changed, existing = _changed(supabase, table, "serial_number", records, progress, force)
+
+    written = 0
+    inserts = [r for r in changed if str(r["serial_number"]) not in existing]
+    send = lambda batch: supabase.table(table).insert(batch).execute()
+    for batch, _, error in batch_controller(table).write(inserts, send):
+        if error:
+            logger.error(f"Error inserting {len(batch)} MRO rows: {str(error)}")
+            progress.update(table, failed=len(batch), error=str(error))
+            continue
+        written += len(batch)
+        progress.update(table, written=len(batch))
+
+    for item in (r for r in changed if str(r["serial_number"]) in existing):
+        try:
+            supabase.table(table).update(item).eq("serial_number", item["serial_number"]).execute()
+        except Exception as e:
+            logger.error(f"Error updating MRO item {item['serial_number']}: {str(e)}")
+            progress.update(table, failed=1, error=str(e))
+            continue
+        written += 1
+        progress.update(table, written=1)
+    return written
+
+def _seed_file(table: str, path: str, build, write, supabase: Optional[Client],
+               progress: Optional[SeedProgress], force: bool) -> None:
+    progress = progress or SeedProgress()
+    if not os.path.exists(path):
+        logger.error(f"Seed file for {table} not found at {path}")
+        progress.update(table, status="missing")
+        return
+
+    progress.update(table, status="running")
+    supabase = supabase or init_supabase()
+    records = build(path)
+    logger.info(f"Built {len(records)} {table} records")
+    written = write(supabase, records, progress, force)
+    state = progress.as_dict()["tables"][table]
+    if state["failed"]:
+        status = "failed"
+    else:
+        status = "unchanged" if state["unchanged"] == state["total"] else "done"
+    progress.update(table, status=status)
+    logger.info(f"Finished loading {table}: {written} written, {state['unchanged']} unchanged, {state['failed']} failed")
+
+def load_inventory(supabase: Optional[Client] = None, progress: Optional[SeedProgress] = None, force: bool = False):
+    logger.info("Starting inventory data load")
+    _seed_file(
+        "inventory", INVENTORY_PATH,
+        lambda path: build_inventory_records(pd.read_csv(path)),
+        lambda sb, records, p, f: _upsert_records(sb, "inventory", "part_number", records, p, f),
+        supabase, progress, force
+    )
+
+def load_orders(supabase: Optional[Client] = None, progress: Optional[SeedProgress] = None, force: bool = False):
+    logger.info("Starting orders data load")
+    _seed_file(
+        "orders", ORDERS_PATH,
+        lambda path: build_order_records(pd.read_csv(path)),
+        lambda sb, records, p, f: _upsert_records(sb, "orders", "order_number", records, p, f),
+        supabase, progress, force
+    )
+
+def load_mro_data(supabase: Optional[Client] = None, progress: Optional[SeedProgress] = None, force: bool = False):
+    logger.info("Starting MRO data load")
+    _seed_file(
+        "mro_items", MRO_PATH,
+        lambda path: build_mro_records(pd.ExcelFile(path)),
+        _write_mro_records,
+        supabase, progress, force
+    )
+
+# Table -> (loader, tables it depends on); orders.part_number references inventory
+SEED_TASKS = {
+    "inventory": (load_inventory, ()),
+    "orders": (load_orders, ("inventory",)),
+    "mro_items": (load_mro_data, ()),
+}
+
+def _seed_order(tasks: Dict) -> List[str]:
+    """Topological order of the seed tasks, rejecting unknown dependencies and cycles"""
+    order, visiting, done = [], set(), set()
+
+    def visit(name):
+        if name in done:
             return
+        if name in visiting:
+            raise ValueError(f"Seed dependency cycle at {name}")
+        if name not in tasks:
+            raise ValueError(f"Unknown seed dependency: {name}")
+        visiting.add(name)
+        for dependency in tasks[name][1]:
+            visit(dependency)
+        visiting.discard(name)
+        done.add(name)
+        order.append(name)
 
-        xls = pd.ExcelFile(excel_path)
-        for sheet_name in xls.sheet_names:
-            df = pd.read_excel(xls, sheet_name=sheet_name)
-            df.columns = [col.strip().lower().replace(' ', '_') for col in df.columns]
-            
-            # Add category from sheet name
-            df['category'] = sheet_name
-            
-            logger.info(f"Read {len(df)} rows from sheet: {sheet_name}")
-
-            # Process each row
-            for _, row in df.iterrows():
-                try:
-                    item = row.to_dict()
-                    
-                    # Clean and format data
-                    for key, value in item.items():
-                        if isinstance(value, pd.Timestamp):
-                            item[key] = value.strftime('%Y-%m-%d')
-                        elif pd.isna(value):
-                            item[key] = None
-                    
-                    # Check if item already exists
-                    if 'serial_number' in item and item['serial_number']:
-                        existing = supabase.table("mro_items").select("serial_number").eq("serial_number", item["serial_number"]).execute()
-                        
-                        if len(existing.data) > 0:
-                            logger.info(f"Updating existing MRO item: {item['serial_number']}")
-                            result = supabase.table("mro_items").update(item).eq("serial_number", item["serial_number"]).execute()
-                        else:
-                            logger.info(f"Inserting new MRO item: {item['serial_number']}")
-                            result = supabase.table("mro_items").insert(item).execute()
-                    
-                        logger.debug(f"Database operation result: {result}")
-
-                except Exception as e:
-                    logger.error(f"Error processing MRO item row: {str(e)}")
-                    continue
-        
-        logger.info("Finished loading MRO data")
+    for name in tasks:
+        visit(name)
+    return order
 
-    except Exception as e:
-        logger.error(f"Error in load_mro_data: {str(e)}")
-        raise
+def run_seed(supabase: Optional[Client] = None, progress: Optional[SeedProgress] = None,
+             force: bool = False, tasks: Dict = None, max_workers: int = 3):
+    """Seed all tables, running every load as soon as the loads it depends on have succeeded"""
+    tasks = tasks or SEED_TASKS
+    order = _seed_order(tasks)
+    progress = progress or SeedProgress()
+    progress.start(order)
+
+    succeeded, finished = set(), set()
+    running = {}
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="seed") as pool:
+            while len(finished) < len(order):
+                for name in order:
+                    if name in finished or name in running.values():
+                        continue
+                    dependencies = tasks[name][1]
+                    blocked = [d for d in dependencies if d in finished and d not in succeeded]
+                    if blocked:
+                        logger.error(f"Skipping {name}: dependency {', '.join(blocked)} failed")
+                        progress.update(name, status="blocked", error=f"Dependency failed: {', '.join(blocked)}")
+                        finished.add(name)
+                    elif all(d in succeeded for d in dependencies):
+                        running[pool.submit(tasks[name][0], supabase, progress, force)] = name
+
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    finished.add(name)
+                    try:
+                        future.result()
+                    except Exception as e:
+                        logger.error(f"Error seeding {name}: {str(e)}")
+                        progress.update(name, status="failed", error=str(e))
+                        continue
+                    if progress.as_dict()["tables"][name]["status"] != "failed":
+                        succeeded.add(name)
+    finally:
+        progress.finish()
+    return progress.as_dict()
 
 if __name__ == "__main__":
     try:
-        load_inventory()
-        load_orders()
-        load_mro_data()
+        progress = SeedProgress()
+        # Stream status changes as they happen; row counts are summarized at the end
+        last_status = {}
+        def report(table, state):
+            if last_status.get(table) != state["status"]:
+                last_status[table] = state["status"]
+                print(f"{table}: {state['status']}", flush=True)
+        progress.listeners.append(report)
+
+        result = run_seed(progress=progress, force="--force" in sys.argv)
+        for name, state in result["tables"].items():
+            print(f"{name}: {state['status']} ({state['written']} written, "
+                  f"{state['unchanged']} unchanged, {state['failed']} failed)")
+        if any(state["status"] in ("failed", "blocked") for state in result["tables"].values()):
+            print("Seeding finished with errors")
+            exit(1)
         print("Seed data loaded successfully")
     except Exception as e:
         print(f"Error loading seed data: {str(e)}")
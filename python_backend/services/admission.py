@@ -0,0 +1,136 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Dict, Optional
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionPool:
+    """Concurrency limit with a bounded wait for one class of endpoints"""
+
+    def __init__(self, name: str, limit: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(limit)
+        self.active = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._total_wait = 0.0
+
+    async def acquire(self) -> bool:
+        """Wait up to queue_timeout for a slot; return False if none became free"""
+        started = time.monotonic()
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            return False
+        finally:
+            self.queued -= 1
+        self.active += 1
+        self.admitted += 1
+        self._total_wait += time.monotonic() - started
+        return True
+
+    def release(self) -> None:
+        self.active -= 1
+        self._semaphore.release()
+
+    def metrics(self) -> Dict:
+        return {
+            "limit": self.limit,
+            "queue_timeout": self.queue_timeout,
+            "active": self.active,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self._total_wait / self.admitted * 1000, 2) if self.admitted else 0.0
+        }
+
+
+def _pool_from_env(name: str, limit: int, queue_timeout: float) -> AdmissionPool:
+    prefix = f"ADMISSION_{name.upper()}"
+    return AdmissionPool(
+        name,
+        int(os.getenv(f"{prefix}_LIMIT", limit)),
+        float(os.getenv(f"{prefix}_QUEUE_TIMEOUT", queue_timeout))
+    )
+
+
+class AdmissionController:
+    """Routes each request to the concurrency pool of its endpoint class"""
+
+    INGEST = "ingest"
+    EXPORT = "export"
+    READ = "read"
+
+    # POST endpoints that parse files or write many rows
+    INGEST_PREFIXES = (
+        "/api/upload/",
+        "/api/mro/upload",
+        "/api/mro/job-tracker/upload",
+        "/api/mro/job-tracker/fingerprints",
+        "/api/run-seed",
+        "/api/dead-letters/replay",
+    )
+    # Chunk PUTs of resumable uploads only spool bytes to disk
+    CHUNK_PREFIX = "/api/mro/job-tracker/uploads/"
+    # GET endpoints that return whole tables
+    EXPORT_PATHS = (
+        "/api/mro/items",
+        "/api/mro/job-tracker",
+    )
+    # Never throttled so load balancer checks keep passing
+    EXEMPT_PATHS = ("/", "/health")
+
+    def __init__(self):
+        self.pools = {
+            self.INGEST: _pool_from_env(self.INGEST, limit=2, queue_timeout=2.0),
+            self.EXPORT: _pool_from_env(self.EXPORT, limit=4, queue_timeout=5.0),
+            self.READ: _pool_from_env(self.READ, limit=32, queue_timeout=10.0),
+        }
+
+    def classify(self, method: str, path: str) -> Optional[str]:
+        if method == "OPTIONS" or path in self.EXEMPT_PATHS:
+            return None
+        if method == "PUT" and path.startswith(self.CHUNK_PREFIX):
+            return self.READ
+        if method != "GET" and path.startswith(self.INGEST_PREFIXES):
+            return self.INGEST
+        if method == "GET" and path in self.EXPORT_PATHS:
+            return self.EXPORT
+        return self.READ
+
+    async def __call__(self, request: Request, call_next):
+        pool_name = self.classify(request.method, request.url.path)
+        if pool_name is None:
+            return await call_next(request)
+
+        pool = self.pools[pool_name]
+        if not await pool.acquire():
+            logger.warning(f"Rejected {request.method} {request.url.path}: {pool_name} pool saturated")
+            return JSONResponse(
+                status_code=429,
+                content={"detail": f"Too many concurrent {pool_name} requests", "success": False},
+                headers={
+                    "Retry-After": str(max(1, round(pool.queue_timeout))),
+                    "Access-Control-Allow-Origin": "*"
+                }
+            )
+        try:
+            return await call_next(request)
+        finally:
+            pool.release()
+
+    def metrics(self) -> Dict:
+        return {name: pool.metrics() for name, pool in self.pools.items()}
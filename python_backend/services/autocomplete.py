@@ -0,0 +1,135 @@
+import heapq
+import logging
+import threading
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, List, Tuple
+from supabase import Client
+
+logger = logging.getLogger(__name__)
+
+# Suggested field -> tables whose distinct values feed it
+FIELD_SOURCES = {
+    "customer": ("mro_items", "mro_job_tracker"),
+    "part_number": ("mro_items", "mro_job_tracker", "inventory"),
+    "location": ("mro_items", "mro_job_tracker"),
+}
+
+# Prefixes this short match a large slice of the array, so their top suggestions are precomputed
+PRECOMPUTED_PREFIX_LENGTH = 1
+MAX_SUGGESTIONS = 20
+
+
+class _FieldIndex:
+    """Case-folded sorted array of distinct values with their frequencies"""
+
+    def __init__(self, counts: Counter):
+        # Most frequent spelling wins when values differ only in case or spacing
+        spellings: Dict[str, Tuple[int, str]] = {}
+        folded = Counter()
+        for value, count in counts.items():
+            key = value.casefold()
+            folded[key] += count
+            if count > spellings.get(key, (0, ""))[0]:
+                spellings[key] = (count, value)
+        self.keys = sorted(folded)
+        self.values = [spellings[k][1] for k in self.keys]
+        self.counts = [folded[k] for k in self.keys]
+        self._top: Dict[str, List[Tuple[str, int]]] = {}
+        for length in range(PRECOMPUTED_PREFIX_LENGTH + 1):
+            for prefix in {k[:length] for k in self.keys}:
+                self._top[prefix] = self._scan(prefix, MAX_SUGGESTIONS)
+
+    def _scan(self, prefix: str, limit: int) -> List[Tuple[str, int]]:
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + "\U0010ffff", start)
+        best = heapq.nsmallest(limit, range(start, end), key=lambda i: (-self.counts[i], self.keys[i]))
+        return [(self.values[i], self.counts[i]) for i in best]
+
+    def suggest(self, prefix: str, limit: int) -> List[Tuple[str, int]]:
+        prefix = prefix.casefold()
+        if prefix in self._top:
+            return self._top[prefix][:limit]
+        return self._scan(prefix, limit)
+
+    def contains(self, value: str) -> bool:
+        key = value.casefold()
+        i = bisect_left(self.keys, key)
+        return i < len(self.keys) and self.keys[i] == key
+
+    def insert(self, value: str, count: int = 1) -> None:
+        key = value.casefold()
+        i = bisect_left(self.keys, key)
+        self.keys.insert(i, key)
+        self.values.insert(i, value)
+        self.counts.insert(i, count)
+        for length in range(PRECOMPUTED_PREFIX_LENGTH + 1):
+            top = self._top.get(key[:length], []) + [(value, count)]
+            top.sort(key=lambda entry: (-entry[1], entry[0].casefold()))
+            self._top[key[:length]] = top[:MAX_SUGGESTIONS]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+class Autocomplete:
+    """Frequency-ranked prefix suggestions for form fields, rebuilt from distinct table values"""
+
+    def __init__(self, supabase: Client, page_size: int = 1000):
+        self.supabase = supabase
+        self.page_size = page_size
+        self._lock = threading.Lock()
+        self._fields: Dict[str, _FieldIndex] = {field: _FieldIndex(Counter()) for field in FIELD_SOURCES}
+
+    def _scan_table(self, table: str, fields: List[str]) -> List[Dict]:
+        rows = []
+        start = 0
+        while True:
+            response = self.supabase.table(table)\
+                .select(",".join(fields))\
+                .order("id")\
+                .range(start, start + self.page_size - 1)\
+                .execute()
+            page = response.data if response and hasattr(response, 'data') else []
+            rows.extend(page)
+            if len(page) < self.page_size:
+                return rows
+            start += self.page_size
+
+    def rebuild(self) -> Dict[str, int]:
+        """Recount value frequencies with one paged scan per source table"""
+        tables: Dict[str, List[str]] = {}
+        for field, sources in FIELD_SOURCES.items():
+            for table in sources:
+                tables.setdefault(table, []).append(field)
+
+        counts = {field: Counter() for field in FIELD_SOURCES}
+        for table, fields in tables.items():
+            for row in self._scan_table(table, fields):
+                for field in fields:
+                    value = str(row.get(field) or "").strip()
+                    if value:
+                        counts[field][value] += 1
+
+        fresh = {field: _FieldIndex(c) for field, c in counts.items()}
+        with self._lock:
+            self._fields = fresh
+        sizes = {field: len(index) for field, index in fresh.items()}
+        logger.info(f"Rebuilt autocomplete index: {sizes}")
+        return sizes
+
+    def add(self, rows: List[Dict]) -> None:
+        """Make values from new writes suggestible before the next rebuild"""
+        with self._lock:
+            for field, index in self._fields.items():
+                for row in rows:
+                    value = str(row.get(field) or "").strip()
+                    if value and not index.contains(value):
+                        index.insert(value)
+
+    def suggest(self, field: str, prefix: str, limit: int = 10) -> List[Dict]:
+        if field not in FIELD_SOURCES:
+            raise ValueError(f"Unknown autocomplete field: {field}")
+        with self._lock:
+            suggestions = self._fields[field].suggest(prefix, min(limit, MAX_SUGGESTIONS))
+        return [{"value": value, "count": count} for value, count in suggestions]
@@ -0,0 +1,169 @@
+"""Byte- and latency-sized batching for bulk writes to Supabase.
+
+One controller per table is shared by every writer in the process (upload
+pipelines, MROService, seeding), so what one writer learns about request
+size limits and round-trip times applies to the others.
+"""
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from services.resilience import CircuitOpen, is_oversized
+
+logger = logging.getLogger(__name__)
+
+BATCH_TARGET_BYTES = int(os.getenv("BATCH_TARGET_BYTES", 256 * 1024))
+BATCH_MAX_BYTES = int(os.getenv("BATCH_MAX_BYTES", 2 * 1024 * 1024))
+BATCH_MIN_BYTES = 8 * 1024
+BATCH_MAX_ROWS = int(os.getenv("BATCH_MAX_ROWS", 5000))
+# Round trips faster than this grow the target, slower ones shrink it
+BATCH_FAST_SECONDS = float(os.getenv("BATCH_FAST_SECONDS", 1.0))
+BATCH_SLOW_SECONDS = float(os.getenv("BATCH_SLOW_SECONDS", 5.0))
+
+GROW_FACTOR = 1.5
+SHRINK_FACTOR = 0.5
+
+
+def row_bytes(row: Dict) -> int:
+    """Size of a row in the JSON request body"""
+    return len(json.dumps(row, default=str)) + 1
+
+
+class BatchController:
+    """Cuts records into batches of about target_bytes and adapts the target.
+
+    - a round trip under fast_seconds for a full batch grows the target
+    - a round trip over slow_seconds shrinks it
+    - a 413 halves the target, caps growth below the failed size
+      and splits the failed batch in two before retrying it
+    """
+
+    def __init__(self, name: str, target_bytes: int = BATCH_TARGET_BYTES, max_bytes: int = BATCH_MAX_BYTES,
+                 min_bytes: int = BATCH_MIN_BYTES, max_rows: int = BATCH_MAX_ROWS,
+                 fast_seconds: float = BATCH_FAST_SECONDS, slow_seconds: float = BATCH_SLOW_SECONDS):
+        self.name = name
+        self.min_bytes = min_bytes
+        self.max_bytes = max(max_bytes, min_bytes)
+        self.target_bytes = min(max(target_bytes, min_bytes), self.max_bytes)
+        self.max_rows = max_rows
+        self.fast_seconds = fast_seconds
+        self.slow_seconds = slow_seconds
+        # Smallest body size that was rejected as too large
+        self.ceiling: Optional[int] = None
+        self.rtt: Optional[float] = None
+        self.counts = {"batches": 0, "rows": 0, "bytes": 0, "grows": 0, "shrinks": 0, "splits": 0, "errors": 0}
+        self.decisions = deque(maxlen=20)
+        self._lock = threading.Lock()
+
+    def _decide(self, action: str, reason: str) -> None:
+        self.counts[action + "s"] += 1
+        self.decisions.append({
+            "at": round(time.time(), 3), "action": action, "target_bytes": self.target_bytes, "reason": reason
+        })
+        logger.debug(f"Batch controller {self.name}: {action} to {self.target_bytes} bytes ({reason})")
+
+    def _sized(self, records: List[Dict]) -> List[Tuple[Dict, int]]:
+        return [(record, row_bytes(record)) for record in records]
+
+    def _cut(self, sized: List[Tuple[Dict, int]]) -> List[List[Tuple[Dict, int]]]:
+        with self._lock:
+            target = self.target_bytes
+        batches, batch, size = [], [], 0
+        for record, nbytes in sized:
+            if batch and (size + nbytes > target or len(batch) >= self.max_rows):
+                batches.append(batch)
+                batch, size = [], 0
+            batch.append((record, nbytes))
+            size += nbytes
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def split(self, records: List[Dict]) -> List[List[Dict]]:
+        """Cut records into batches of the current target size"""
+        return [[record for record, _ in batch] for batch in self._cut(self._sized(records))]
+
+    def observe(self, nbytes: int, rows: int, seconds: float) -> None:
+        """Feed back a successful round trip"""
+        with self._lock:
+            self.rtt = seconds if self.rtt is None else 0.8 * self.rtt + 0.2 * seconds
+            self.counts["batches"] += 1
+            self.counts["rows"] += rows
+            self.counts["bytes"] += nbytes
+            if seconds > self.slow_seconds and self.target_bytes > self.min_bytes:
+                self.target_bytes = max(self.min_bytes, int(self.target_bytes * SHRINK_FACTOR))
+                self._decide("shrink", f"{seconds:.2f}s round trip")
+            elif seconds < self.fast_seconds and nbytes >= 0.8 * self.target_bytes:
+                limit = self.max_bytes if self.ceiling is None else min(self.max_bytes, int(self.ceiling * 0.8))
+                if self.target_bytes < limit:
+                    self.target_bytes = min(limit, int(self.target_bytes * GROW_FACTOR))
+                    self._decide("grow", f"{seconds:.2f}s round trip")
+
+    def reject(self, nbytes: int, exc: Exception) -> None:
+        """Feed back a batch that was too large"""
+        with self._lock:
+            self.ceiling = nbytes if self.ceiling is None else min(self.ceiling, nbytes)
+            self.target_bytes = max(self.min_bytes, int(min(self.target_bytes, nbytes) * SHRINK_FACTOR))
+            self._decide("split", f"{type(exc).__name__} at {nbytes} bytes")
+
+    def write(self, records: List[Dict], send: Callable[[List[Dict]], Any]) -> Iterator[Tuple[List[Dict], Any, Optional[Exception]]]:
+        """Send records in adaptive batches, yielding (batch, result, error) per request that settled.
+
+        Batches rejected as too large (413) are split and retried; other
+        errors, including timeouts the retry policy gave up on, are yielded
+        for the caller to handle. An open circuit
+        breaker aborts the whole write.
+        """
+        pending = self._cut(self._sized(records))
+        while pending:
+            batch = pending.pop(0)
+            rows = [record for record, _ in batch]
+            nbytes = sum(size for _, size in batch)
+            started = time.perf_counter()
+            try:
+                result = send(rows)
+            except CircuitOpen:
+                raise
+            except Exception as e:
+                if is_oversized(e) and len(batch) > 1:
+                    self.reject(nbytes, e)
+                    middle = len(batch) // 2
+                    pending[:0] = [batch[:middle], batch[middle:]]
+                    continue
+                with self._lock:
+                    self.counts["errors"] += 1
+                yield rows, None, e
+                continue
+            self.observe(nbytes, len(rows), time.perf_counter() - started)
+            yield rows, result, None
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "target_bytes": self.target_bytes,
+                "ceiling_bytes": self.ceiling,
+                "rtt_ms": round(self.rtt * 1000, 1) if self.rtt is not None else None,
+                **self.counts,
+                "recent_decisions": list(self.decisions),
+            }
+
+
+_controllers: Dict[str, BatchController] = {}
+_controllers_lock = threading.Lock()
+
+
+def batch_controller(table: str) -> BatchController:
+    """The process-wide controller for writes to a table"""
+    with _controllers_lock:
+        if table not in _controllers:
+            _controllers[table] = BatchController(table)
+        return _controllers[table]
+
+
+def batch_metrics() -> Dict[str, Dict]:
+    with _controllers_lock:
+        controllers = list(_controllers.values())
+    return {controller.name: controller.as_dict() for controller in controllers}
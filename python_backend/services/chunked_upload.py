@@ -0,0 +1,313 @@
+"""Resumable chunked uploads: init -> PUT chunk n -> complete.
+
+Each upload gets a directory under UPLOAD_TMP_DIR holding an immutable
+manifest and one file per verified chunk, so chunks may arrive at any
+gunicorn worker, in any order, and be resent after a dropped connection.
+CSV uploads can be read as a stream that waits for chunks still in flight,
+so ingestion starts before the last chunk arrives.
+"""
+import io
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import logging
+from typing import Dict, Iterator, List, Optional
+import pandas as pd
+from services.upload_staging import (
+    UPLOAD_TMP_DIR, READ_CHUNK_SIZE, WRITE_BUFFER_SIZE, StagedUpload, StreamingTextReader, UploadTooLarge
+)
+
+logger = logging.getLogger(__name__)
+
+CHUNKED_UPLOAD_DIR = os.path.join(UPLOAD_TMP_DIR, "chunked")
+CHUNKED_UPLOAD_CHUNK_SIZE = int(os.getenv("CHUNKED_UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024))
+CHUNKED_UPLOAD_MAX_CHUNK_SIZE = 32 * 1024 * 1024
+CHUNKED_UPLOAD_MAX_BYTES = int(os.getenv("CHUNKED_UPLOAD_MAX_BYTES", 2 * 1024 * 1024 * 1024))
+# How long a streaming read waits for the next chunk before giving up
+CHUNKED_UPLOAD_CHUNK_TIMEOUT = float(os.getenv("CHUNKED_UPLOAD_CHUNK_TIMEOUT", 600))
+# Unfinished uploads and finished results are dropped after a day
+CHUNKED_UPLOAD_TTL = 24 * 3600
+
+CHUNK_POLL_SECONDS = 0.2
+
+
+class ChunkRejected(ValueError):
+    """A chunk or upload request that cannot be accepted; status is the HTTP status to answer with"""
+
+    def __init__(self, message: str, status: int = 400):
+        self.status = status
+        super().__init__(message)
+
+
+class ChunkTimeout(ValueError):
+    """A streaming read waited too long for a chunk that never arrived"""
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    # Readers only ever see complete files
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class _ChunkStream(io.RawIOBase):
+    """Reads the chunks of an upload in order, waiting for ones not received yet"""
+
+    def __init__(self, upload: "ChunkedUpload", wait_seconds: float):
+        self._upload = upload
+        self._wait_seconds = wait_seconds
+        self._index = 0
+        self._file = None
+        self._digest = hashlib.sha256()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while True:
+            if self._file is None:
+                if self._index >= self._upload.chunk_count:
+                    return 0
+                self._file = open(self._upload.wait_for_chunk(self._index, self._wait_seconds), "rb")
+            count = self._file.readinto(buffer)
+            if count:
+                self._digest.update(memoryview(buffer)[:count])
+                return count
+            self._file.close()
+            self._file = None
+            self._index += 1
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        super().close()
+
+    @property
+    def sha256(self) -> str:
+        return self._digest.hexdigest()
+
+
+class ChunkedUpload:
+    """One resumable upload: manifest.json plus a file per received chunk"""
+
+    def __init__(self, upload_id: str, manifest: Dict):
+        self.upload_id = upload_id
+        self.path = os.path.join(CHUNKED_UPLOAD_DIR, upload_id)
+        self.filename = manifest["filename"]
+        self.size = manifest["size"]
+        self.chunk_size = manifest["chunk_size"]
+        self.chunk_count = manifest["chunk_count"]
+        # Declared by the client at init; the streamed or assembled content sets the verified one
+        self.declared_sha256 = manifest.get("sha256")
+        self.sha256: Optional[str] = None
+        self.created_at = manifest["created_at"]
+
+    @property
+    def extension(self) -> str:
+        return self.filename.split('.')[-1].lower() if '.' in self.filename else ''
+
+    @classmethod
+    def create(cls, filename: str, size: int, sha256: Optional[str] = None,
+               chunk_size: Optional[int] = None) -> "ChunkedUpload":
+        if not filename:
+            raise ChunkRejected("filename is required")
+        if size <= 0:
+            raise ChunkRejected("size must be positive")
+        if size > CHUNKED_UPLOAD_MAX_BYTES:
+            raise UploadTooLarge(size, CHUNKED_UPLOAD_MAX_BYTES)
+        chunk_size = chunk_size or CHUNKED_UPLOAD_CHUNK_SIZE
+        if not 0 < chunk_size <= CHUNKED_UPLOAD_MAX_CHUNK_SIZE:
+            raise ChunkRejected(f"chunk_size must be between 1 and {CHUNKED_UPLOAD_MAX_CHUNK_SIZE} bytes")
+        _expire_uploads()
+        upload_id = uuid.uuid4().hex
+        manifest = {
+            "filename": os.path.basename(filename),
+            "size": size,
+            "chunk_size": chunk_size,
+            "chunk_count": -(-size // chunk_size),
+            "sha256": sha256.lower() if sha256 else None,
+            "created_at": time.time(),
+        }
+        upload = cls(upload_id, manifest)
+        os.makedirs(upload.path)
+        _write_atomic(os.path.join(upload.path, "manifest.json"), json.dumps(manifest).encode())
+        logger.info(f"Started chunked upload {upload_id}: {filename}, {size} bytes in {upload.chunk_count} chunks")
+        return upload
+
+    @classmethod
+    def load(cls, upload_id: str) -> Optional["ChunkedUpload"]:
+        # Ids are uuid hex; anything else never names an upload directory
+        if len(upload_id) != 32 or not all(c in "0123456789abcdef" for c in upload_id):
+            return None
+        try:
+            with open(os.path.join(CHUNKED_UPLOAD_DIR, upload_id, "manifest.json")) as f:
+                return cls(upload_id, json.load(f))
+        except FileNotFoundError:
+            return None
+
+    def chunk_path(self, index: int) -> str:
+        return os.path.join(self.path, f"{index:06d}.part")
+
+    def expected_length(self, index: int) -> int:
+        if index == self.chunk_count - 1:
+            return self.size - self.chunk_size * index
+        return self.chunk_size
+
+    def received(self) -> List[int]:
+        return [i for i in range(self.chunk_count) if os.path.exists(self.chunk_path(i))]
+
+    def missing(self) -> List[int]:
+        return [i for i in range(self.chunk_count) if not os.path.exists(self.chunk_path(i))]
+
+    def put_chunk(self, index: int, data: bytes, checksum: Optional[str]) -> bool:
+        """Verify and store chunk index; returns False if the same chunk was already stored"""
+        if not 0 <= index < self.chunk_count:
+            raise ChunkRejected(f"Chunk index must be between 0 and {self.chunk_count - 1}")
+        if not checksum:
+            raise ChunkRejected("X-Chunk-SHA256 header is required")
+        expected = self.expected_length(index)
+        if len(data) != expected:
+            raise ChunkRejected(f"Chunk {index} must be {expected} bytes, got {len(data)}")
+        digest = hashlib.sha256(data).hexdigest()
+        if digest != checksum.lower():
+            raise ChunkRejected(f"Checksum mismatch for chunk {index}", status=422)
+        path = self.chunk_path(index)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                if hashlib.sha256(f.read()).hexdigest() != digest:
+                    raise ChunkRejected(f"Chunk {index} was already received with different content", status=409)
+            return False
+        _write_atomic(path, data)
+        return True
+
+    def wait_for_chunk(self, index: int, timeout: float) -> str:
+        """Path of chunk index once it has arrived"""
+        path = self.chunk_path(index)
+        deadline = time.monotonic() + timeout
+        while not os.path.exists(path):
+            if time.monotonic() > deadline:
+                raise ChunkTimeout(f"Chunk {index} of upload {self.upload_id} did not arrive within {timeout:.0f}s")
+            self._heartbeat()
+            time.sleep(CHUNK_POLL_SECONDS)
+        self._heartbeat()
+        return path
+
+    def iter_csv_chunks(self, chunksize: int, **kwargs) -> Iterator[pd.DataFrame]:
+        """Parse the upload as CSV while its chunks are still arriving"""
+        with _ChunkStream(self, CHUNKED_UPLOAD_CHUNK_TIMEOUT) as stream:
+            for chunk in pd.read_csv(StreamingTextReader(stream.read), chunksize=chunksize, **kwargs):
+                yield chunk
+            # The parser may stop before EOF on trailing blank lines; hash the whole upload
+            while stream.read(READ_CHUNK_SIZE):
+                pass
+            self.sha256 = stream.sha256
+
+    def assemble(self) -> StagedUpload:
+        """Concatenate the received chunks into a staged upload for formats that need the whole file"""
+        missing = self.missing()
+        if missing:
+            raise ChunkRejected(f"Missing chunks: {missing[:20]}", status=409)
+        os.makedirs(UPLOAD_TMP_DIR, exist_ok=True)
+        path = os.path.join(UPLOAD_TMP_DIR, f"upload_{self.upload_id}.{self.extension}")
+        digest = hashlib.sha256()
+        with open(path, "wb", buffering=WRITE_BUFFER_SIZE) as out:
+            for index in range(self.chunk_count):
+                with open(self.chunk_path(index), "rb") as f:
+                    while block := f.read(READ_CHUNK_SIZE):
+                        digest.update(block)
+                        out.write(block)
+        self.sha256 = digest.hexdigest()
+        return StagedUpload(path, self.filename, self.size, self.sha256)
+
+    def checksum_mismatch(self) -> Optional[str]:
+        """Error message if the whole-file hash computed while reading differs from the declared one"""
+        if self.declared_sha256 and self.sha256 and self.sha256 != self.declared_sha256:
+            return f"Upload content has SHA-256 {self.sha256}, but {self.declared_sha256} was declared"
+        return None
+
+    def claim_ingest(self, stale_after: float = CHUNKED_UPLOAD_CHUNK_TIMEOUT * 2) -> bool:
+        """Claim ingestion for this worker; a claim whose worker went quiet can be taken over"""
+        claim = os.path.join(self.path, "ingest.claim")
+        try:
+            os.close(os.open(claim, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            pass
+        try:
+            if time.time() - os.path.getmtime(claim) < stale_after:
+                return False
+        except FileNotFoundError:
+            pass
+        logger.warning(f"Taking over stale ingestion of chunked upload {self.upload_id}")
+        _write_atomic(claim, b"")
+        return True
+
+    def release_ingest(self) -> None:
+        try:
+            os.remove(os.path.join(self.path, "ingest.claim"))
+        except FileNotFoundError:
+            pass
+
+    def ingesting(self) -> bool:
+        return os.path.exists(os.path.join(self.path, "ingest.claim"))
+
+    def _heartbeat(self) -> None:
+        try:
+            os.utime(os.path.join(self.path, "ingest.claim"))
+        except FileNotFoundError:
+            pass
+
+    def save_result(self, status: int, content: Dict) -> None:
+        """Store the final response of the upload and drop its chunks"""
+        _write_atomic(os.path.join(self.path, "result.json"),
+                      json.dumps({"status": status, "content": content}, default=str).encode())
+        for index in self.received():
+            os.remove(self.chunk_path(index))
+
+    def result(self) -> Optional[Dict]:
+        try:
+            with open(os.path.join(self.path, "result.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def status(self) -> Dict:
+        result = self.result()
+        if result:
+            state = "done"
+        elif self.ingesting():
+            state = "ingesting"
+        else:
+            state = "receiving"
+        received = set(self.received() if not result else range(self.chunk_count))
+        return {
+            "upload_id": self.upload_id,
+            "filename": self.filename,
+            "size": self.size,
+            "chunk_size": self.chunk_size,
+            "chunk_count": self.chunk_count,
+            "received": len(received),
+            "missing": [i for i in range(self.chunk_count) if i not in received],
+            "state": state,
+            **({"result": result["content"], "result_status": result["status"]} if result else {}),
+        }
+
+
+def _expire_uploads() -> None:
+    if not os.path.isdir(CHUNKED_UPLOAD_DIR):
+        os.makedirs(CHUNKED_UPLOAD_DIR, exist_ok=True)
+        return
+    cutoff = time.time() - CHUNKED_UPLOAD_TTL
+    for name in os.listdir(CHUNKED_UPLOAD_DIR):
+        path = os.path.join(CHUNKED_UPLOAD_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path)
+                logger.info(f"Removed expired chunked upload {name}")
+        except OSError:
+            pass
@@ -0,0 +1,162 @@
+"""Date parsing for uploaded columns and single form values.
+
+Columns get their format inferred once from a sample and are then parsed
+vectorized over their distinct values only; single values go through a
+memoized parser that tries the same candidate formats.
+"""
+import logging
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Tried in order; month-first wins over day-first for ambiguous values like 05/06/2025,
+# matching the sample inventory (5/24/2025)
+DATE_FORMATS = (
+    "%Y-%m-%d",
+    "%Y/%m/%d",
+    "%m/%d/%Y",
+    "%d/%m/%Y",
+    "%m/%d/%y",
+    "%d-%m-%Y",
+    "%d.%m.%Y",
+    "%d-%b-%Y",
+    "%d %b %Y",
+    "%b %d, %Y",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+)
+
+SAMPLE_SIZE = 200
+# Share of sampled distinct values a format must parse for the column to count as dates;
+# columns named like dates only need a majority
+MIN_MATCH_RATIO = 0.9
+NAMED_MIN_MATCH_RATIO = 0.5
+
+_EMPTY = {"", "nan", "nat", "none", "null"}
+
+
+@lru_cache(maxsize=8192)
+def parse_date(value: str) -> Optional[date]:
+    """Parse one date string with the candidate formats, None if none of them match"""
+    value = value.strip()
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def text_codes(series: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """Factorize a column into (codes, cleaned distinct values).
+
+    Cleaning (str, strip, blanks to None) runs once per distinct value. The
+    values array ends with None, which code -1 (missing cells) indexes.
+    """
+    codes, uniques = pd.factorize(series)
+    cleaned = [str(value).strip() for value in uniques]
+    # Every blank marker is at most four characters long
+    cleaned = [None if len(text) <= 4 and text.lower() in _EMPTY else text for text in cleaned]
+    cleaned.append(None)
+    return codes, np.array(cleaned, dtype=object)
+
+
+def _text(series: pd.Series) -> pd.Series:
+    codes, values = text_codes(series)
+    return pd.Series(values[codes], index=series.index, dtype=object)
+
+
+def infer_format(series: pd.Series, sample_size: int = SAMPLE_SIZE,
+                 min_ratio: float = MIN_MATCH_RATIO) -> Optional[str]:
+    """Pick the candidate format that parses the most distinct sampled values"""
+    sample = _text(series).dropna().drop_duplicates().head(sample_size)
+    if sample.empty:
+        return None
+    best, best_count = None, 0
+    for fmt in DATE_FORMATS:
+        count = int(pd.to_datetime(sample, format=fmt, errors="coerce").notna().sum())
+        if count > best_count:
+            best, best_count = fmt, count
+            if count == len(sample):
+                break
+    return best if best_count >= min_ratio * len(sample) else None
+
+
+def parse_date_column(series: pd.Series, fmt: Optional[str] = None) -> Tuple[pd.Series, pd.Series]:
+    """Parse a column to ISO date strings.
+
+    Returns (parsed, bad) where parsed holds YYYY-MM-DD strings or None and
+    bad marks non-empty cells that could not be parsed. Datetime columns read
+    by pandas are formatted directly; each distinct string is parsed once.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        parsed = series.dt.strftime("%Y-%m-%d").astype(object)
+        return parsed.where(series.notna(), None), pd.Series(False, index=series.index)
+
+    codes, values = text_codes(series)
+    present = pd.Series(values[:-1]).dropna()
+    if fmt is None:
+        fmt = infer_format(present)
+    if fmt:
+        converted = pd.to_datetime(present, format=fmt, errors="coerce")
+    else:
+        converted = pd.Series(pd.NaT, index=present.index, dtype="datetime64[ns]")
+    iso = converted.dt.strftime("%Y-%m-%d").astype(object)
+    # Cells off the column format (mixed spreadsheets, Excel datetimes) fall back to per-value parsing
+    for i in iso.index[converted.isna()]:
+        parsed = parse_date(present[i])
+        iso[i] = parsed.isoformat() if parsed else None
+
+    # Distinct values map to their ISO date; blanks and code -1 map to None
+    lookup = np.full(len(values), None, dtype=object)
+    lookup[iso.index.to_numpy()] = iso.to_numpy(dtype=object)
+    blank = np.array([v is None for v in values])
+    parsed = pd.Series(lookup[codes], index=series.index, dtype=object)
+    bad = pd.Series(~blank[codes], index=series.index) & parsed.isna()
+    return parsed, bad
+
+
+def parse_date_columns(df: pd.DataFrame, columns: List[str],
+                       formats: Optional[Dict[str, Optional[str]]] = None) -> Tuple[pd.DataFrame, List[Dict]]:
+    """Parse several date columns of a frame in place and report unparseable cells in bulk.
+
+    formats caches the inferred format per column so chunked readers infer it only once.
+    """
+    formats = {} if formats is None else formats
+    errors = []
+    for column in columns:
+        if column not in df.columns:
+            continue
+        if column not in formats:
+            formats[column] = infer_format(df[column])
+        parsed, bad = parse_date_column(df[column], formats[column])
+        for idx, value in df.loc[bad, column].items():
+            errors.append({"row": idx, "column": column, "value": str(value)})
+        df[column] = parsed
+    if errors:
+        logger.warning(f"{len(errors)} cells could not be parsed as dates in columns {columns}")
+    return df, errors
+
+
+def detect_date_columns(df: pd.DataFrame, formats: Dict[str, Optional[str]]) -> List[str]:
+    """Text columns whose sampled values parse as dates, inferring each column once"""
+    columns = []
+    for column in df.columns:
+        if column not in formats:
+            series = df[column]
+            if not (series.dtype == object or pd.api.types.is_string_dtype(series)) or series.isna().all():
+                # Numeric or still empty columns get another look in the next chunk
+                continue
+            named = "date" in str(column).lower()
+            formats[column] = infer_format(series, min_ratio=NAMED_MIN_MATCH_RATIO if named else MIN_MATCH_RATIO)
+        if formats[column]:
+            columns.append(column)
+    return columns
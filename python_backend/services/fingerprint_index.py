@@ -0,0 +1,121 @@
+import re
+import json
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from supabase import Client
+from services.state_store import connect
+
+logger = logging.getLogger(__name__)
+
+# Excel dates come through as midnight timestamps, the table stores plain dates
+_MIDNIGHT = re.compile(r"^(\d{4}-\d{2}-\d{2})[T ]00:00:00(\.0+)?$")
+
+
+def normalize_value(value: Any) -> Optional[str]:
+    """Text form of a cell value as compared across uploads, None for blanks"""
+    if value is None:
+        return None
+    text = str(value).strip()
+    if text == "" or text.lower() in ("nan", "nat", "none"):
+        return None
+    match = _MIDNIGHT.match(text)
+    return match.group(1) if match else text
+
+
+class FingerprintIndex:
+    """Compact local index of key -> hash of the mapped fields last written for that key"""
+
+    def __init__(self, table: str, key_field: str, fields: Sequence[str], db_name: str = "fingerprints.db"):
+        self.table = table
+        self.key_field = key_field
+        self.fields = tuple(fields)
+        self._lock = threading.Lock()
+        self._conn = connect(db_name)
+        self._store = f"fp_{table}"
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self._store} (key TEXT PRIMARY KEY, fingerprint BLOB NOT NULL) WITHOUT ROWID"
+        )
+
+    def fingerprint(self, row: Dict) -> bytes:
+        """8-byte digest of the normalized mapped fields of a row"""
+        payload = json.dumps([normalize_value(row.get(field)) for field in self.fields], separators=(',', ':'))
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=8).digest()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self._store}").fetchone()[0]
+
+    def _lookup(self, keys: List[str]) -> Dict[str, bytes]:
+        found = {}
+        with self._lock:
+            # Chunk the IN list to stay under SQLite's variable limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(self._conn.execute(
+                    f"SELECT key, fingerprint FROM {self._store} WHERE key IN ({placeholders})", chunk
+                ))
+        return found
+
+    def diff(self, keyed_rows: List[Tuple[str, Dict]]) -> Tuple[List[Tuple[str, Dict, bytes, bool]], int]:
+        """Split (key, row) pairs into changed ones and a count of unchanged ones
+
+        Each changed entry is (key, row, new fingerprint, key already indexed).
+        """
+        known = self._lookup(list({key for key, _ in keyed_rows}))
+        changed = []
+        for key, row in keyed_rows:
+            fp = self.fingerprint(row)
+            if known.get(key) == fp:
+                continue
+            changed.append((key, row, fp, key in known))
+        return changed, len(keyed_rows) - len(changed)
+
+    def update(self, entries: Iterable[Tuple[str, bytes]]) -> None:
+        """Store the fingerprints of rows that were written"""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO {self._store} (key, fingerprint) VALUES (?, ?)", entries
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def rebuild(self, supabase: Client, page_size: int = 1000) -> int:
+        """Rebuild the index from the table with a single paged scan"""
+        columns = ",".join((self.key_field,) + self.fields)
+        entries = []
+        start = 0
+        while True:
+            response = supabase.table(self.table)\
+                .select(columns)\
+                .order(self.key_field)\
+                .range(start, start + page_size - 1)\
+                .execute()
+            page = response.data if response and hasattr(response, 'data') else []
+            entries.extend(
+                (str(row[self.key_field]), self.fingerprint(row))
+                for row in page if row.get(self.key_field)
+            )
+            if len(page) < page_size:
+                break
+            start += page_size
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(f"DELETE FROM {self._store}")
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO {self._store} (key, fingerprint) VALUES (?, ?)", entries
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        logger.info(f"Rebuilt {self.table} fingerprint index with {len(entries)} rows")
+        return len(entries)
@@ -0,0 +1,442 @@
+"""Staged ingestion pipeline shared by the upload endpoints.
+
+source (CSV/XLSX/Parquet batches) -> transform (mapper -> validator ->
+normalizer) -> sink. Stages run concurrently and hand batches over bounded
+queues, so reading the next batch and cleaning it overlap with the network
+write of the previous one. Given a parse pool, transforms run in its worker
+processes instead of threads of the API worker.
+"""
+import time
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import pandas as pd
+from services.upload_staging import StagedUpload
+from services.batch_controller import BatchController
+from services.parse_pool import ParsePool, ParseTimeout
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_QUEUE_SIZE = 4
+DEFAULT_MAX_IN_FLIGHT = 4
+# Latency drift below this many seconds is noise, not queueing
+LATENCY_SLACK = 0.05
+
+_DONE = object()
+
+
+class PipelineInputError(ValueError):
+    """The source or transform stage failed, i.e. the upload itself could not be read"""
+
+
+def _unique_names(names: List[str]) -> List[str]:
+    # Same mangling pandas applies to duplicate CSV headers: NAME, NAME.1, ...
+    seen = defaultdict(int)
+    unique = []
+    for name in names:
+        name = str(name) if name is not None else ""
+        unique.append(f"{name}.{seen[name]}" if seen[name] else name)
+        seen[name] += 1
+    return unique
+
+
+def _iter_xlsx(staged: StagedUpload, batch_size: int, sheet_name=None,
+               names: Optional[List[str]] = None, skiprows: int = 0) -> Iterator[pd.DataFrame]:
+    from openpyxl import load_workbook
+
+    with staged.open_mmap() as buf:
+        workbook = load_workbook(buf, read_only=True, data_only=True)
+        try:
+            sheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+            rows = sheet.iter_rows(values_only=True)
+            for _ in range(skiprows):
+                next(rows, None)
+            columns = _unique_names(names or list(next(rows, ()) or ()))
+            batch, start = [], 0
+            for row in rows:
+                if not any(value is not None for value in row):
+                    continue
+                batch.append(row[:len(columns)] + (None,) * (len(columns) - len(row)))
+                if len(batch) >= batch_size:
+                    yield pd.DataFrame(batch, columns=columns, index=range(start, start + len(batch)))
+                    start += len(batch)
+                    batch = []
+            if batch:
+                yield pd.DataFrame(batch, columns=columns, index=range(start, start + len(batch)))
+        finally:
+            workbook.close()
+
+
+def _iter_parquet(staged: StagedUpload, batch_size: int) -> Iterator[pd.DataFrame]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Parquet uploads require pyarrow to be installed")
+    start = 0
+    for record_batch in pq.ParquetFile(staged.path).iter_batches(batch_size=batch_size):
+        df = record_batch.to_pandas()
+        df.index = range(start, start + len(df))
+        start += len(df)
+        yield df
+
+
+def iter_source(staged: StagedUpload, batch_size: int = DEFAULT_BATCH_SIZE, **options) -> Iterator[pd.DataFrame]:
+    """Stream a staged upload as DataFrame batches with a running row index.
+
+    options: names and skiprows for CSV and XLSX, sheet_name for XLSX.
+    """
+    extension = staged.extension
+    if extension == 'csv':
+        csv_options = {k: v for k, v in options.items() if k in ("names", "skiprows")}
+        if "names" in csv_options:
+            csv_options["header"] = None
+        return staged.iter_csv_chunks(batch_size, **csv_options)
+    if extension in ('xlsx', 'xlsm'):
+        return _iter_xlsx(staged, batch_size, **options)
+    if extension == 'parquet':
+        return _iter_parquet(staged, batch_size)
+    if extension == 'xls':
+        # Legacy workbooks cannot be read row by row; load once and slice
+        df = staged.read_dataframe(**options)
+        return (df.iloc[i:i + batch_size] for i in range(0, len(df), batch_size))
+    raise ValueError(f"Unsupported file type: .{extension}")
+
+
+def iter_records(records: List[Dict], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict]]:
+    """Source over rows already in memory, as plain record lists (pair with Transform(normalizer=list))"""
+    for start in range(0, len(records), batch_size):
+        yield records[start:start + batch_size]
+
+
+def to_records(df: pd.DataFrame) -> List[Dict]:
+    """Default normalizer: plain dicts with NaN turned into None"""
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+class Transform:
+    """mapper -> validator -> normalizer over one batch.
+
+    mapper: DataFrame -> DataFrame
+    validator: DataFrame -> (valid DataFrame, errors as a DataFrame or list of dicts with a row key)
+    normalizer: DataFrame -> list of records
+    """
+
+    def __init__(self, mapper: Callable = None, validator: Callable = None, normalizer: Callable = None):
+        self.mapper = mapper
+        self.validator = validator
+        self.normalizer = normalizer or to_records
+
+    def __call__(self, df: pd.DataFrame) -> Tuple[List[Dict], List[Dict], Dict[str, float]]:
+        timings = {}
+        errors = []
+        started = time.perf_counter()
+        if self.mapper:
+            df = self.mapper(df)
+            timings["mapper"] = time.perf_counter() - started
+            started = time.perf_counter()
+        if self.validator:
+            df, errors = self.validator(df)
+            if isinstance(errors, pd.DataFrame):
+                errors = errors.to_dict('records')
+            timings["validator"] = time.perf_counter() - started
+            started = time.perf_counter()
+        records = self.normalizer(df)
+        timings["normalizer"] = time.perf_counter() - started
+        return records, errors, timings
+
+
+def _transform_in_worker(transform: Transform, df: pd.DataFrame) -> Tuple[Transform, Tuple]:
+    # The transform goes back too, carrying state its stages keep across batches (e.g. inferred date formats)
+    return transform, transform(df)
+
+
+# A sink writes one batch of records and returns counts such as written/unchanged/failed
+Sink = Callable[[List[Dict]], Awaitable[Dict[str, int]]]
+
+
+class IngestMetrics:
+    """Counters and stage timings per pipeline, shared by all endpoints"""
+
+    COUNTERS = ("runs", "failed_runs", "batches", "rows_read", "rows_rejected", "written", "unchanged", "failed")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pipelines: Dict[str, Dict[str, Any]] = {}
+
+    def _entry(self, name: str) -> Dict[str, Any]:
+        return self._pipelines.setdefault(name, {
+            **{counter: 0 for counter in self.COUNTERS},
+            "stage_seconds": defaultdict(float),
+            "max_queue_depth": 0,
+        })
+
+    def add(self, name: str, **counts) -> None:
+        with self._lock:
+            entry = self._entry(name)
+            for key, value in counts.items():
+                entry[key] += value
+
+    def observe(self, name: str, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._entry(name)["stage_seconds"][stage] += seconds
+
+    def concurrency(self, name: str, limiter: "AdaptiveConcurrency") -> None:
+        """Record the write window a run ended with"""
+        with self._lock:
+            self._entry(name)["write_window"] = limiter.as_dict()
+
+    def queue_depth(self, name: str, depth: int) -> None:
+        with self._lock:
+            entry = self._entry(name)
+            entry["max_queue_depth"] = max(entry["max_queue_depth"], depth)
+
+    def as_dict(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                name: {
+                    **{k: v for k, v in entry.items() if k != "stage_seconds"},
+                    "stage_seconds": {stage: round(s, 3) for stage, s in entry["stage_seconds"].items()},
+                }
+                for name, entry in self._pipelines.items()
+            }
+
+
+ingest_metrics = IngestMetrics()
+
+
+class AdaptiveConcurrency:
+    """AIMD window for concurrent sink calls.
+
+    Grows by roughly one slot per window of clean calls, shrinks by one when
+    call latency drifts above latency_factor times the fastest call seen
+    (the server or link is queueing), and halves on errors or failed rows.
+    """
+
+    def __init__(self, maximum: int, minimum: int = 1, latency_factor: float = 2.0):
+        self.maximum = max(minimum, maximum)
+        self.minimum = minimum
+        self.latency_factor = latency_factor
+        self.limit = float(min(2, self.maximum))
+        self.active = 0
+        self.peak = 0
+        self.baseline: Optional[float] = None
+        self.latency: Optional[float] = None
+        self.backoffs = 0
+        self._changed = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.active < int(self.limit))
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+
+    async def release(self, seconds: float, ok: bool) -> None:
+        self.latency = seconds if self.latency is None else 0.8 * self.latency + 0.2 * seconds
+        self.baseline = seconds if self.baseline is None else min(self.baseline, seconds)
+        if not ok:
+            self.limit = max(self.minimum, self.limit / 2)
+            self.backoffs += 1
+        elif self.latency > self.latency_factor * self.baseline and self.latency - self.baseline > LATENCY_SLACK:
+            self.limit = max(self.minimum, self.limit - 1)
+            self.backoffs += 1
+        else:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        async with self._changed:
+            self.active -= 1
+            self._changed.notify_all()
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "max_limit": self.maximum,
+            "peak_in_flight": self.peak,
+            "backoffs": self.backoffs,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "baseline_ms": round(self.baseline * 1000, 1) if self.baseline is not None else None,
+        }
+
+
+class Pipeline:
+    """Source -> transform -> sink with bounded queues between the stages"""
+
+    def __init__(self, name: str, transform: Transform, sink: Sink,
+                 batch_size: int = DEFAULT_BATCH_SIZE, write_batch_size: Optional[int] = None,
+                 queue_size: int = DEFAULT_QUEUE_SIZE, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                 order_key: Optional[Callable[[Dict], Any]] = None, batcher: Optional[BatchController] = None,
+                 keep_rejected: bool = False, executor: Optional[ParsePool] = None,
+                 metrics: IngestMetrics = ingest_metrics):
+        self.name = name
+        self.transform = transform
+        self.sink = sink
+        # Rows per source batch, and per sink call (defaults to the source batch);
+        # a batcher sizes sink calls by bytes instead
+        self.batch_size = batch_size
+        self.write_batch_size = write_batch_size or batch_size
+        self.batcher = batcher
+        self.queue_size = queue_size
+        # Sink calls run concurrently up to an adaptive window; calls sharing an
+        # order_key value (e.g. a job card number) still apply in upload order
+        self.max_in_flight = max_in_flight
+        self.order_key = order_key
+        # Keep the source rows the validator rejected, as read, so they can be fixed and replayed
+        self.keep_rejected = keep_rejected
+        # Process pool for the transform stage; None runs it in a thread
+        self.executor = executor
+        self.metrics = metrics
+
+    def _write_batches(self, records: List[Dict]) -> List[List[Dict]]:
+        if self.batcher:
+            return self.batcher.split(records)
+        return [records[i:i + self.write_batch_size] for i in range(0, len(records), self.write_batch_size)]
+
+    def read(self, staged: StagedUpload, **options) -> Iterator[pd.DataFrame]:
+        """Source over a staged upload using this pipeline's batch size"""
+        return iter_source(staged, self.batch_size, **options)
+
+    async def run(self, source: Iterable[pd.DataFrame]) -> Dict[str, Any]:
+        """Drive the source through the stages and return the combined counts and row errors.
+
+        Failures while reading or transforming raise PipelineInputError; sink
+        failures, PoolSaturated and ParseTimeout propagate unchanged.
+        """
+        started = time.perf_counter()
+        result = defaultdict(int)
+        errors: List[Dict] = []
+        rejected: Dict[int, Dict] = {}
+        raw = asyncio.Queue(self.queue_size)
+        clean = asyncio.Queue(self.queue_size)
+        iterator = iter(source)
+
+        async def read():
+            while True:
+                t = time.perf_counter()
+                try:
+                    batch = await asyncio.to_thread(next, iterator, _DONE)
+                except Exception as e:
+                    raise PipelineInputError(str(e)) from e
+                if batch is _DONE:
+                    break
+                self.metrics.observe(self.name, "source", time.perf_counter() - t)
+                result["rows_read"] += len(batch)
+                await raw.put(batch)
+                self.metrics.queue_depth(self.name, raw.qsize())
+            await raw.put(_DONE)
+
+        async def transform():
+            while (batch := await raw.get()) is not _DONE:
+                # Mappers may clean the batch in place
+                source_rows = batch.copy() if self.keep_rejected and isinstance(batch, pd.DataFrame) else None
+                try:
+                    if self.executor:
+                        self.transform, (records, batch_errors, timings) = await self.executor.run(
+                            _transform_in_worker, self.transform, batch
+                        )
+                    else:
+                        records, batch_errors, timings = await asyncio.to_thread(self.transform, batch)
+                except ParseTimeout:
+                    raise
+                except Exception as e:
+                    raise PipelineInputError(str(e)) from e
+                for stage, seconds in timings.items():
+                    self.metrics.observe(self.name, stage, seconds)
+                errors.extend(batch_errors)
+                if source_rows is not None and batch_errors:
+                    failed = source_rows[source_rows.index.isin({e["row"] for e in batch_errors})]
+                    rejected.update(zip((int(i) for i in failed.index), to_records(failed)))
+                await clean.put(records)
+                self.metrics.queue_depth(self.name, clean.qsize())
+            await clean.put(_DONE)
+
+        limiter = AdaptiveConcurrency(self.max_in_flight)
+        # order key -> latest in-flight call writing it
+        last_writer: Dict[Any, asyncio.Task] = {}
+
+        async def send(batch: List[Dict], after: List[asyncio.Task]):
+            if after:
+                await asyncio.wait(after)
+            t = time.perf_counter()
+            ok = False
+            try:
+                counts = await self.sink(batch)
+                ok = not counts.get("failed")
+            finally:
+                seconds = time.perf_counter() - t
+                await limiter.release(seconds, ok)
+                self.metrics.observe(self.name, "sink", seconds)
+            for key, value in counts.items():
+                result[key] += value
+            result["batches"] += 1
+
+        def forget(task: asyncio.Task, keys: set):
+            for key in keys:
+                if last_writer.get(key) is task:
+                    del last_writer[key]
+
+        async def write():
+            in_flight = set()
+            try:
+                while (records := await clean.get()) is not _DONE:
+                    for batch in self._write_batches(records):
+                        await limiter.acquire()
+                        keys = {self.order_key(r) for r in batch} if self.order_key else set()
+                        after = list({last_writer[k] for k in keys if k in last_writer})
+                        task = asyncio.create_task(send(batch, after))
+                        for key in keys:
+                            last_writer[key] = task
+                        task.add_done_callback(lambda done, keys=keys: forget(done, keys))
+                        in_flight.add(task)
+                        # Surface a failed call without waiting for the rest of the upload
+                        for done in [t for t in in_flight if t.done()]:
+                            in_flight.discard(done)
+                            done.result()
+                if in_flight:
+                    await asyncio.gather(*in_flight)
+            finally:
+                for task in in_flight:
+                    task.cancel()
+                if in_flight:
+                    await asyncio.gather(*in_flight, return_exceptions=True)
+                self.metrics.concurrency(self.name, limiter)
+
+        async def stages():
+            tasks = [asyncio.create_task(stage()) for stage in (read, transform, write)]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                self.metrics.add(self.name, runs=1, failed_runs=1)
+                raise
+
+        try:
+            if self.executor:
+                # Refused uploads fail here, before anything is read or written
+                async with self.executor.reserve():
+                    await stages()
+            else:
+                await stages()
+        finally:
+            close = getattr(iterator, "close", None)
+            try:
+                if close:
+                    await asyncio.to_thread(close)
+            except ValueError:
+                # A cancelled read is still running in its thread; the generator finishes on its own
+                pass
+
+        result["rows_rejected"] = len({e.get("row") for e in errors})
+        self.metrics.add(self.name, runs=1, **{k: v for k, v in result.items() if k in IngestMetrics.COUNTERS})
+        summary = {"written": 0, "unchanged": 0, "failed": 0, **result}
+        summary["errors"] = errors
+        if self.keep_rejected:
+            summary["rejected"] = rejected
+        summary["seconds"] = round(time.perf_counter() - started, 3)
+        logger.info(
+            f"Pipeline {self.name}: {summary['rows_read']} rows read, {summary['rows_rejected']} rejected, "
+            f"{summary.get('written', 0)} written in {summary['seconds']}s"
+        )
+        return summary
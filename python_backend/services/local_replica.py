@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional
+from supabase import Client
+from services.state_store import connect
+
+logger = logging.getLogger(__name__)
+
+# Replicated tables with their key and the timestamp column used for incremental pulls;
+# each cursor is set by a database trigger on every update (migrations 02-04)
+REPLICA_TABLES = {
+    "inventory": {"key": "id", "cursor": "updated_at"},
+    "orders": {"key": "id", "cursor": "updated_at"},
+    "mro_items": {"key": "id", "cursor": "updated_at"},
+    "mro_job_tracker": {"key": "id", "cursor": "updated_at"},
+}
+
+# Columns read endpoints filter on
+INDEXED_FIELDS = {
+    "mro_items": ("category", "progress"),
+}
+
+
+class LocalReplica:
+    """Embedded SQLite copy of the dashboard tables, kept current by incremental pulls.
+
+    Writes go through one connection under a lock; reads use a connection per
+    thread and take no lock, so with WAL they proceed while a sync writes.
+    """
+
+    def __init__(self, supabase: Client, db_name: str = "replica.db", page_size: int = 1000,
+                 max_staleness: float = None, full_refresh_interval: float = None):
+        self.supabase = supabase
+        self.page_size = page_size
+        self.max_staleness = max_staleness or float(os.getenv("LOCAL_REPLICA_MAX_STALENESS", 300))
+        # Incremental pulls cannot see deletes, so the tables are fully reloaded periodically
+        self.full_refresh_interval = full_refresh_interval or float(os.getenv("LOCAL_REPLICA_FULL_REFRESH", 3600))
+        self._lock = threading.Lock()
+        self._db_name = db_name
+        self._conn = connect(db_name)
+        self._readers = threading.local()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS replica_meta ("
+            "name TEXT PRIMARY KEY, cursor TEXT, synced_at REAL, full_synced_at REAL)"
+        )
+        for name in REPLICA_TABLES:
+            self._create(name, name)
+            # Left over by a reload that died before its swap
+            self._conn.execute(f"DROP TABLE IF EXISTS {name}_shadow")
+
+    def _create(self, name: str, table: str, suffix: str = "") -> None:
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, data TEXT NOT NULL)")
+        for field in INDEXED_FIELDS.get(name, ()):
+            # Index names stay with a table through a rename, so each reload's shadow gets its own
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{name}_{field}{suffix} ON {table}(json_extract(data, '$.{field}'))"
+            )
+
+    def _reader(self):
+        conn = getattr(self._readers, "conn", None)
+        if conn is None:
+            conn = self._readers.conn = connect(self._db_name)
+        return conn
+
+    def _meta(self, name: str, conn=None) -> Dict:
+        row = (conn or self._conn).execute(
+            "SELECT cursor, synced_at, full_synced_at FROM replica_meta WHERE name = ?", (name,)
+        ).fetchone()
+        return {"cursor": row[0], "synced_at": row[1], "full_synced_at": row[2]} if row else {}
+
+    def _fetch(self, name: str, cursor: Optional[str]) -> List[Dict]:
+        spec = REPLICA_TABLES[name]
+        rows = []
+        start = 0
+        while True:
+            query = self.supabase.table(name).select("*")
+            if cursor:
+                # gte so rows sharing the last seen timestamp are not missed; upserts are idempotent
+                query = query.gte(spec["cursor"], cursor)
+            response = query.order(spec["cursor"]).range(start, start + self.page_size - 1).execute()
+            page = response.data if response and hasattr(response, 'data') else []
+            rows.extend(page)
+            if len(page) < self.page_size:
+                return rows
+            start += self.page_size
+
+    def sync_table(self, name: str, full: bool = False) -> int:
+        """Pull rows changed since the last sync, or reload the whole table"""
+        spec = REPLICA_TABLES[name]
+        with self._lock:
+            meta = self._meta(name)
+        full = full or not meta.get("full_synced_at") or \
+            time.time() - meta["full_synced_at"] > self.full_refresh_interval
+        rows = self._fetch(name, None if full else meta.get("cursor"))
+
+        now = time.time()
+        cursor = max((r[spec["cursor"]] for r in rows if r.get(spec["cursor"])), default=meta.get("cursor"))
+        if full:
+            self._load_shadow(name, rows)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                if full:
+                    # Swap the loaded shadow in; readers keep their snapshot of the old table meanwhile
+                    self._conn.execute(f"DROP TABLE {name}")
+                    self._conn.execute(f"ALTER TABLE {name}_shadow RENAME TO {name}")
+                else:
+                    self._upsert(name, rows)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO replica_meta (name, cursor, synced_at, full_synced_at) VALUES (?, ?, ?, ?)",
+                    (name, cursor, now, now if full else meta.get("full_synced_at"))
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        logger.debug(f"Replica {'reloaded' if full else 'synced'} {name}: {len(rows)} rows")
+        return len(rows)
+
+    def _load_shadow(self, name: str, rows: List[Dict], chunk_size: int = 5000) -> None:
+        # Filled in short transactions so writes through apply() are not held up by a reload
+        shadow = f"{name}_shadow"
+        with self._lock:
+            self._conn.execute(f"DROP TABLE IF EXISTS {shadow}")
+            self._create(name, shadow, f"_{time.time_ns()}")
+        for start in range(0, len(rows), chunk_size):
+            with self._lock:
+                self._conn.execute("BEGIN")
+                try:
+                    self._upsert(name, rows[start:start + chunk_size], shadow)
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+
+    def _upsert(self, name: str, rows: Iterable[Dict], table: Optional[str] = None) -> None:
+        key = REPLICA_TABLES[name]["key"]
+        self._conn.executemany(
+            f"INSERT OR REPLACE INTO {table or name} (key, data) VALUES (?, ?)",
+            ((str(row[key]), json.dumps(row, default=str)) for row in rows if row.get(key) is not None)
+        )
+
+    def sync_all(self) -> None:
+        for name in REPLICA_TABLES:
+            try:
+                self.sync_table(name)
+            except Exception as e:
+                logger.error(f"Error syncing replica table {name}: {str(e)}")
+
+    def apply(self, name: str, rows: List[Dict]) -> None:
+        """Write rows returned by our own writes through to the replica"""
+        with self._lock:
+            self._upsert(name, rows)
+
+    def staleness(self, name: str) -> Optional[float]:
+        """Seconds since the last successful sync of a table, None if never synced"""
+        synced_at = self._meta(name, self._reader()).get("synced_at")
+        return time.time() - synced_at if synced_at else None
+
+    def is_fresh(self, name: str) -> bool:
+        staleness = self.staleness(name)
+        return staleness is not None and staleness <= self.max_staleness
+
+    def version(self, name: str) -> tuple:
+        """(row count, latest cursor value) of a replicated table"""
+        cursor = REPLICA_TABLES[name]["cursor"]
+        row = self._reader().execute(
+            f"SELECT COUNT(*), MAX(json_extract(data, '$.{cursor}')) FROM {name}"
+        ).fetchone()
+        return (row[0], row[1])
+
+    def _where(self, filters: Optional[Dict]) -> tuple:
+        clauses, params = [], []
+        for field, value in (filters or {}).items():
+            if value is not None:
+                clauses.append(f"json_extract(data, '$.{field}') = ?")
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def select(self, name: str, filters: Optional[Dict] = None) -> List[Dict]:
+        where, params = self._where(filters)
+        rows = self._reader().execute(f"SELECT data FROM {name}{where}", params).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def select_json(self, name: str, filters: Optional[Dict] = None) -> str:
+        """Rows as a JSON array string, built inside SQLite without decoding each row"""
+        where, params = self._where(filters)
+        row = self._reader().execute(
+            f"SELECT '[' || COALESCE(group_concat(data, ','), '') || ']' FROM {name}{where}", params
+        ).fetchone()
+        return row[0]
+
+    async def run(self, interval: float) -> None:
+        """Background loop keeping the replica current"""
+        while True:
+            await asyncio.to_thread(self.sync_all)
+            await asyncio.sleep(interval)
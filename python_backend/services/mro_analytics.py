@@ -0,0 +1,147 @@
+import logging
+import threading
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+from supabase import Client
+
+logger = logging.getLogger(__name__)
+
+# Progress values that mean the unit has left the shop
+COMPLETED_PROGRESS = {"COMPLETED", "COMPLETE", "RELEASED", "CLOSED", "DELIVERED", "SHIPPED"}
+
+SNAPSHOT_COLUMNS = [
+    "customer", "category", "subcategory", "progress", "location",
+    "date_delivered", "expected_release_date", "updated_at"
+]
+
+
+class MROAnalytics:
+    """Vectorized MRO turnaround and backlog metrics over cached columnar snapshots"""
+
+    SOURCES = ("mro_items", "mro_job_tracker")
+
+    def __init__(self, supabase: Client, replica=None, page_size: int = 1000):
+        self.supabase = supabase
+        self.replica = replica
+        self.page_size = page_size
+        self._lock = threading.Lock()
+        # source -> (version, snapshot frame)
+        self._snapshots: Dict[str, Tuple[tuple, pd.DataFrame]] = {}
+        # (source, version, day) -> computed metrics
+        self._results: Dict[tuple, Dict] = {}
+
+    def _version(self, source: str) -> tuple:
+        """Cheap (row count, latest updated_at) fingerprint of a table"""
+        if self.replica and self.replica.is_fresh(source):
+            return self.replica.version(source)
+        response = self.supabase.table(source)\
+            .select("updated_at", count="exact")\
+            .order("updated_at", desc=True)\
+            .limit(1)\
+            .execute()
+        latest = response.data[0]["updated_at"] if response.data else None
+        return (response.count, latest)
+
+    def _load(self, source: str) -> pd.DataFrame:
+        if self.replica and self.replica.is_fresh(source):
+            rows = self.replica.select(source)
+        else:
+            rows = []
+            start = 0
+            while True:
+                response = self.supabase.table(source)\
+                    .select(",".join(SNAPSHOT_COLUMNS))\
+                    .order("updated_at")\
+                    .range(start, start + self.page_size - 1)\
+                    .execute()
+                page = response.data if response and hasattr(response, 'data') else []
+                rows.extend(page)
+                if len(page) < self.page_size:
+                    break
+                start += self.page_size
+
+        df = pd.DataFrame(rows, columns=SNAPSHOT_COLUMNS)
+        # Columnar, typed snapshot: categoricals for group keys, datetimes for dates
+        for col in ("customer", "category", "subcategory", "location"):
+            df[col] = df[col].fillna("Unassigned").astype(str).str.strip().astype("category")
+        df["progress"] = df["progress"].fillna("").astype(str).str.strip().str.upper()
+        df["date_delivered"] = pd.to_datetime(df["date_delivered"], errors="coerce")
+        df["expected_release_date"] = pd.to_datetime(df["expected_release_date"], errors="coerce")
+        return df[SNAPSHOT_COLUMNS[:-1]]
+
+    def snapshot(self, source: str) -> Tuple[tuple, pd.DataFrame]:
+        """Return the current snapshot, reloading it only when the table version changed"""
+        version = self._version(source)
+        with self._lock:
+            cached = self._snapshots.get(source)
+        if cached and cached[0] == version:
+            return cached
+        df = self._load(source)
+        logger.info(f"Loaded {source} analytics snapshot with {len(df)} rows (version {version})")
+        with self._lock:
+            self._snapshots[source] = (version, df)
+            self._results = {k: v for k, v in self._results.items() if k[0] != source}
+        return version, df
+
+    def metrics(self, source: str, today: Optional[date] = None) -> Dict:
+        """WIP, turnaround, overdue and backlog metrics, cached per snapshot version"""
+        if source not in self.SOURCES:
+            raise ValueError(f"Unknown analytics source: {source}")
+        today = today or date.today()
+        version, df = self.snapshot(source)
+        key = (source, version, today)
+        with self._lock:
+            if key in self._results:
+                return self._results[key]
+
+        result = self.compute(df, today)
+        result["source"] = source
+        result["snapshot_version"] = [str(v) for v in version]
+        with self._lock:
+            self._results[key] = result
+        return result
+
+    @staticmethod
+    def _records(series: pd.Series, name: str) -> List[Dict]:
+        return [
+            {**dict(zip(series.index.names, idx if isinstance(idx, tuple) else (idx,))), name: value}
+            for idx, value in series.items()
+        ]
+
+    @classmethod
+    def compute(cls, df: pd.DataFrame, today: date) -> Dict:
+        is_open = ~df["progress"].isin(COMPLETED_PROGRESS)
+        turnaround = (df["expected_release_date"] - df["date_delivered"]).dt.days
+        overdue = is_open & (df["expected_release_date"] < pd.Timestamp(today))
+        open_df = df[is_open]
+
+        wip = open_df.groupby(["category", "subcategory"], observed=True).size()
+        turnaround_by_category = turnaround.groupby(df["category"], observed=True).mean().dropna().round(1)
+        overdue_by_category = overdue.groupby(df["category"], observed=True).sum()
+        backlog = pd.DataFrame({
+            "open": is_open.astype(int),
+            "overdue": overdue.astype(int)
+        }).groupby(df["customer"], observed=True).sum()
+        backlog = backlog[backlog["open"] > 0].sort_values("open", ascending=False)
+
+        avg_turnaround = turnaround.mean()
+        return {
+            "total_items": int(len(df)),
+            "wip_total": int(is_open.sum()),
+            "overdue_total": int(overdue.sum()),
+            "avg_turnaround_days": None if pd.isna(avg_turnaround) else round(float(avg_turnaround), 1),
+            "wip_by_category": [
+                {**r, "count": int(r["count"])} for r in cls._records(wip, "count")
+            ],
+            "avg_turnaround_by_category": [
+                {**r, "days": float(r["days"])} for r in cls._records(turnaround_by_category, "days")
+            ],
+            "overdue_by_category": [
+                {**r, "count": int(r["count"])} for r in cls._records(overdue_by_category[overdue_by_category > 0], "count")
+            ],
+            "customer_backlog": [
+                {"customer": customer, "open": int(row["open"]), "overdue": int(row["overdue"])}
+                for customer, row in backlog.iterrows()
+            ],
+        }
@@ -1,17 +1,30 @@
 import os
+import asyncio
 import logging
 from datetime import datetime, date
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Tuple
 import pandas as pd
 from openpyxl import load_workbook
 from openpyxl.styles import NamedStyle
 from supabase import Client
+from services.batch_controller import batch_controller
+from services.query_filters import in_
+from services.resilience import CircuitOpen, DeadLetters
+from services.fingerprint_index import FingerprintIndex
+from services.workbook_cache import WorkbookCache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class MROService:
+    # Mapped fields whose fingerprint per serial number tells which synced rows differ from the table
+    SYNC_FIELDS = (
+        "customer", "part_number", "description", "serial_number", "date_delivered",
+        "work_requested", "progress", "location", "expected_release_date", "remarks",
+        "category", "subcategory", "sheet_name"
+    )
+
     # Sheet to category mapping
     SHEET_CATEGORIES = {
         'ALL WIP COMP': 'ALL WIP COMP',
@@ -30,10 +43,34 @@ class MROService:
         'Structures Shop': 'Structures Shop'
     }
 
-    def __init__(self, supabase: Client, excel_path: str = None):
+    def __init__(self, supabase: Client, excel_path: str = None, dead_letters: DeadLetters = None):
         self.supabase = supabase
         self.excel_path = excel_path
+        # Rows whose writes still fail after retries are kept here for replay
+        self.dead_letters = dead_letters
         self._setup_date_styles() if excel_path else None
+        # Callbacks receiving rows written to mro_items (summaries, replicas)
+        self.change_listeners: List[Callable[[List[Dict]], None]] = []
+        # Normalized sheet records, reused until the workbook sheet changes
+        self.workbook_cache = WorkbookCache(self._normalize_sheet)
+        # serial_number -> fingerprint of the row as last written, by any write path
+        self.fingerprints = FingerprintIndex("mro_items", "serial_number", self.SYNC_FIELDS)
+
+    def notify_changed(self, rows: List[Dict]) -> None:
+        """Pass rows written to mro_items on to the registered listeners"""
+        if not rows:
+            return
+        try:
+            self.fingerprints.update(
+                (str(row["serial_number"]), self.fingerprints.fingerprint(row)) for row in rows if row.get("serial_number")
+            )
+        except Exception as e:
+            logger.error(f"Error updating MRO fingerprints: {str(e)}")
+        for listener in self.change_listeners:
+            try:
+                listener(rows)
+            except Exception as e:
+                logger.error(f"Error in MRO change listener: {str(e)}")
 
     def _setup_date_styles(self):
         """Setup date styles for Excel"""
@@ -50,56 +87,48 @@ class MROService:
             return 'LAB'
         return None
 
-    def read_excel_data(self, sheet_name: str = None) -> List[Dict[Any, Any]]:
-        """Read data from Excel file if available"""
-        if not self.excel_path or not os.path.exists(self.excel_path):
-            logger.warning("Excel file not available - skipping read operation")
+    def _normalize_sheet(self, sheet: str, df: pd.DataFrame) -> List[Dict[Any, Any]]:
+        """Records of one sheet with cleaned column names, string dates and category fields"""
+        # Skip empty sheets or sheets without proper headers
+        if df.empty or not any('customer' in str(col).lower() for col in df.columns):
             return []
+
+        # Clean column names
+        df.columns = [str(col).strip().lower().replace(' ', '_') for col in df.columns]
+        
+        # Convert to list of dictionaries
+        records = df.to_dict('records')
+        
+        # Clean and format data
+        for record in records:
+            # Convert dates to string format
+            for key, value in record.items():
+                if isinstance(value, pd.Timestamp):
+                    record[key] = value.strftime('%Y-%m-%d')
+                elif pd.isna(value):
+                    record[key] = None
             
-        try:
-            if sheet_name:
-                sheets_to_read = [sheet_name]
-            else:
-                # Read all sheets
-                sheets_to_read = pd.ExcelFile(self.excel_path).sheet_names
+            # Map sheet name to category and add subcategory
+            category = self.SHEET_CATEGORIES.get(sheet, sheet)
+            record['category'] = category
+            record['subcategory'] = self._get_subcategory(sheet)
+            record['sheet_name'] = sheet
+        return records
 
-            all_records = []
-            for sheet in sheets_to_read:
-                try:
-                    df = pd.read_excel(self.excel_path, sheet_name=sheet)
-                    
-                    # Skip empty sheets or sheets without proper headers
-                    if df.empty or not any('customer' in col.lower() for col in df.columns):
-                        continue
+    def read_excel_data(self, sheet_name: str = None, path: str = None) -> List[Dict[Any, Any]]:
+        """Read data from the configured Excel file, or from path (e.g. a staged upload) if given.
 
-                    # Clean column names
-                    df.columns = [col.strip().lower().replace(' ', '_') for col in df.columns]
-                    
-                    # Convert to list of dictionaries
-                    records = df.to_dict('records')
-                    
-                    # Clean and format data
-                    for record in records:
-                        # Convert dates to string format
-                        for key, value in record.items():
-                            if isinstance(value, pd.Timestamp):
-                                record[key] = value.strftime('%Y-%m-%d')
-                            elif pd.isna(value):
-                                record[key] = None
-                        
-                        # Map sheet name to category and add subcategory
-                        category = self.SHEET_CATEGORIES.get(sheet, sheet)
-                        record['category'] = category
-                        record['subcategory'] = self._get_subcategory(sheet)
-                        record['sheet_name'] = sheet
-                    
-                    all_records.extend(records)
-                except Exception as e:
-                    logger.error(f"Error reading sheet {sheet}: {str(e)}")
-                    continue
-            
-            return all_records
+        Parsed sheets are cached, so an unchanged workbook is not parsed again
+        and a changed one only re-parses the sheets that changed.
+        """
+        excel_path = path or self.excel_path
+        if not excel_path or not os.path.exists(excel_path):
+            logger.warning("Excel file not available - skipping read operation")
+            return []
             
+        try:
+            # Only the configured workbook is watched; uploads still reuse sheets parsed before
+            return self.workbook_cache.read(excel_path, sheet_name, track=path is None)
         except Exception as e:
             logger.error(f"Error reading Excel file: {str(e)}")
             raise
@@ -152,52 +181,102 @@ class MROService:
             logger.error(f"Error writing to Excel file: {str(e)}")
             raise
 
-    async def sync_to_database(self, data: List[Dict]) -> None:
-        """Sync data to Supabase database"""
-        try:
-            for item in data:
-                # Skip items without required fields
-                if not item.get("serial_number"):
-                    logger.warning(f"Skipping item without serial number: {item}")
-                    continue
-
-                # Ensure all required fields are present
-                required_fields = {
-                    "customer", "part_number", "description", "serial_number",
-                    "work_requested", "category"
-                }
-                
-                for field in required_fields:
-                    if field not in item or not item[field]:
-                        item[field] = "N/A"
-
-                # Convert datetime objects to ISO strings
-                for key, value in item.items():
-                    if isinstance(value, (datetime, pd.Timestamp)):
-                        item[key] = value.strftime('%Y-%m-%d')
-                    elif pd.isna(value) or value == "":
-                        item[key] = None
-
-                # Check if record exists
-                existing = self.supabase.table("mro_items").select("id").eq(
+    def _clean_sync_item(self, item: Dict) -> Dict:
+        # Ensure all required fields are present
+        required_fields = {
+            "customer", "part_number", "description", "serial_number",
+            "work_requested", "category"
+        }
+        
+        for field in required_fields:
+            if field not in item or not item[field]:
+                item[field] = "N/A"
+
+        # Convert datetime objects to ISO strings
+        for key, value in item.items():
+            if isinstance(value, (datetime, pd.Timestamp)):
+                item[key] = value.strftime('%Y-%m-%d')
+            elif pd.isna(value) or value == "":
+                item[key] = None
+        return item
+
+    def _dead_letter(self, op: str, items: List[Dict], error: Exception) -> None:
+        if self.dead_letters:
+            self.dead_letters.add("mro_items", op, items, error, key="serial_number")
+
+    def _existing_serials(self, serials: List[str]) -> set:
+        existing = set()
+        for i in range(0, len(serials), self.BULK_CHUNK_SIZE):
+            query = self.supabase.table("mro_items").select("serial_number")
+            response = in_(query, "serial_number", serials[i:i + self.BULK_CHUNK_SIZE]).execute()
+            existing.update(str(r["serial_number"]) for r in (response.data or []))
+        return existing
+
+    def _sync_items(self, data: List[Dict]) -> List[Dict]:
+        items = []
+        for item in data:
+            # Skip items without required fields
+            if not item.get("serial_number"):
+                logger.warning(f"Skipping item without serial number: {item}")
+                continue
+            items.append(self._clean_sync_item(item))
+        # One row per serial number, the last one wins, as the per-row updates did
+        items = list({str(item["serial_number"]): item for item in items}.values())
+
+        # serial_number is not unique in mro_items, so existing serials are looked up
+        # and new ones inserted in bulk instead of relying on ON CONFLICT
+        existing = self._existing_serials(list({str(item["serial_number"]) for item in items}))
+        synced = []
+        inserts = [item for item in items if str(item["serial_number"]) not in existing]
+        send = lambda batch: self.supabase.table("mro_items").insert(batch).execute()
+        for batch, response, error in batch_controller("mro_items").write(inserts, send):
+            if error:
+                logger.error(f"Error inserting {len(batch)} MRO items, retrying one by one: {str(error)}")
+                for item in batch:
+                    try:
+                        self.notify_changed(send([item]).data)
+                        synced.append(item)
+                    except CircuitOpen:
+                        raise
+                    except Exception as e:
+                        logger.error(f"Error processing item {item['serial_number']}: {str(e)}")
+                        self._dead_letter("insert", [item], e)
+                continue
+            self.notify_changed(response.data)
+            synced.extend(batch)
+        logger.info(f"Inserted {len(synced)} new MRO items")
+
+        for item in items:
+            if str(item["serial_number"]) not in existing:
+                continue
+            try:
+                # Update existing record
+                response = self.supabase.table("mro_items").update(item).eq(
                     "serial_number", item["serial_number"]
                 ).execute()
+                logger.info(f"Updated MRO item: {item['serial_number']}")
+                self.notify_changed(response.data)
+                synced.append(item)
+            except CircuitOpen:
+                raise
+            except Exception as e:
+                logger.error(f"Error processing item {item['serial_number']}: {str(e)}")
+                self._dead_letter("update", [item], e)
+                continue
+        return synced
 
-                try:
-                    if existing.data:
-                        # Update existing record
-                        self.supabase.table("mro_items").update(item).eq(
-                            "serial_number", item["serial_number"]
-                        ).execute()
-                        logger.info(f"Updated MRO item: {item['serial_number']}")
-                    else:
-                        # Insert new record
-                        self.supabase.table("mro_items").insert(item).execute()
-                        logger.info(f"Inserted new MRO item: {item['serial_number']}")
-                except Exception as e:
-                    logger.error(f"Error processing item {item['serial_number']}: {str(e)}")
-                    continue
+    def changed_items(self, data: List[Dict]) -> Tuple[List[Dict], int]:
+        """Cleaned rows of data that differ from what mro_items holds for their serial number, and the unchanged count"""
+        items = [self._clean_sync_item(dict(item)) for item in data]
+        keyed = [item for item in items if item.get("serial_number")]
+        changed, unchanged = self.fingerprints.diff([(str(item["serial_number"]), item) for item in keyed])
+        # Rows without a serial number are passed on for sync to skip and report
+        return [item for item in items if not item.get("serial_number")] + [item for _, item, _, _ in changed], unchanged
 
+    async def sync_to_database(self, data: List[Dict]) -> List[Dict]:
+        """Sync data to Supabase database and return the items that were written"""
+        try:
+            return await asyncio.to_thread(self._sync_items, data)
         except Exception as e:
             logger.error(f"Error syncing to database: {str(e)}")
             raise
@@ -214,12 +293,12 @@ class MROService:
             if category:
                 query = query.eq("category", category)
             
-            response = query.execute()
+            response = await asyncio.to_thread(query.execute)
             data = response.data if response and hasattr(response, 'data') else []
 
             if category:
                 # Write to specific sheet
-                self.write_excel_data(data, category)
+                await asyncio.to_thread(self.write_excel_data, data, category)
             else:
                 # Group data by category and write to respective sheets
                 categories = {}
@@ -230,7 +309,7 @@ class MROService:
                     categories[cat].append(item)
                 
                 for cat, items in categories.items():
-                    self.write_excel_data(items, cat)
+                    await asyncio.to_thread(self.write_excel_data, items, cat)
 
             logger.info("Successfully synced database to Excel")
 
@@ -248,11 +327,12 @@ class MROService:
                 data['expected_release_date'] = data['expected_release_date'].strftime('%Y-%m-%d')
                 
             # Update database
-            response = self.supabase.table("mro_items").update(data).eq(
+            response = await asyncio.to_thread(self.supabase.table("mro_items").update(data).eq(
                 "serial_number", serial_number
-            ).execute()
+            ).execute)
             
             updated_item = response.data[0] if response.data else None
+            self.notify_changed(response.data)
             
             if updated_item:
                 # Sync changes to Excel
@@ -265,6 +345,76 @@ class MROService:
             logger.error(f"Error updating MRO item: {str(e)}")
             raise
 
+    # Fields a bulk update may select on, and fields it may never overwrite
+    BULK_FILTER_FIELDS = {"category", "subcategory", "progress", "location", "customer", "part_number"}
+    BULK_PROTECTED_FIELDS = {"id", "serial_number", "created_at"}
+    # Serial numbers per request, keeps the in.(...) filter within URL length limits
+    BULK_CHUNK_SIZE = 200
+
+    def bulk_update(self, patch: Dict, serial_numbers: List[str] = None, filters: Dict = None) -> Dict:
+        """Apply one field patch to many items with set-based updates, without touching Excel.
+
+        Returns the per-serial outcome and the categories whose Excel sheets are now stale.
+        """
+        protected = self.BULK_PROTECTED_FIELDS & set(patch)
+        if protected:
+            raise ValueError(f"Fields cannot be bulk updated: {', '.join(sorted(protected))}")
+        unknown = set(filters or {}) - self.BULK_FILTER_FIELDS
+        if unknown:
+            raise ValueError(f"Unsupported filter fields: {', '.join(sorted(unknown))}")
+        if not serial_numbers and not filters:
+            raise ValueError("Either serial_numbers or a filter is required")
+
+        patch = dict(patch)
+        for key, value in patch.items():
+            if isinstance(value, (datetime, pd.Timestamp, date)):
+                patch[key] = value.strftime('%Y-%m-%d')
+
+        def scoped(query):
+            for field, value in (filters or {}).items():
+                query = query.eq(field, value)
+            return query
+
+        # Categories before the update, so sheets the items move out of are flushed too
+        stale_categories = set()
+        updated_rows = []
+        chunks = [
+            serial_numbers[i:i + self.BULK_CHUNK_SIZE]
+            for i in range(0, len(serial_numbers), self.BULK_CHUNK_SIZE)
+        ] if serial_numbers else [None]
+        for chunk in chunks:
+            before = scoped(self.supabase.table("mro_items").select("category"))
+            update = scoped(self.supabase.table("mro_items").update(patch))
+            if chunk is not None:
+                before = in_(before, "serial_number", chunk)
+                update = in_(update, "serial_number", chunk)
+            stale_categories.update(row.get("category") for row in (before.execute().data or []))
+            response = update.execute()
+            updated_rows.extend(response.data or [])
+
+        self.notify_changed(updated_rows)
+        stale_categories.update(row.get("category") for row in updated_rows)
+        stale_categories.discard(None)
+
+        updated = {}
+        for row in updated_rows:
+            updated[row.get("serial_number")] = updated.get(row.get("serial_number"), 0) + 1
+        if serial_numbers:
+            results = [
+                {"serial_number": sn, "status": "updated" if sn in updated else "not_found", "rows": updated.get(sn, 0)}
+                for sn in dict.fromkeys(serial_numbers)
+            ]
+        else:
+            results = [{"serial_number": sn, "status": "updated", "rows": n} for sn, n in updated.items()]
+
+        logger.info(f"Bulk updated {len(updated_rows)} MRO items in {len(chunks)} request(s)")
+        return {
+            "updated_count": len(updated_rows),
+            "not_found_count": sum(1 for r in results if r["status"] == "not_found"),
+            "results": results,
+            "stale_categories": sorted(stale_categories),
+        }
+
     async def get_items(self, category: str = None, progress: str = None) -> List[Dict]:
         """Get MRO items with optional filtering"""
         try:
@@ -275,7 +425,7 @@ class MROService:
             if progress:
                 query = query.eq("progress", progress)
             
-            response = query.execute()
+            response = await asyncio.to_thread(query.execute)
             items = response.data if response and hasattr(response, 'data') else []
             
             if not items:
@@ -0,0 +1,122 @@
+import logging
+import threading
+from collections import Counter
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+from supabase import Client
+from services.mro_analytics import COMPLETED_PROGRESS
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_COLUMNS = "id,category,subcategory,progress,location,customer,expected_release_date"
+
+
+def _text(value, default: str = "Unassigned") -> str:
+    text = str(value).strip() if value is not None else ""
+    return text or default
+
+
+class MROSummary:
+    """Materialized MRO aggregates maintained incrementally from the write paths"""
+
+    def __init__(self, supabase: Client, page_size: int = 1000):
+        self.supabase = supabase
+        self.page_size = page_size
+        self._lock = threading.Lock()
+        # id -> contribution of that row to the aggregates
+        self._rows: Dict[str, Tuple] = {}
+        self._by_category = Counter()
+        # Open items per (location, expected release date); overdue is resolved at read time
+        self._open_by_location_date = Counter()
+        self._customer_total = Counter()
+        self._customer_open = Counter()
+        self.refreshed_at: Optional[datetime] = None
+
+    @staticmethod
+    def _contribution(row: Dict) -> Tuple:
+        progress = _text(row.get("progress"), "PENDING")
+        is_open = progress.upper() not in COMPLETED_PROGRESS
+        release = str(row.get("expected_release_date") or "")[:10] or None
+        return (
+            _text(row.get("category")),
+            _text(row.get("subcategory"), ""),
+            progress,
+            _text(row.get("location"), "Unknown"),
+            _text(row.get("customer")),
+            release,
+            is_open,
+        )
+
+    def _add(self, contribution: Tuple, sign: int) -> None:
+        category, subcategory, progress, location, customer, release, is_open = contribution
+        self._by_category[(category, subcategory, progress)] += sign
+        self._customer_total[customer] += sign
+        if is_open:
+            self._customer_open[customer] += sign
+            if release:
+                self._open_by_location_date[(location, release)] += sign
+
+    def apply(self, rows: List[Dict]) -> None:
+        """Fold inserted or updated rows into the aggregates"""
+        with self._lock:
+            for row in rows:
+                if row.get("id") is None:
+                    continue
+                key = str(row["id"])
+                previous = self._rows.get(key)
+                if previous:
+                    self._add(previous, -1)
+                contribution = self._contribution(row)
+                self._rows[key] = contribution
+                self._add(contribution, 1)
+
+    def rebuild(self) -> int:
+        """Recompute the aggregates from the table with one paged scan"""
+        rows = []
+        start = 0
+        while True:
+            response = self.supabase.table("mro_items")\
+                .select(SUMMARY_COLUMNS)\
+                .order("id")\
+                .range(start, start + self.page_size - 1)\
+                .execute()
+            page = response.data if response and hasattr(response, 'data') else []
+            rows.extend(page)
+            if len(page) < self.page_size:
+                break
+            start += self.page_size
+
+        fresh = MROSummary(self.supabase, self.page_size)
+        fresh.apply(rows)
+        with self._lock:
+            self._rows = fresh._rows
+            self._by_category = fresh._by_category
+            self._open_by_location_date = fresh._open_by_location_date
+            self._customer_total = fresh._customer_total
+            self._customer_open = fresh._customer_open
+            self.refreshed_at = datetime.utcnow()
+        logger.info(f"Rebuilt MRO summary from {len(rows)} rows")
+        return len(rows)
+
+    def as_dict(self, today: Optional[date] = None) -> Dict:
+        today_iso = (today or date.today()).isoformat()
+        with self._lock:
+            overdue = Counter()
+            for (location, release), count in self._open_by_location_date.items():
+                if count > 0 and release < today_iso:
+                    overdue[location] += count
+            return {
+                "total_items": len(self._rows),
+                "by_category": [
+                    {"category": c, "subcategory": s or None, "progress": p, "count": n}
+                    for (c, s, p), n in sorted(self._by_category.items()) if n > 0
+                ],
+                "overdue_by_location": [
+                    {"location": location, "count": n} for location, n in overdue.most_common()
+                ],
+                "customers": [
+                    {"customer": customer, "total": n, "open": self._customer_open[customer]}
+                    for customer, n in self._customer_total.most_common() if n > 0
+                ],
+                "refreshed_at": self.refreshed_at.isoformat() if self.refreshed_at else None,
+            }
@@ -0,0 +1,140 @@
+"""Schema-driven validation of uploaded MRO rows.
+
+The schema is compiled once into column operations, so a whole upload is
+checked with vectorized pandas expressions instead of per-row try/except.
+"""
+import os
+import time
+import uuid
+import logging
+from typing import FrozenSet, List, NamedTuple, Optional, Tuple
+import pandas as pd
+import numpy as np
+from services.date_parsing import parse_date_column, text_codes
+from services.state_store import state_path
+
+logger = logging.getLogger(__name__)
+
+
+class FieldRule(NamedTuple):
+    column: str
+    field: str
+    required: bool = False
+    default: Optional[str] = None
+    allowed: Optional[FrozenSet[str]] = None
+    is_date: bool = False
+
+
+VALID_MRO_CATEGORIES = frozenset({
+    'ALL WIP COMP', 'MECHANICAL', 'SAFETY COMPONENTS',
+    'AVIONICS MAIN', 'Avionics Shop', 'PLANT AND EQUIPMENTS',
+    'BATTERY', 'Battery Shop', 'CALIBRATION', 'Cal lab',
+    'UPH Shop', 'Structures Shop'
+})
+
+MRO_UPLOAD_SCHEMA = (
+    FieldRule("CUSTOMER", "customer", required=True),
+    FieldRule("PART NUMBER", "part_number", default="N/A"),
+    FieldRule("DESCRIPTION", "description", default="No description"),
+    FieldRule("SERIAL NUMBER", "serial_number", default="N/A"),
+    FieldRule("DATE DELIVERED", "date_delivered", is_date=True),
+    FieldRule("WORK REQUESTED", "work_requested", default="N/A"),
+    FieldRule("PROGRESS", "progress", default="PENDING"),
+    FieldRule("LOCATION", "location", default="Unknown"),
+    FieldRule("EXPECTED RELEASE DATE", "expected_release_date", is_date=True),
+    FieldRule("REMARKS", "remarks", default="No remarks"),
+    FieldRule("CATEGORY", "category", default="MECHANICAL", allowed=VALID_MRO_CATEGORIES),
+)
+
+ERROR_COLUMNS = ["row", "column", "code", "value", "message"]
+
+
+class CompiledValidator:
+    """Validator compiled from a tuple of FieldRules"""
+
+    def __init__(self, schema: Tuple[FieldRule, ...]):
+        self.schema = schema
+        self.text_rules = [r for r in schema if not r.is_date]
+        self.date_rules = [r for r in schema if r.is_date]
+        self.fields = [r.field for r in schema]
+
+    def validate(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Return (valid rows keyed by output field, one error per failed check) sharing df's index"""
+        missing_column = pd.Series(None, index=df.index, dtype=object)
+        out = {}
+        errors = []
+
+        def record(rule: FieldRule, mask: pd.Series, code: str, message: str, values: pd.Series):
+            if mask.any():
+                errors.append(pd.DataFrame({
+                    "row": df.index[mask],
+                    "column": rule.column,
+                    "code": code,
+                    "value": values[mask].astype(str).to_numpy(),
+                    "message": message,
+                }))
+
+        # Text checks and defaults run on each column's distinct values, then map back by code
+        for rule in self.text_rules:
+            raw = df[rule.column] if rule.column in df.columns else missing_column
+            codes, values = text_codes(raw)
+            if rule.required:
+                blank = np.array([v is None for v in values])
+                record(rule, pd.Series(blank[codes], index=df.index), "required",
+                       f"{rule.column} is required", raw)
+            if rule.default is not None:
+                values = np.array([rule.default if v is None else v for v in values], dtype=object)
+            column = pd.Series(values[codes], index=df.index, dtype=object)
+            if rule.allowed is not None:
+                invalid = np.array([v not in rule.allowed for v in values])
+                record(rule, pd.Series(invalid[codes], index=df.index), "invalid_value",
+                       f"{rule.column} must be one of the allowed values", column)
+            out[rule.field] = column
+        for rule in self.date_rules:
+            raw = df[rule.column] if rule.column in df.columns else missing_column
+            parsed, bad = parse_date_column(raw)
+            out[rule.field] = parsed
+            record(rule, bad, "invalid_date", "Unrecognized date format", raw)
+        out = pd.DataFrame(out, index=df.index)
+
+        errors = pd.concat(errors, ignore_index=True) if errors else pd.DataFrame(columns=ERROR_COLUMNS)
+        valid = out[~out.index.isin(errors["row"])]
+        return valid[self.fields], errors.sort_values("row", kind="stable").reset_index(drop=True)
+
+
+MRO_UPLOAD_VALIDATOR = CompiledValidator(MRO_UPLOAD_SCHEMA)
+
+
+# Downloadable error reports, kept for a week
+ERROR_REPORT_DIR = "error_reports"
+ERROR_REPORT_TTL = 7 * 24 * 3600
+
+
+def _report_path(report_id: str) -> str:
+    return state_path(os.path.join(ERROR_REPORT_DIR, f"{report_id}.csv"))
+
+
+def save_error_report(errors: pd.DataFrame) -> str:
+    """Write an errors frame as CSV and return its report id"""
+    os.makedirs(state_path(ERROR_REPORT_DIR), exist_ok=True)
+    cutoff = time.time() - ERROR_REPORT_TTL
+    for entry in os.scandir(state_path(ERROR_REPORT_DIR)):
+        if entry.stat().st_mtime < cutoff:
+            os.remove(entry.path)
+
+    report_id = uuid.uuid4().hex
+    report = errors.copy()
+    # Spreadsheet row numbers: one header row, 1-based
+    report.insert(1, "sheet_row", report["row"] + 2)
+    report.to_csv(_report_path(report_id), index=False)
+    return report_id
+
+
+def error_report_path(report_id: str) -> Optional[str]:
+    """Path of a stored report, None if it does not exist or the id is malformed"""
+    try:
+        uuid.UUID(hex=report_id)
+    except ValueError:
+        return None
+    path = _report_path(report_id)
+    return path if os.path.exists(path) else None
@@ -0,0 +1,116 @@
+import os
+import math
+import time
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PoolSaturated(Exception):
+    """Raised when the parse pool queue is full"""
+
+    def __init__(self, retry_after: int):
+        self.retry_after = retry_after
+        super().__init__(f"Parse pool is saturated, retry in {retry_after}s")
+
+
+class ParseTimeout(Exception):
+    """Raised when a single parse task runs longer than the task timeout"""
+
+
+class ParsePool:
+    """Process pool for CPU-bound parse/clean work with a bounded queue and per-task timeouts.
+
+    An upload reserves a slot for its whole run and sends one batch at a
+    time, so at most max_workers + max_queue uploads are parsing or waiting
+    for a worker; further uploads are refused with PoolSaturated before they
+    read or write anything.
+    """
+
+    def __init__(self, max_workers: int = None, max_queue: int = None, task_timeout: float = None):
+        self.max_workers = max_workers or int(os.getenv("PARSE_POOL_WORKERS", min(2, os.cpu_count() or 1)))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("PARSE_POOL_QUEUE", 4))
+        self.task_timeout = task_timeout or float(os.getenv("PARSE_TASK_TIMEOUT", 90))
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        # Reserved runs plus timed-out tasks still occupying a worker
+        self._pending = 0
+        # Exponentially weighted average run duration, used for Retry-After
+        self._avg_duration = 5.0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            logger.info(f"Started parse pool with {self.max_workers} workers")
+        return self._executor
+
+    def _retry_after(self) -> int:
+        waves = math.ceil(max(self._pending, 1) / self.max_workers)
+        return max(1, math.ceil(waves * self._avg_duration))
+
+    def _release(self, started: Optional[float] = None) -> None:
+        with self._lock:
+            self._pending -= 1
+            if started is not None:
+                self._avg_duration = 0.8 * self._avg_duration + 0.2 * (time.monotonic() - started)
+
+    @asynccontextmanager
+    async def reserve(self):
+        """Hold a slot for one upload, raising PoolSaturated when the queue is full"""
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                raise PoolSaturated(self._retry_after())
+            self._pending += 1
+        started = time.monotonic()
+        try:
+            yield self
+        finally:
+            self._release(started)
+
+    async def run(self, fn: Callable, *args: Any, timeout: float = None) -> Any:
+        """Run fn(*args) in a worker process, raising ParseTimeout after the task timeout"""
+        timeout = timeout or self.task_timeout
+        with self._lock:
+            executor = self._get_executor()
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._reset(executor)
+            raise
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            if not future.cancel():
+                # The worker keeps running it; its slot is freed only when it is actually done
+                with self._lock:
+                    self._pending += 1
+                future.add_done_callback(lambda _: self._release())
+            name = getattr(fn, '__name__', fn)
+            logger.error(f"Parse task {name} timed out after {timeout}s")
+            raise ParseTimeout(f"Parse task {name} timed out after {timeout}s") from None
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); start a fresh pool for the next task
+            self._reset(executor)
+            raise
+
+    def _reset(self, executor: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+        logger.error("Parse pool worker died, pool restarted")
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
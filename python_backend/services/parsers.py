@@ -0,0 +1,223 @@
+"""Mappers, validators and normalizers for uploaded files.
+
+Each function works on one batch of an upload and is combined into an
+ingest pipeline Transform; none of them touch the Supabase client.
+"""
+import logging
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+from services.date_parsing import parse_date, parse_date_column, detect_date_columns
+from services.mro_validation import VALID_MRO_CATEGORIES
+
+logger = logging.getLogger(__name__)
+
+# Expected column names of the job tracker workbook
+JOB_TRACKER_EXCEL_COLUMNS = [
+    "DATE DELIVERED", "CUSTOMER", "DESCRIPTION", "PART NUMBER",
+    "SERIAL NUMBER", "DATE DELIVERED", "JOB CARD NO", "RO NUMBER",
+    "DATE RECEIVED", "QTY", "DATE SENT", "DATE RETURNED",
+    "INVOICE NUMBER", "DATE CLOSED", "STATUS"
+]
+
+
+def convert_date_string(value: str) -> Optional[date]:
+    """Convert string to date, handling various formats"""
+    if isinstance(value, date):
+        return value
+    if not value or value.strip() == "":
+        return None
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(f"Invalid date format. Expected YYYY-MM-DD, YYYY/MM/DD or MM/DD/YYYY, got {value}")
+    return parsed
+
+
+def _normalize_dates(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """Rewrite parseable cells of date columns as YYYY-MM-DD, leaving the rest untouched"""
+    for column in columns:
+        if column in df.columns:
+            parsed, bad = parse_date_column(df[column])
+            df[column] = parsed.where(parsed.notna(), df[column])
+    return df
+
+
+def _text(df: pd.DataFrame, column: str, default: str = "") -> pd.Series:
+    if column not in df.columns:
+        return pd.Series(default, index=df.index, dtype=object)
+    return df[column].astype(str)
+
+
+def _raw(df: pd.DataFrame, column: str, default=0) -> pd.Series:
+    if column not in df.columns:
+        return pd.Series(default, index=df.index, dtype=object)
+    return df[column]
+
+
+def map_inventory(df: pd.DataFrame) -> pd.DataFrame:
+    """Map one batch of an inventory upload to inventory fields"""
+    df = _normalize_dates(df, ["Last Updated"])
+    return pd.DataFrame({
+        "part_number": _text(df, "Part Number"),
+        "name": _text(df, "Name"),
+        "category": _text(df, "Category"),
+        "in_stock": _raw(df, "In Stock"),
+        "min_required": _raw(df, "Min Required"),
+        "on_order": _raw(df, "On Order"),
+        "last_updated": _text(df, "Last Updated"),
+    }, index=df.index)
+
+
+def map_orders(df: pd.DataFrame) -> pd.DataFrame:
+    """Map one batch of an orders upload to order fields"""
+    df = _normalize_dates(df, ["Order Date", "Expected Delivery"])
+    return pd.DataFrame({
+        "order_number": _text(df, "Order Number"),
+        "part_number": _text(df, "Part Number"),
+        "part_name": _text(df, "Part Name"),
+        "quantity": _raw(df, "Quantity"),
+        "status": _text(df, "Status", "Pending"),
+        "order_date": _text(df, "Order Date"),
+        "expected_delivery": _text(df, "Expected Delivery"),
+        "supplier": _text(df, "Supplier"),
+    }, index=df.index)
+
+
+class RecordValidator:
+    """Require a key field and whole numbers in count fields of mapped rows"""
+
+    def __init__(self, key: str, integer_fields: Tuple[str, ...]):
+        self.key = key
+        self.integer_fields = integer_fields
+
+    def __call__(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, List[Dict]]:
+        errors = []
+        blank = df[self.key].str.strip().isin(["", "nan", "None"])
+        for idx in df.index[blank]:
+            errors.append({"row": idx, "column": self.key, "code": "required",
+                           "value": "", "message": f"{self.key} is required"})
+        df = df.copy()
+        for field in self.integer_fields:
+            numbers = pd.to_numeric(df[field], errors="coerce")
+            bad = numbers.isna() | (numbers % 1 != 0)
+            for idx, value in df.loc[bad, field].items():
+                errors.append({"row": idx, "column": field, "code": "invalid_number",
+                               "value": str(value), "message": f"{field} must be a whole number"})
+            df[field] = numbers.where(~bad, 0).astype(int)
+        rejected = {e["row"] for e in errors}
+        return df[~df.index.isin(rejected)], errors
+
+
+INVENTORY_VALIDATOR = RecordValidator("part_number", ("in_stock", "min_required", "on_order"))
+ORDERS_VALIDATOR = RecordValidator("order_number", ("quantity",))
+
+
+def _clean_job_tracker_csv_row(item: Dict) -> Dict:
+    clean_item = {}
+    for k, v in item.items():
+        if pd.notna(v):
+            # Convert datetime objects to ISO strings; date columns were parsed per chunk
+            if isinstance(v, (datetime, pd.Timestamp)):
+                clean_item[k] = v.strftime('%Y-%m-%d')
+            elif isinstance(v, str):
+                clean_item[k] = v
+            else:
+                clean_item[k] = str(v)
+        else:
+            clean_item[k] = None
+    return clean_item
+
+
+def _map_job_tracker_column(key) -> str:
+    key_lower = str(key).lower().strip()
+    if 'job' in key_lower and 'card' in key_lower:
+        return 'job_card_no'
+    elif 'customer' in key_lower:
+        return 'customer'
+    elif 'part' in key_lower and 'number' in key_lower:
+        return 'part_number'
+    elif 'description' in key_lower:
+        return 'description'
+    elif 'serial' in key_lower:
+        return 'serial_number'
+    elif 'date' in key_lower and 'delivered' in key_lower:
+        return 'date_delivered'
+    elif 'work' in key_lower and 'requested' in key_lower:
+        return 'work_requested'
+    elif 'progress' in key_lower:
+        return 'progress'
+    elif 'location' in key_lower:
+        return 'location'
+    elif 'expected' in key_lower and 'release' in key_lower:
+        return 'expected_release_date'
+    elif 'remarks' in key_lower:
+        return 'remarks'
+    elif 'category' in key_lower:
+        return 'category'
+    return key
+
+
+def _clean_job_tracker_excel_row(item: Dict) -> Dict:
+    # Clean and validate data
+    clean_item = {}
+    for k, v in item.items():
+        if pd.notna(v):
+            # Convert datetime objects to strings
+            if hasattr(v, 'isoformat'):
+                clean_item[k] = v.isoformat()
+            else:
+                clean_item[k] = str(v)
+        else:
+            clean_item[k] = None
+
+    # Map column names (handle different formats)
+    mapped_item = {}
+    mapping_log = []
+    for k, v in clean_item.items():
+        new_key = _map_job_tracker_column(k)
+        mapped_item[new_key] = v
+        mapping_log.append(f"{k} -> {new_key}")
+
+    logger.debug(f"Mapped columns: {', '.join(mapping_log)}")
+    return mapped_item
+
+
+class JobTrackerCsvMapper:
+    """Parse date columns of job tracker CSV batches.
+
+    Holds the per-column formats so they are inferred once per upload, from
+    the first batch with values for the column.
+    """
+
+    def __init__(self):
+        self.formats: Dict[str, Optional[str]] = {}
+        self.bad_dates = 0
+
+    def __call__(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        for column in detect_date_columns(chunk, self.formats):
+            parsed, bad = parse_date_column(chunk[column], self.formats[column])
+            self.bad_dates += int(bad.sum())
+            # Cells that are not dates keep their text, as before
+            chunk[column] = parsed.where(~bad, chunk[column])
+        return chunk
+
+
+def validate_job_card(df: pd.DataFrame) -> Tuple[pd.DataFrame, List[Dict]]:
+    """Drop job tracker rows without a job card number"""
+    columns = [c for c in df.columns if c == "JOB CARD NO" or _map_job_tracker_column(c) == "job_card_no"]
+    present = pd.Series(False, index=df.index)
+    for column in columns:
+        present |= df[column].notna() & (df[column].astype(str).str.strip() != "")
+    errors = [
+        {"row": idx, "column": "job_card_no", "code": "required", "value": "", "message": "Job card number is required"}
+        for idx in df.index[~present]
+    ]
+    return df[present], errors
+
+
+def normalize_job_tracker_csv(df: pd.DataFrame) -> List[Dict]:
+    return [_clean_job_tracker_csv_row(item) for item in df.to_dict('records')]
+
+
+def normalize_job_tracker_excel(df: pd.DataFrame) -> List[Dict]:
+    return [_clean_job_tracker_excel_row(item) for item in df.to_dict('records')]
@@ -0,0 +1,12 @@
+from typing import Any, Iterable
+
+
+def _quote(value: Any) -> str:
+    # PostgREST list items in double quotes may hold commas, parentheses and, escaped, quotes and backslashes
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+def in_(query, column: str, values: Iterable[Any]):
+    """query.in_(column, values) with every value quoted, whatever characters it contains"""
+    return query.filter(column, "in", "(" + ",".join(_quote(v) for v in values) + ")")
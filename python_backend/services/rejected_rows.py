@@ -0,0 +1,112 @@
+"""Rejected upload rows kept per upload so they can be fixed and replayed.
+
+Each upload that rejects rows gets an upload id; its rejected source rows
+are stored with their reason codes in a local SQLite database, downloadable
+as CSV and replayable through the same pipeline without re-uploading the
+rest of the file.
+"""
+import io
+import csv
+import json
+import time
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+from services.state_store import connect
+
+logger = logging.getLogger(__name__)
+
+# Rejected rows are kept for a week, like the MRO error reports
+REJECTED_ROWS_TTL = 7 * 24 * 3600
+
+
+class RejectedRows:
+    """SQLite store of rejected rows keyed by (upload_id, row)"""
+
+    def __init__(self, db_name: str = "rejected_rows.db"):
+        self._lock = threading.Lock()
+        self._conn = connect(db_name)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS uploads ("
+            " upload_id TEXT PRIMARY KEY, target TEXT NOT NULL, kind TEXT NOT NULL,"
+            " filename TEXT, created_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rejected ("
+            " upload_id TEXT NOT NULL, row INTEGER NOT NULL, data TEXT NOT NULL, reasons TEXT NOT NULL,"
+            " PRIMARY KEY (upload_id, row))"
+        )
+
+    def _expire(self) -> None:
+        cutoff = time.time() - REJECTED_ROWS_TTL
+        expired = [r[0] for r in self._conn.execute("SELECT upload_id FROM uploads WHERE created_at < ?", (cutoff,))]
+        for upload_id in expired:
+            self._conn.execute("DELETE FROM rejected WHERE upload_id = ?", (upload_id,))
+            self._conn.execute("DELETE FROM uploads WHERE upload_id = ?", (upload_id,))
+
+    def record(self, upload_id: str, target: str, kind: str, filename: Optional[str],
+               rows: Dict[int, Dict], errors: List[Dict]) -> None:
+        """Store (or replace) the rejected source rows of an upload with their errors"""
+        reasons: Dict[int, List[Dict]] = {}
+        for error in errors:
+            reasons.setdefault(int(error["row"]), []).append(
+                {k: error.get(k) for k in ("column", "code", "message")}
+            )
+        with self._lock:
+            self._expire()
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "INSERT INTO uploads (upload_id, target, kind, filename, created_at) VALUES (?, ?, ?, ?, ?)"
+                    " ON CONFLICT(upload_id) DO NOTHING",
+                    (upload_id, target, kind, filename, time.time())
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO rejected (upload_id, row, data, reasons) VALUES (?, ?, ?, ?)",
+                    [(upload_id, int(row), json.dumps(data, default=str), json.dumps(reasons.get(int(row), [])))
+                     for row, data in rows.items()]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        logger.info(f"Stored {len(rows)} rejected {target} rows for upload {upload_id}")
+
+    def upload(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            found = self._conn.execute(
+                "SELECT target, kind, filename, created_at FROM uploads WHERE upload_id = ?", (upload_id,)
+            ).fetchone()
+        if not found:
+            return None
+        target, kind, filename, created_at = found
+        return {"upload_id": upload_id, "target": target, "kind": kind, "filename": filename, "created_at": created_at}
+
+    def rows(self, upload_id: str) -> List[Dict[str, Any]]:
+        """Rejected rows of an upload as {row, data, reasons}, in file order"""
+        with self._lock:
+            found = self._conn.execute(
+                "SELECT row, data, reasons FROM rejected WHERE upload_id = ? ORDER BY row", (upload_id,)
+            ).fetchall()
+        return [{"row": row, "data": json.loads(data), "reasons": json.loads(reasons)} for row, data, reasons in found]
+
+    def resolve(self, upload_id: str, rows: List[int]) -> None:
+        """Drop rows that have now been ingested"""
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM rejected WHERE upload_id = ? AND row = ?", [(upload_id, int(row)) for row in rows]
+            )
+
+    def to_csv(self, upload_id: str) -> str:
+        """Rejected rows with their reasons and original columns; the row column keys corrections for replay"""
+        rows = self.rows(upload_id)
+        columns = []
+        for entry in rows:
+            columns.extend(c for c in entry["data"] if c not in columns)
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(["row", "reasons", *columns])
+        for entry in rows:
+            reasons = "; ".join(f"{r['column']}: {r['code']} ({r['message']})" for r in entry["reasons"])
+            writer.writerow([entry["row"], reasons, *(entry["data"].get(c) for c in columns)])
+        return out.getvalue()
@@ -0,0 +1,308 @@
+"""Retries, a circuit breaker and a dead-letter store around Supabase calls.
+
+ResilientClient wraps the Supabase client so every query's execute() goes
+through one policy: idempotent requests are retried with jittered
+exponential backoff on transient errors, and after repeated failures the
+breaker opens and calls fail fast until Supabase answers again.
+Calls block, backoff sleeps included, so async code runs them through
+asyncio.to_thread.
+"""
+import os
+import json
+import time
+import uuid
+import random
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import httpx
+from services.state_store import connect, state_path
+
+logger = logging.getLogger(__name__)
+
+RETRY_ATTEMPTS = int(os.getenv("RETRY_ATTEMPTS", 3))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", 0.2))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", 5.0))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", 5))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", 30))
+
+# 57014: Postgres statement timeout
+TRANSIENT_STATUS = {"408", "429", "500", "502", "503", "504", "57014"}
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling Supabase while the breaker is open"""
+
+    def __init__(self, retry_after: int):
+        self.retry_after = retry_after
+        super().__init__(f"Database unavailable, retry in {retry_after}s")
+
+
+def is_transient(exc: Exception) -> bool:
+    """Network failures including timeouts and 5xx/429 responses, as opposed to errors in the request itself"""
+    if isinstance(exc, httpx.TransportError):
+        return True
+    return str(getattr(exc, "code", "") or "") in TRANSIENT_STATUS
+
+
+def is_oversized(exc: Exception) -> bool:
+    """True when the request body was too large (413), which only a smaller request can avoid"""
+    code = str(getattr(exc, "code", "") or "")
+    return code == "413" or "413" in str(exc) and "large" in str(exc).lower()
+
+
+def _never_sent(exc: Exception) -> bool:
+    # The request did not reach the server, so even an insert is safe to repeat
+    return isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout))
+
+
+class CircuitBreaker:
+    """Closed -> open after threshold consecutive transient failures -> half-open trial after reset_seconds"""
+
+    def __init__(self, threshold: int = BREAKER_FAILURE_THRESHOLD, reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.reset_seconds else "open"
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self.opened_at is None:
+                return
+            waited = time.monotonic() - self.opened_at
+            # One trial call at a time once the reset period is over
+            if waited < self.reset_seconds or self._trial:
+                raise CircuitOpen(max(1, int(self.reset_seconds - waited)))
+            self._trial = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.opened_at is not None:
+                logger.info("Database calls succeeding again, closing circuit breaker")
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial or (self.opened_at is None and self.failures >= self.threshold):
+                if not self._trial:
+                    self.times_opened += 1
+                    logger.error(f"{self.failures} consecutive database failures, opening circuit breaker")
+                self.opened_at = time.monotonic()
+                self._trial = False
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self.failures, "times_opened": self.times_opened}
+
+
+class RetryPolicy:
+    """Jittered exponential retries behind a shared circuit breaker"""
+
+    def __init__(self, breaker: CircuitBreaker = None, attempts: int = RETRY_ATTEMPTS,
+                 base_delay: float = RETRY_BASE_DELAY, max_delay: float = RETRY_MAX_DELAY):
+        self.breaker = breaker or CircuitBreaker()
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0
+
+    def call(self, fn: Callable[[], Any], idempotent: bool = True) -> Any:
+        for attempt in range(self.attempts):
+            self.breaker.before_call()
+            try:
+                result = fn()
+            except Exception as e:
+                transient = is_transient(e)
+                if transient:
+                    self.breaker.record_failure()
+                else:
+                    # The database answered; the request itself was wrong
+                    self.breaker.record_success()
+                # Timeouts are retried like other transient errors; a timed-out insert may
+                # have been applied, so it is repeated only if it never reached the server
+                retryable = transient and (idempotent or _never_sent(e))
+                if not retryable or attempt == self.attempts - 1:
+                    raise
+                # Full jitter: uniform over the exponential window
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                self.retries += 1
+                logger.warning(f"Transient database error ({str(e)}), retry {attempt + 1} in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {**self.breaker.as_dict(), "retries": self.retries}
+
+
+def _is_idempotent(builder) -> bool:
+    # Reads, filtered updates and deletes repeat safely; of the POSTs only upserts do
+    method = getattr(builder, "http_method", "GET")
+    prefer = builder.headers.get("prefer", "") if hasattr(builder, "headers") else ""
+    return method != "POST" or "merge-duplicates" in prefer
+
+
+class _ResilientBuilder:
+    """Proxy for a postgrest request builder whose execute() goes through the policy"""
+
+    def __init__(self, builder, policy: RetryPolicy):
+        self._builder = builder
+        self._policy = policy
+
+    def __getattr__(self, name):
+        attr = getattr(self._builder, name)
+        if not callable(attr):
+            return attr
+
+        def chained(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            return _ResilientBuilder(result, self._policy) if hasattr(result, "execute") else result
+        return chained
+
+    def execute(self):
+        return self._policy.call(self._builder.execute, idempotent=_is_idempotent(self._builder))
+
+
+class ResilientClient:
+    """Supabase client wrapper applying a RetryPolicy to every table query"""
+
+    def __init__(self, client, policy: RetryPolicy = None):
+        self._client = client
+        self.policy = policy or RetryPolicy()
+
+    def table(self, name: str) -> _ResilientBuilder:
+        return _ResilientBuilder(self._client.table(name), self.policy)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+class DeadLetters:
+    """SQLite store of rows whose writes failed after retries, replayable later.
+
+    Shared by all workers of an instance: adds are single inserts, and a
+    replay claims the entries it sends so two workers never send the same
+    row, while rows dead-lettered meanwhile are left untouched.
+    """
+
+    # A claim older than this belongs to a replay that died; its rows may be taken again
+    CLAIM_TIMEOUT = 600
+
+    def __init__(self, db_name: str = "dead_letters.db"):
+        self._lock = threading.Lock()
+        self._conn = connect(db_name)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS dead_letters ("
+            " id TEXT PRIMARY KEY, at REAL NOT NULL, tbl TEXT NOT NULL, op TEXT NOT NULL, key TEXT,"
+            " row TEXT NOT NULL, error TEXT, claimed_by TEXT, claimed_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS dead_letters_at ON dead_letters (at)")
+        self._import_jsonl(state_path("dead_letters.jsonl"))
+
+    def _import_jsonl(self, path: str) -> None:
+        # Rows dead-lettered by earlier versions, which kept them in a JSON-lines file
+        try:
+            os.rename(path, path + ".imported")
+        except FileNotFoundError:
+            return
+        with open(path + ".imported") as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO dead_letters (id, at, tbl, op, key, row, error) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(e["id"], e["at"], e["table"], e["op"], e.get("key"), json.dumps(e["row"], default=str), e.get("error"))
+                 for e in entries]
+            )
+        logger.info(f"Imported {len(entries)} dead-lettered rows from {path}")
+
+    def add(self, table: str, op: str, rows: List[Dict], error: Exception, key: Optional[str] = None) -> None:
+        """Record rows of a failed insert, upsert (on_conflict=key) or update (matched on key)"""
+        if not rows:
+            return
+        at = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO dead_letters (id, at, tbl, op, key, row, error) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(uuid.uuid4().hex, at, table, op, key, json.dumps(row, default=str), str(error)) for row in rows]
+            )
+        logger.error(f"Dead-lettered {len(rows)} {table} rows after {op} failed: {str(error)}")
+
+    @staticmethod
+    def _entry(found) -> Dict:
+        entry_id, at, table, op, key, row, error = found
+        return {"id": entry_id, "at": at, "table": table, "op": op, "key": key, "row": json.loads(row), "error": error}
+
+    def entries(self) -> List[Dict]:
+        """All dead-lettered rows, oldest first"""
+        with self._lock:
+            found = self._conn.execute(
+                "SELECT id, at, tbl, op, key, row, error FROM dead_letters ORDER BY at, rowid"
+            ).fetchall()
+        return [self._entry(f) for f in found]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM dead_letters").fetchone()[0]
+
+    def _claim(self, table: Optional[str]) -> Tuple[str, List[Dict]]:
+        token = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE dead_letters SET claimed_by = ?, claimed_at = ?"
+                " WHERE (claimed_by IS NULL OR claimed_at < ?) AND (? IS NULL OR tbl = ?)",
+                (token, now, now - self.CLAIM_TIMEOUT, table, table)
+            )
+            found = self._conn.execute(
+                "SELECT id, at, tbl, op, key, row, error FROM dead_letters WHERE claimed_by = ? ORDER BY at, rowid",
+                (token,)
+            ).fetchall()
+        return token, [self._entry(f) for f in found]
+
+    def replay(self, supabase, table: Optional[str] = None) -> Dict[str, Any]:
+        """Write dead-lettered rows again, one request per row, dropping the ones that succeed"""
+        token, entries = self._claim(table)
+        replayed, failed, written_rows = [], {}, {}
+        try:
+            for entry in entries:
+                query = supabase.table(entry["table"])
+                row = entry["row"]
+                try:
+                    if entry["op"] == "upsert":
+                        response = query.upsert([row], on_conflict=entry["key"]).execute()
+                    elif entry["op"] == "update":
+                        response = query.update(row).eq(entry["key"], row[entry["key"]]).execute()
+                    else:
+                        response = query.insert([row]).execute()
+                except CircuitOpen:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Replay of dead-lettered {entry['table']} row failed again: {str(e)}")
+                    failed[entry["id"]] = str(e)
+                    continue
+                replayed.append(entry["id"])
+                written_rows.setdefault(entry["table"], []).extend(response.data or [row])
+        finally:
+            # Rows not written keep their latest error and become claimable again
+            with self._lock:
+                self._conn.execute("BEGIN")
+                self._conn.executemany("DELETE FROM dead_letters WHERE id = ?", [(i,) for i in replayed])
+                self._conn.executemany("UPDATE dead_letters SET error = ? WHERE id = ?",
+                                       [(error, i) for i, error in failed.items()])
+                self._conn.execute("UPDATE dead_letters SET claimed_by = NULL, claimed_at = NULL WHERE claimed_by = ?",
+                                   (token,))
+                self._conn.execute("COMMIT")
+        return {"replayed": len(replayed), "failed": len(failed), "remaining": len(self), "rows": written_rows}
@@ -0,0 +1,244 @@
+import re
+import time
+import heapq
+import logging
+import threading
+from collections import defaultdict
+from itertools import islice
+from typing import Dict, List, Optional, Set, Tuple
+from supabase import Client
+
+logger = logging.getLogger(__name__)
+
+# Identifier fields matched by trigram, text fields matched by token
+IDENTIFIER_FIELDS = ("part_number", "serial_number", "job_card_no")
+TEXT_FIELDS = ("description", "remarks", "customer")
+STORED_FIELDS = (
+    "part_number", "serial_number", "job_card_no", "description",
+    "customer", "category", "progress", "location"
+)
+
+# Keyed by id for mro_items and by job card for the tracker, matching their write paths
+SOURCES = {
+    "mro_items": "id",
+    "mro_job_tracker": "job_card_no",
+}
+_COMMON_COLUMNS = "customer,part_number,description,serial_number,progress,location,remarks,category"
+SOURCE_COLUMNS = {
+    "mro_items": "id," + _COMMON_COLUMNS,
+    "mro_job_tracker": "job_card_no," + _COMMON_COLUMNS,
+}
+
+# Upper bound on documents scored per query tier, keeps latency flat for very common terms
+MAX_CANDIDATES = 2000
+
+_NON_ALNUM = re.compile(r"[^0-9A-Z]")
+_TOKEN = re.compile(r"[0-9a-z]+")
+
+
+def _identifier(value) -> str:
+    return _NON_ALNUM.sub("", str(value).upper()) if value else ""
+
+
+def _trigrams(text: str) -> Set[str]:
+    if len(text) < 3:
+        return {text} if text else set()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _anchor(ident: str) -> str:
+    # Pseudo-trigram for the first two characters, narrows candidates to prefix matches
+    return "^" + ident[:2]
+
+
+def _tokens(value) -> Set[str]:
+    return set(_TOKEN.findall(str(value).lower())) if value else set()
+
+
+class SearchIndex:
+    """In-process inverted index: trigrams over part/serial/job card numbers, tokens over text fields"""
+
+    def __init__(self, supabase: Client, page_size: int = 1000):
+        self.supabase = supabase
+        self.page_size = page_size
+        self._lock = threading.RLock()
+        self._doc_ids: Dict[Tuple[str, str], int] = {}
+        self._docs: Dict[int, Tuple] = {}
+        self._next_id = 0
+        self._grams: Dict[str, Set[int]] = defaultdict(set)
+        self._words: Dict[str, Set[int]] = defaultdict(set)
+        self._exact: Dict[str, Set[int]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def _terms(self, row: Dict) -> Tuple[Set[str], Set[str], Tuple[str, ...]]:
+        idents = tuple(_identifier(row.get(f)) for f in IDENTIFIER_FIELDS)
+        grams = set()
+        for ident in idents:
+            grams |= _trigrams(ident)
+            if len(ident) >= 2:
+                grams.add(_anchor(ident))
+        words = set()
+        for field in TEXT_FIELDS:
+            words |= _tokens(row.get(field))
+        return grams, words, idents
+
+    def _unlink(self, doc_id: int) -> None:
+        doc = self._docs.pop(doc_id, None)
+        if not doc:
+            return
+        for gram in doc[2]:
+            postings = self._grams.get(gram)
+            if postings:
+                postings.discard(doc_id)
+        for word in doc[3]:
+            postings = self._words.get(word)
+            if postings:
+                postings.discard(doc_id)
+        for ident in doc[4]:
+            postings = self._exact.get(ident)
+            if postings:
+                postings.discard(doc_id)
+
+    def upsert(self, source: str, rows: List[Dict]) -> None:
+        """Index inserted or updated rows of a source table"""
+        key_field = SOURCES[source]
+        with self._lock:
+            for row in rows:
+                key = row.get(key_field)
+                if key is None:
+                    continue
+                doc_key = (source, str(key))
+                doc_id = self._doc_ids.get(doc_key)
+                if doc_id is None:
+                    doc_id = self._next_id
+                    self._next_id += 1
+                    self._doc_ids[doc_key] = doc_id
+                else:
+                    self._unlink(doc_id)
+                grams, words, idents = self._terms(row)
+                stored = {f: row.get(f) for f in STORED_FIELDS if row.get(f) is not None}
+                self._docs[doc_id] = (doc_key, stored, frozenset(grams), frozenset(words), idents)
+                for gram in grams:
+                    self._grams[gram].add(doc_id)
+                for word in words:
+                    self._words[word].add(doc_id)
+                for ident in idents:
+                    if ident:
+                        self._exact[ident].add(doc_id)
+
+    def rebuild(self) -> int:
+        """Bulk build the index from paged scans of the source tables"""
+        fresh = SearchIndex(self.supabase, self.page_size)
+        for source, key_field in SOURCES.items():
+            start = 0
+            while True:
+                response = self.supabase.table(source)\
+                    .select(SOURCE_COLUMNS[source])\
+                    .order(key_field)\
+                    .range(start, start + self.page_size - 1)\
+                    .execute()
+                page = response.data if response and hasattr(response, 'data') else []
+                fresh.upsert(source, page)
+                if len(page) < self.page_size:
+                    break
+                start += self.page_size
+        with self._lock:
+            self._doc_ids, self._docs, self._next_id = fresh._doc_ids, fresh._docs, fresh._next_id
+            self._grams, self._words, self._exact = fresh._grams, fresh._words, fresh._exact
+        logger.info(f"Built search index with {len(self._docs)} documents")
+        return len(self._docs)
+
+    def _in_source(self, doc_ids, source: Optional[str]):
+        return doc_ids if source is None else (d for d in doc_ids if self._docs[d][0][0] == source)
+
+    def _identifier_scores(self, ident: str, grams: Set[str], limit: int, source: Optional[str]) -> Dict[int, float]:
+        postings = sorted((self._grams.get(g) or set() for g in grams), key=len)
+        # Exact matches come from their own index and are never cut by the candidate cap
+        scores = {doc_id: 3.0 for doc_id in self._in_source(self._exact.get(ident) or (), source)}
+        # Documents containing every query trigram, verified for substring matches
+        hits = postings[0]
+        for other in postings[1:]:
+            hits = hits & other
+            if not hits:
+                break
+        # Prefix candidates are verified before the rest, so the cap only drops weaker matches.
+        # A two-character query has no trigrams of longer identifiers, its anchor alone finds them
+        anchored = (self._grams.get(_anchor(ident)) or set()) if len(ident) >= 2 else set()
+        prefixed = anchored if len(ident) == 2 else hits & anchored
+        for doc_id in self._in_source(prefixed, source):
+            if len(scores) >= MAX_CANDIDATES:
+                break
+            if doc_id not in scores and any(i.startswith(ident) for i in self._docs[doc_id][4]):
+                scores[doc_id] = 2.5
+        for doc_id in self._in_source(hits, source):
+            if len(scores) >= MAX_CANDIDATES:
+                break
+            if doc_id in scores:
+                continue
+            idents = self._docs[doc_id][4]
+            scores[doc_id] = 2.0 if any(ident in i for i in idents) else 1.0
+        if len(scores) < limit and len(grams) > 1:
+            # Fuzzy fallback: seed from the two rarest trigrams, keep docs sharing at least half of them
+            seeds = set().union(*postings[:2])
+            for doc_id in islice(self._in_source(seeds, source), MAX_CANDIDATES):
+                if doc_id in scores:
+                    continue
+                doc_grams = self._docs[doc_id][2]
+                matched = sum(1 for g in grams if g in doc_grams)
+                if matched * 2 >= len(grams):
+                    scores[doc_id] = matched / len(grams)
+        return scores
+
+    def _text_scores(self, words: Set[str], limit: int, source: Optional[str]) -> Dict[int, float]:
+        postings = sorted((self._words.get(w) or set() for w in words), key=len)
+        scores = {}
+        hits = postings[0]
+        for other in postings[1:]:
+            hits = hits & other
+        # Every matching document scores the same here, so any subset of them is a valid top slice
+        for doc_id in islice(self._in_source(hits, source), MAX_CANDIDATES):
+            scores[doc_id] = 1.0
+        if len(scores) < limit and len(words) > 1:
+            for posting in postings:
+                for doc_id in islice(self._in_source(posting, source), MAX_CANDIDATES):
+                    if doc_id not in scores:
+                        doc_words = self._docs[doc_id][3]
+                        scores[doc_id] = sum(1 for w in words if w in doc_words) / len(words)
+                if len(scores) >= limit:
+                    break
+        return scores
+
+    def search(self, query: str, limit: int = 20, source: Optional[str] = None) -> Dict:
+        """Ranked matches for a partial part/serial number or free text"""
+        started = time.perf_counter()
+        ident = _identifier(query)
+        grams = _trigrams(ident)
+        words = _tokens(query)
+        scores: Dict[int, float] = defaultdict(float)
+
+        with self._lock:
+            if grams:
+                for doc_id, score in self._identifier_scores(ident, grams, limit, source).items():
+                    scores[doc_id] += score
+            if words:
+                for doc_id, score in self._text_scores(words, limit, source).items():
+                    scores[doc_id] += score
+
+            # Candidates are already limited to the source
+            ranked = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            results = [
+                {
+                    "source": self._docs[doc_id][0][0],
+                    "key": self._docs[doc_id][0][1],
+                    "score": round(score, 3),
+                    **self._docs[doc_id][1]
+                }
+                for doc_id, score in ranked
+            ]
+        return {
+            "query": query,
+            "results": results,
+            "took_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
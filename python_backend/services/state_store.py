@@ -0,0 +1,25 @@
+import os
+import sqlite3
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Local, per-instance state (ledgers, indexes, caches) lives under STATE_DIR
+STATE_DIR = os.getenv("STATE_DIR") or str(Path(__file__).resolve().parent.parent / "data" / "state")
+
+
+def state_path(name: str) -> str:
+    """Return the path of a file under STATE_DIR, creating the directory if needed"""
+    os.makedirs(STATE_DIR, exist_ok=True)
+    return os.path.join(STATE_DIR, name)
+
+
+def connect(name: str) -> sqlite3.Connection:
+    """Open a SQLite database under STATE_DIR shared across threads"""
+    path = state_path(name)
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    logger.info(f"Opened local state database: {path}")
+    return conn
@@ -0,0 +1,136 @@
+import time
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+from services.state_store import connect
+from services.mro_analytics import COMPLETED_PROGRESS
+
+logger = logging.getLogger(__name__)
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+METRICS = ("stock_by_category", "low_stock_by_category", "wip_by_progress")
+
+
+class TrendSnapshots:
+    """Hourly aggregates of stock and WIP levels, one point per hour, downsampled to daily points with age"""
+
+    def __init__(self, db_name: str = "trends.db", hourly_retention_days: int = 14):
+        self.hourly_retention = hourly_retention_days * DAY
+        self._lock = threading.Lock()
+        self._conn = connect(db_name)
+        # One narrow row per (resolution, bucket, metric, dimension)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS points (
+                resolution INTEGER NOT NULL,
+                ts INTEGER NOT NULL,
+                metric TEXT NOT NULL,
+                dim TEXT NOT NULL,
+                value REAL NOT NULL,
+                PRIMARY KEY (metric, resolution, ts, dim)
+            ) WITHOUT ROWID
+        """)
+
+    @staticmethod
+    def aggregate(inventory: List[Dict], wip: List[Dict]) -> Dict[str, Dict[str, float]]:
+        """Reduce current rows to metric -> dimension -> value"""
+        stock = defaultdict(float)
+        low_stock = defaultdict(float)
+        for item in inventory:
+            category = str(item.get("category") or "Uncategorized")
+            in_stock = int(item.get("in_stock") or 0)
+            stock[category] += in_stock
+            # Same rule as the low_stock_items view
+            if in_stock <= int(item.get("min_required") or 0):
+                low_stock[category] += 1
+        stock["_total"] = sum(stock.values())
+        low_stock["_total"] = sum(low_stock.values())
+
+        wip_by_progress = defaultdict(float)
+        for row in wip:
+            progress = str(row.get("progress") or "PENDING")
+            # Finished work is no longer in progress, as in the summary's open counts
+            if progress.upper() in COMPLETED_PROGRESS:
+                continue
+            wip_by_progress[progress] += row.get("count", 0)
+        wip_by_progress["_total"] = sum(wip_by_progress.values())
+
+        return {
+            "stock_by_category": dict(stock),
+            "low_stock_by_category": dict(low_stock),
+            "wip_by_progress": dict(wip_by_progress),
+        }
+
+    def record(self, values: Dict[str, Dict[str, float]], now: Optional[float] = None) -> None:
+        """Record one hourly point per metric and dimension; re-recording within the hour overwrites it"""
+        bucket = int((now or time.time()) // HOUR * HOUR)
+        entries = [
+            (HOUR, bucket, metric, dim, float(value))
+            for metric, dims in values.items() for dim, value in dims.items()
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO points (resolution, ts, metric, dim, value) VALUES (?, ?, ?, ?, ?)",
+                    entries
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def downsample(self, now: Optional[float] = None) -> int:
+        """Fold hourly points older than the retention window into daily averages"""
+        cutoff = int(((now or time.time()) - self.hourly_retention) // DAY * DAY)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("""
+                    INSERT OR REPLACE INTO points (resolution, ts, metric, dim, value)
+                    SELECT ?, (ts / ?) * ?, metric, dim, AVG(value)
+                    FROM points WHERE resolution = ? AND ts < ?
+                    GROUP BY (ts / ?) * ?, metric, dim
+                """, (DAY, DAY, DAY, HOUR, cutoff, DAY, DAY))
+                removed = self._conn.execute(
+                    "DELETE FROM points WHERE resolution = ? AND ts < ?", (HOUR, cutoff)
+                ).rowcount
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if removed:
+            logger.info(f"Downsampled {removed} hourly trend points older than {cutoff}")
+        return removed
+
+    def query(self, metric: str, start: float, end: float, dim: Optional[str] = None) -> List[Dict]:
+        """Points of a metric in [start, end), hourly where kept and daily before that"""
+        sql = "SELECT ts, resolution, dim, value FROM points WHERE metric = ? AND ts >= ? AND ts < ?"
+        params = [metric, int(start), int(end)]
+        if dim is not None:
+            sql += " AND dim = ?"
+            params.append(dim)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY ts, dim", params).fetchall()
+        return [{"ts": ts, "resolution": "hour" if res == HOUR else "day", "dim": d, "value": v} for ts, res, d, v in rows]
+
+    async def run(self, interval: float, load_inventory: Callable[[], List[Dict]],
+                  load_wip: Callable[[], Optional[List[Dict]]]) -> None:
+        """Background loop taking a snapshot every interval seconds"""
+        while True:
+            delay = interval
+            try:
+                wip = await asyncio.to_thread(load_wip)
+                if wip is None:
+                    # Sources not ready yet, try again shortly
+                    delay = min(interval, 60)
+                else:
+                    inventory = await asyncio.to_thread(load_inventory)
+                    await asyncio.to_thread(self.record, self.aggregate(inventory, wip))
+                    await asyncio.to_thread(self.downsample)
+            except Exception as e:
+                logger.error(f"Error recording trend snapshot: {str(e)}")
+            await asyncio.sleep(delay)
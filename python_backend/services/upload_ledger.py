@@ -0,0 +1,51 @@
+import json
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+from services.state_store import connect
+
+logger = logging.getLogger(__name__)
+
+
+class UploadLedger:
+    """Ledger of ingested upload files, keyed by content hash"""
+
+    def __init__(self, db_name: str = "upload_ledger.db"):
+        self._lock = threading.Lock()
+        self._conn = connect(db_name)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS uploads (
+                target TEXT NOT NULL,
+                sha256 TEXT NOT NULL,
+                filename TEXT,
+                size INTEGER,
+                summary TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                PRIMARY KEY (target, sha256)
+            );
+        """)
+
+    def lookup(self, target: str, sha256: str) -> Optional[Dict]:
+        """Return the stored summary if this exact file was already applied"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary FROM uploads WHERE target = ? AND sha256 = ?",
+                (target, sha256)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def record(self, target: str, sha256: str, filename: Optional[str], size: int, summary: Dict) -> None:
+        """Remember the summary of a file whose rows were all applied"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO uploads (target, sha256, filename, size, summary, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (target, sha256, filename, size, json.dumps(summary, default=str), datetime.utcnow().isoformat())
+            )
+        logger.info(f"Recorded upload {filename} ({sha256[:12]}) for {target}")
+
+    def forget(self, target: str) -> None:
+        """Drop the stored file summaries of a target once its rows were written again"""
+        with self._lock:
+            self._conn.execute("DELETE FROM uploads WHERE target = ?", (target,))
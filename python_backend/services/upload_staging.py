@@ -0,0 +1,249 @@
+import io
+import os
+import codecs
+import asyncio
+import mmap
+import hashlib
+import logging
+import tempfile
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Callable, Iterator, Optional
+import pandas as pd
+from fastapi import UploadFile
+
+logger = logging.getLogger(__name__)
+
+# Staged uploads live under UPLOAD_TMP_DIR (defaults to the system temp dir)
+UPLOAD_TMP_DIR = os.getenv("UPLOAD_TMP_DIR") or os.path.join(tempfile.gettempdir(), "nexus_uploads")
+
+# Large buffers keep the number of write syscalls low for multi-MB workbooks
+WRITE_BUFFER_SIZE = 1024 * 1024
+READ_CHUNK_SIZE = 1024 * 1024
+# Raw text/csv request bodies are parsed as they arrive and never touch disk
+STREAMED_UPLOAD_MAX_BYTES = int(os.getenv("STREAMED_UPLOAD_MAX_BYTES", 2 * 1024 * 1024 * 1024))
+
+
+class UploadTooLarge(ValueError):
+    """Raised when an upload exceeds the configured size limit"""
+
+    def __init__(self, size: int, max_size: int):
+        self.size = size
+        self.max_size = max_size
+        super().__init__(
+            f"File too large. Max size is {max_size/1024/1024:.0f}MB. "
+            f"Your file is at least {size/1024/1024:.2f}MB"
+        )
+
+
+class _MappedReader(io.RawIOBase):
+    """Read-only, seekable file object over an mmap so pandas/openpyxl can consume it"""
+
+    def __init__(self, mapped: mmap.mmap):
+        self._mapped = mapped
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = len(self._mapped) + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        self._pos = max(self._pos, 0)
+        return self._pos
+
+    def readinto(self, buffer) -> int:
+        view = memoryview(buffer)
+        end = min(self._pos + len(view), len(self._mapped))
+        count = max(end - self._pos, 0)
+        view[:count] = self._mapped[self._pos:end]
+        self._pos += count
+        return count
+
+
+class StreamingTextReader(io.TextIOBase):
+    """Text file object over a blocking byte source that hands pandas whatever has arrived.
+
+    Wrapping a binary stream (pandas does so with a TextIOWrapper) would block
+    every read until the parser's whole 256KB buffer filled; here read(n)
+    returns as soon as read_bytes does, so parsing keeps pace with the source.
+    read_bytes(n) must block until at least one byte is available and return
+    b"" only at the end.
+    """
+
+    def __init__(self, read_bytes: Callable[[int], bytes], encoding: str = "utf-8"):
+        self._read_bytes = read_bytes
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: Optional[int] = -1) -> str:
+        if size is None or size < 0:
+            return "".join(iter(lambda: self.read(READ_CHUNK_SIZE), ""))
+        while True:
+            data = self._read_bytes(size)
+            text = self._decoder.decode(data, final=not data)
+            # An empty decode mid-stream means a multi-byte character was split
+            if text or not data:
+                return text
+
+
+class StagedUpload:
+    """An upload spooled to a unique file on local disk"""
+
+    def __init__(self, path: str, filename: Optional[str], size: int, sha256: Optional[str] = None):
+        self.path = path
+        self.filename = filename or os.path.basename(path)
+        self.size = size
+        self.sha256 = sha256
+
+    @property
+    def extension(self) -> str:
+        return self.filename.split('.')[-1].lower() if '.' in self.filename else ''
+
+    @contextmanager
+    def open_mmap(self):
+        """Yield a read-only file object backed by a memory map of the staged file"""
+        if self.size == 0:
+            # mmap cannot map empty files
+            yield io.BytesIO(b"")
+            return
+        with open(self.path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                with io.BufferedReader(_MappedReader(mapped), buffer_size=READ_CHUNK_SIZE) as reader:
+                    yield reader
+            finally:
+                mapped.close()
+
+    def read_dataframe(self, **kwargs) -> pd.DataFrame:
+        """Parse the staged file as CSV or Excel depending on its extension"""
+        with self.open_mmap() as buf:
+            if self.extension == 'csv':
+                return pd.read_csv(buf, **kwargs)
+            return pd.read_excel(buf, **kwargs)
+
+    def iter_csv_chunks(self, chunksize: int, **kwargs) -> Iterator[pd.DataFrame]:
+        """Yield CSV chunks while keeping the mapping open"""
+        with self.open_mmap() as buf:
+            for chunk in pd.read_csv(buf, chunksize=chunksize, **kwargs):
+                yield chunk
+
+    def cleanup(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove staged upload {self.path}: {str(e)}")
+
+
+async def stage_upload(file: UploadFile, max_size: Optional[int] = None) -> StagedUpload:
+    """Spool an upload to a per-request unique path under UPLOAD_TMP_DIR"""
+    # Fail fast when the multipart parser already knows the size
+    known_size = getattr(file, "size", None)
+    if max_size is not None and known_size is not None and known_size > max_size:
+        raise UploadTooLarge(known_size, max_size)
+
+    os.makedirs(UPLOAD_TMP_DIR, exist_ok=True)
+    suffix = os.path.splitext(file.filename or "")[1].lower()
+    fd, path = tempfile.mkstemp(prefix="upload_", suffix=suffix, dir=UPLOAD_TMP_DIR)
+
+    total_written = 0
+    digest = hashlib.sha256()
+    try:
+        with os.fdopen(fd, "wb", buffering=WRITE_BUFFER_SIZE) as buffer:
+            while True:
+                chunk = await file.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                total_written += len(chunk)
+                if max_size is not None and total_written > max_size:
+                    raise UploadTooLarge(total_written, max_size)
+                digest.update(chunk)
+                buffer.write(chunk)
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+    logger.info(f"Staged upload {file.filename} at {path} ({total_written} bytes, sha256 {digest.hexdigest()[:12]})")
+    return StagedUpload(path, file.filename, total_written, digest.hexdigest())
+
+
+@asynccontextmanager
+async def staged_upload(file: UploadFile, max_size: Optional[int] = None):
+    """Stage an upload for the duration of a request and always clean it up"""
+    staged = await stage_upload(file, max_size)
+    try:
+        yield staged
+    finally:
+        staged.cleanup()
+
+
+class StreamedUpload:
+    """A raw CSV request body parsed while it is still arriving.
+
+    Offers the CSV side of StagedUpload (filename, extension, iter_csv_chunks)
+    so pipelines read it the same way, but pulls body chunks on demand from
+    the event loop into the parsing thread: memory stays at one body chunk
+    plus the parser buffer whatever the file size. size and sha256 are known
+    once the body has been read to the end.
+    """
+
+    def __init__(self, body: AsyncIterator[bytes], filename: Optional[str] = None,
+                 max_size: Optional[int] = STREAMED_UPLOAD_MAX_BYTES):
+        self._body = body.__aiter__()
+        self._loop = asyncio.get_running_loop()
+        self._pending = b""
+        self._digest = hashlib.sha256()
+        self._done = False
+        self.filename = os.path.basename(filename or "") or "upload.csv"
+        self.max_size = max_size
+        self.size = 0
+        self.sha256: Optional[str] = None
+
+    # Only text/csv bodies are streamed
+    extension = "csv"
+
+    def _read_bytes(self, size: int) -> bytes:
+        # Runs in the pipeline's reader thread; each body chunk is awaited on the event loop
+        while not self._pending and not self._done:
+            try:
+                chunk = asyncio.run_coroutine_threadsafe(self._body.__anext__(), self._loop).result()
+            except StopAsyncIteration:
+                self._done = True
+                self.sha256 = self._digest.hexdigest()
+                break
+            self.size += len(chunk)
+            if self.max_size is not None and self.size > self.max_size:
+                raise UploadTooLarge(self.size, self.max_size)
+            self._digest.update(chunk)
+            self._pending = chunk
+        data, self._pending = self._pending[:size], self._pending[size:]
+        return data
+
+    def iter_csv_chunks(self, chunksize: int, **kwargs) -> Iterator[pd.DataFrame]:
+        """Yield CSV chunks as soon as enough of the body has arrived for each"""
+        reader = StreamingTextReader(self._read_bytes)
+        for chunk in pd.read_csv(reader, chunksize=chunksize, **kwargs):
+            yield chunk
+        # Trailing blank lines may end parsing early; hash the whole body
+        while self._read_bytes(READ_CHUNK_SIZE):
+            pass
+        logger.info(f"Streamed upload {self.filename} ({self.size} bytes, sha256 {self.sha256[:12]})")
+
+    def cleanup(self) -> None:
+        pass
@@ -0,0 +1,177 @@
+"""Parsed-workbook cache: normalized records per sheet, reused until the sheet changes.
+
+Files are checked by (mtime, size); an unchanged file is answered without
+opening it. When a file did change, each .xlsx sheet is identified by the
+CRC and size of its worksheet part together with those of the shared
+strings and styles parts, read from the zip directory without decompressing
+anything, and only sheets whose signature changed are parsed. Cells hold
+indexes into the shared strings and styles, and dates depend on the
+workbook's 1904 flag, so all of them are part of the signature. Parsed
+sheets are keyed by name and signature rather than path, so a workbook
+uploaded again under a new staged path reuses the sheets parsed last time.
+"""
+import os
+import time
+import zipfile
+import logging
+import threading
+import posixpath
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+WORKBOOK_CACHE_FILES = int(os.getenv("WORKBOOK_CACHE_FILES", 8))
+WORKBOOK_CACHE_SHEETS = int(os.getenv("WORKBOOK_CACHE_SHEETS", 64))
+
+_MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+# Workbook-wide parts that sheet cells index into
+_SHARED_PART_TYPES = ("/sharedStrings", "/styles")
+
+# (part CRC, part size, shared parts' (CRC, size), 1904 date system); None when sheets cannot be
+# told apart (.xls, damaged zips)
+Signature = Optional[Tuple[int, int, Tuple[Tuple[int, int], ...], bool]]
+
+
+def _part_path(target: str) -> str:
+    return target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+
+
+def sheet_signatures(path: str) -> "OrderedDict[str, Signature]":
+    """Sheet names in workbook order with the signature of each sheet's worksheet part"""
+    try:
+        with zipfile.ZipFile(path) as archive:
+            infos = {info.filename: info for info in archive.infolist()}
+            workbook = ET.fromstring(archive.read("xl/workbook.xml"))
+            rels = ET.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    except (zipfile.BadZipFile, KeyError, ET.ParseError):
+        with pd.ExcelFile(path) as book:
+            return OrderedDict((name, None) for name in book.sheet_names)
+    relationships = list(rels.iter(f"{_PKG_REL_NS}Relationship"))
+    targets = {rel.get("Id"): rel.get("Target") for rel in relationships}
+    shared = []
+    for suffix in _SHARED_PART_TYPES:
+        info = next((infos.get(_part_path(rel.get("Target", ""))) for rel in relationships
+                     if rel.get("Type", "").endswith(suffix)), None)
+        shared.append((info.CRC, info.file_size) if info else (0, 0))
+    properties = workbook.find(f"{_MAIN_NS}workbookPr")
+    date1904 = properties is not None and properties.get("date1904", "").lower() in ("1", "true")
+    signatures = OrderedDict()
+    for sheet in workbook.iter(f"{_MAIN_NS}sheet"):
+        info = infos.get(_part_path(targets.get(sheet.get(f"{_REL_NS}id"), "")))
+        signatures[sheet.get("name")] = (info.CRC, info.file_size, tuple(shared), date1904) if info else None
+    return signatures
+
+
+class WorkbookCache:
+    """LRU of file stats and of normalized sheet records keyed by (sheet, signature)"""
+
+    def __init__(self, normalize: Callable[[str, pd.DataFrame], List[Dict]],
+                 max_files: int = WORKBOOK_CACHE_FILES, max_sheets: int = WORKBOOK_CACHE_SHEETS):
+        self.normalize = normalize
+        self.max_files = max_files
+        self.max_sheets = max_sheets
+        # path -> ((mtime_ns, size), sheet signatures)
+        self._files: "OrderedDict[str, Tuple[Tuple[int, int], OrderedDict]]" = OrderedDict()
+        # (sheet name, signature) -> normalized records
+        self._sheets: "OrderedDict[Tuple[str, Signature], List[Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counts = {"file_hits": 0, "file_misses": 0, "sheets_reused": 0, "sheets_parsed": 0, "parse_seconds": 0.0}
+
+    def _signatures(self, path: str, track: bool) -> "OrderedDict[str, Signature]":
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._files.get(path)
+            if cached and cached[0] == key:
+                self._files.move_to_end(path)
+                self.counts["file_hits"] += 1
+                return cached[1]
+            self.counts["file_misses"] += 1
+        signatures = sheet_signatures(path)
+        if track:
+            with self._lock:
+                self._files[path] = (key, signatures)
+                self._files.move_to_end(path)
+                while len(self._files) > self.max_files:
+                    self._files.popitem(last=False)
+        return signatures
+
+    def _parse(self, path: str, sheets: List[str]) -> Dict[str, List[Dict]]:
+        started = time.perf_counter()
+        parsed = {}
+        with pd.ExcelFile(path) as book:
+            for sheet in sheets:
+                try:
+                    parsed[sheet] = self.normalize(sheet, book.parse(sheet))
+                except Exception as e:
+                    logger.error(f"Error reading sheet {sheet}: {str(e)}")
+        with self._lock:
+            self.counts["sheets_parsed"] += len(parsed)
+            self.counts["parse_seconds"] += time.perf_counter() - started
+        return parsed
+
+    def read(self, path: str, sheet_name: Optional[str] = None, track: bool = True) -> List[Dict]:
+        """Normalized records of one or all sheets, parsing only sheets not cached under their signature.
+
+        track=False does not remember the file for refresh(), for one-off
+        files such as staged uploads; their sheets are still cached.
+        """
+        signatures = self._signatures(path, track)
+        wanted = [sheet_name] if sheet_name else list(signatures)
+        records: Dict[str, List[Dict]] = {}
+        with self._lock:
+            for sheet in wanted:
+                key = (sheet, signatures.get(sheet))
+                if key[1] is not None and key in self._sheets:
+                    self._sheets.move_to_end(key)
+                    records[sheet] = self._sheets[key]
+            self.counts["sheets_reused"] += len(records)
+        missing = [sheet for sheet in wanted if sheet not in records]
+        if missing:
+            parsed = self._parse(path, missing)
+            records.update(parsed)
+            self._store(signatures, parsed)
+            logger.info(f"Parsed {len(parsed)} of {len(wanted)} sheets of {os.path.basename(path)}")
+        # Callers may modify the rows they get
+        return [dict(record) for sheet in wanted for record in records.get(sheet, [])]
+
+    def _store(self, signatures: "OrderedDict[str, Signature]", parsed: Dict[str, List[Dict]]) -> None:
+        with self._lock:
+            for sheet, sheet_records in parsed.items():
+                signature = signatures.get(sheet)
+                if signature is not None:
+                    self._sheets[(sheet, signature)] = sheet_records
+            while len(self._sheets) > self.max_sheets:
+                self._sheets.popitem(last=False)
+
+    def refresh(self) -> List[str]:
+        """Re-read tracked workbooks whose file changed, so the next read is a cache hit"""
+        with self._lock:
+            tracked = [(path, key) for path, (key, _) in self._files.items()]
+        changed = []
+        for path, key in tracked:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                with self._lock:
+                    self._files.pop(path, None)
+                continue
+            if (stat.st_mtime_ns, stat.st_size) != key:
+                self.read(path)
+                changed.append(path)
+        return changed
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "files": len(self._files),
+                "sheets": len(self._sheets),
+                **self.counts,
+                "parse_seconds": round(self.counts["parse_seconds"], 3),
+            }
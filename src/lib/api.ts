@@ -266,9 +266,7 @@ export async function fetchAnalyticsSummary() {
       total_parts: Number(data.total_parts || 0),
       total_value: Number(data.total_value || 0),
       low_stock: Number(data.low_stock || 0),
-      backorders: Number(data.backorders || 0),
-      turnover_rate: Number(data.turnover_rate || 0),
-      accuracy_rate: Number(data.accuracy_rate || 0)
+      backorders: Number(data.backorders || 0)
     };
   } catch (error) {
     console.error('Failed to fetch analytics summary:', error);